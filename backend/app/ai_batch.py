@@ -0,0 +1,62 @@
+"""
+Concurrent execution of several AI feature calls in one request.
+
+Each batch runs at most `concurrency` items at a time on a shared pool and
+returns whatever has finished by the deadline; items still running are
+reported as timed out (their results still land in the AI cache when they
+finish).
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class BatchRunner:
+    """Runs runner(feature, payload) -> (result, status) for a list of items"""
+
+    def __init__(self, runner, max_workers=16, max_items=20, max_concurrency=8, default_timeout=45.0):
+        self.runner = runner
+        self.max_items = max_items
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-batch')
+
+    def run(self, items, concurrency=None, timeout=None):
+        """items: list of (key, feature, payload); returns {key: outcome}"""
+        concurrency = max(1, min(concurrency or self.max_concurrency, self.max_concurrency))
+        deadline = time.monotonic() + (timeout or self.default_timeout)
+        queue = list(items)
+        pending = {}
+        results = {}
+
+        def launch():
+            key, feature, payload = queue.pop(0)
+            pending[self._executor.submit(self.runner, feature, payload)] = (key, time.monotonic())
+
+        while queue and len(pending) < concurrency:
+            launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(list(pending), timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, started = pending.pop(future)
+                elapsed = round(time.monotonic() - started, 3)
+                try:
+                    data, status = future.result()
+                except Exception as e:
+                    data, status = {"error": str(e)}, 500
+                if status < 400:
+                    results[key] = {"status": status, "data": data, "elapsed": elapsed}
+                else:
+                    error = data.get('error') if isinstance(data, dict) else str(data)
+                    results[key] = {"status": status, "error": error, "elapsed": elapsed}
+            while queue and len(pending) < concurrency:
+                launch()
+
+        for future, (key, _) in pending.items():
+            future.cancel()
+            results[key] = {"status": 504, "error": "Timed out"}
+        for key, _, _ in queue:
+            results[key] = {"status": 504, "error": "Timed out before starting"}
+        return results
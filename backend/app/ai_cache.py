@@ -0,0 +1,219 @@
+"""
+Two-tier response cache for OpenRouter completions.
+
+Entries live in a size-bounded in-memory LRU and, when a cache directory is
+configured, in a diskcache store that survives restarts and is shared by all
+workers on the host. Once an entry has lived `refresh_ratio` of its TTL it is
+reported as stale: still served, but due for a background refresh.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+# Seconds an endpoint's responses stay fresh. 0 disables caching for endpoints
+# whose output is personal or is expected to change between calls.
+DEFAULT_TTLS = {
+    'test': 0,
+    'generate-itinerary': 0,
+    'trip-summary-narrative': 0,
+    'translate-batch': 0,  # per-phrase results live in the translation memory
+    'recommend-destinations': 6 * 3600,
+    'optimize-budget': 6 * 3600,
+    'activity-suggestions': 24 * 3600,
+    'emergency-help': 24 * 3600,
+    'emergency-next-steps': 24 * 3600,
+    'foodie-finder': 3 * 86400,
+    'cultural-compass': 7 * 86400,
+    'eco-score': 7 * 86400,
+    'eco-tips': 7 * 86400,
+    'destination-descriptions': 7 * 86400,
+    'vr-preview': 7 * 86400,
+    'collect-stamp': 30 * 86400,
+    'translate': 30 * 86400,
+}
+DEFAULT_TTL = 3600
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(text):
+    """Collapse whitespace so indentation changes don't produce new keys"""
+    return _WHITESPACE.sub(' ', text or '').strip()
+
+
+def make_key(system_prompt, prompt, model):
+    """Stable cache key for a (system_prompt, prompt, model) triple"""
+    raw = json.dumps(
+        [normalize_prompt(system_prompt), normalize_prompt(prompt), model or ''],
+        ensure_ascii=False
+    )
+    return 'ai:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def load_ttls(environ=None):
+    """Default TTL table with AI_CACHE_TTL_<ENDPOINT> environment overrides"""
+    environ = os.environ if environ is None else environ
+    ttls = dict(DEFAULT_TTLS)
+    for endpoint in DEFAULT_TTLS:
+        override = environ.get('AI_CACHE_TTL_' + endpoint.upper().replace('-', '_'))
+        if override is not None:
+            try:
+                ttls[endpoint] = int(override)
+            except ValueError:
+                logger.warning("Ignoring invalid TTL override for %s: %s", endpoint, override)
+    return ttls
+
+
+class AIResponseCache:
+    """Memory LRU in front of an optional on-disk tier, with hit/miss counters"""
+
+    def __init__(self, directory=None, max_entries=1024, disk_size_limit=256 * 1024 * 1024,
+                 ttls=None, default_ttl=DEFAULT_TTL, refresh_ratio=0.8):
+        self.max_entries = max_entries
+        self.refresh_ratio = refresh_ratio
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._disk = None
+        if directory:
+            try:
+                self._disk = diskcache.Cache(directory, size_limit=disk_size_limit)
+            except Exception as e:
+                logger.warning("AI disk cache unavailable (%s), using memory tier only", e)
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stale_hits': 0, 'stores': 0, 'evictions': 0}
+        self._endpoints = {}
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _count(self, name, endpoint):
+        self._counters[name] += 1
+        if endpoint:
+            per_endpoint = self._endpoints.setdefault(endpoint, {'hits': 0, 'misses': 0})
+            per_endpoint['misses' if name == 'misses' else 'hits'] += 1
+
+    def _remember(self, key, expires_at, value):
+        # Caller holds the lock
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _is_stale(self, expires_at, endpoint, now):
+        ttl = self.ttl_for(endpoint)
+        return ttl > 0 and now >= expires_at - ttl * (1 - self.refresh_ratio)
+
+    def _read_disk(self, key):
+        try:
+            return self._disk.get(key, expire_time=True)
+        except Exception as e:
+            logger.warning("AI disk cache read failed: %s", e)
+            return None, None
+
+    def lookup(self, key, endpoint=None):
+        """(private copy of the cached value, stale flag); (None, False) on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._count('memory_hits', endpoint)
+                    stale = self._is_stale(entry[0], endpoint, now)
+                    if stale:
+                        self._counters['stale_hits'] += 1
+                    return copy.deepcopy(entry[1]), stale
+                del self._memory[key]
+
+        if self._disk is not None:
+            value, expires_at = self._read_disk(key)
+            if value is not None:
+                expires_at = expires_at or now + self.ttl_for(endpoint)
+                stale = self._is_stale(expires_at, endpoint, now)
+                with self._lock:
+                    self._remember(key, expires_at, value)
+                    self._count('disk_hits', endpoint)
+                    if stale:
+                        self._counters['stale_hits'] += 1
+                return copy.deepcopy(value), stale
+
+        with self._lock:
+            self._count('misses', endpoint)
+        return None, False
+
+    def get(self, key, endpoint=None):
+        """Return a private copy of the cached value, or None on a miss"""
+        return self.lookup(key, endpoint)[0]
+
+    def peek(self, key, endpoint=None):
+        """'fresh', 'stale' or 'missing', without touching counters or LRU order"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+        expires_at = entry[0] if entry is not None and entry[0] > now else None
+        if expires_at is None and self._disk is not None:
+            value, expires_at = self._read_disk(key)
+            if value is None:
+                expires_at = None
+            elif expires_at is None:
+                return 'fresh'  # stored without expiry
+        if expires_at is None:
+            return 'missing'
+        return 'stale' if self._is_stale(expires_at, endpoint, now) else 'fresh'
+
+    def set(self, key, value, endpoint=None):
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return False
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, time.time() + ttl, value)
+            self._counters['stores'] += 1
+        if self._disk is not None:
+            try:
+                self._disk.set(key, value, expire=ttl)
+            except Exception as e:
+                logger.warning("AI disk cache write failed: %s", e)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            endpoints = {name: dict(c) for name, c in self._endpoints.items()}
+            memory_entries = len(self._memory)
+        hits = counters['memory_hits'] + counters['disk_hits']
+        lookups = hits + counters['misses']
+        for c in endpoints.values():
+            total = c['hits'] + c['misses']
+            c['hit_rate'] = round(c['hits'] / total, 4) if total else 0.0
+        return {
+            **counters,
+            'hits': hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': memory_entries,
+            'max_entries': self.max_entries,
+            'disk_enabled': self._disk is not None,
+            'disk_entries': len(self._disk) if self._disk is not None else 0,
+            'disk_bytes': self._disk.volume() if self._disk is not None else 0,
+            'endpoints': endpoints,
+            'ttls': dict(self.ttls),
+            'refresh_ratio': self.refresh_ratio,
+        }
@@ -0,0 +1,162 @@
+"""
+Hedged fan-out across the OpenRouter model list.
+
+The preferred model is started first; if it has not answered within the
+hedge delay the next model is started alongside it, up to the fan-out width.
+A failed attempt is replaced immediately, so width=1 with no delay behaves
+like the original sequential fallback. Lanes listed in lane_workers get their
+own thread pool so their attempts never queue behind other lanes' attempts.
+
+Once one model answers, the others are only cancelled cooperatively: attempts
+still queued for a thread never start, and the `cancelled` event stops an
+attempt that checks it before sending. A request already in flight cannot be
+interrupted. It keeps its pool thread and upstream quota until the model
+replies or its read timeout expires, and callers cap that timeout with the
+remaining deadline. stats() counts both kinds, and `losers_in_flight` shows
+how many abandoned requests are still running.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {'width': 2, 'delay': 6.0}
+
+# Latency-sensitive endpoints hedge sooner; long generations wait longer
+# before paying for a second model.
+ENDPOINT_POLICIES = {
+    'emergency-help': {'width': 3, 'delay': 2.0},
+    'translate': {'width': 2, 'delay': 3.0},
+    'generate-itinerary': {'width': 2, 'delay': 12.0},
+    'trip-summary-narrative': {'width': 2, 'delay': 10.0},
+}
+
+
+class HedgeCancelled(Exception):
+    """Raised by an attempt that noticed another model already answered"""
+
+
+class AllModelsFailed(Exception):
+    """Every model attempt failed; errors holds (model, exception) pairs"""
+
+    def __init__(self, errors):
+        super().__init__(f"All {len(errors)} model attempts failed")
+        self.errors = errors
+
+
+def _parse_policy(value):
+    # "width:delay", e.g. "3:1.5"; an empty delay means never hedge
+    width, _, delay = value.partition(':')
+    return {'width': max(1, int(width)), 'delay': float(delay) if delay else None}
+
+
+def load_policies(environ=None):
+    """Policy table with AI_HEDGE_DEFAULT / AI_HEDGE_<ENDPOINT> overrides"""
+    environ = os.environ if environ is None else environ
+    policies = {name: dict(policy) for name, policy in ENDPOINT_POLICIES.items()}
+    policies['default'] = dict(DEFAULT_POLICY)
+    for name, value in environ.items():
+        if not name.startswith('AI_HEDGE_') or name in ('AI_HEDGE_ENABLED', 'AI_HEDGE_MAX_WORKERS'):
+            continue
+        endpoint = name[len('AI_HEDGE_'):].lower().replace('_', '-')
+        try:
+            policies[endpoint] = _parse_policy(value)
+        except ValueError:
+            logger.warning("Ignoring invalid hedge policy %s=%s", name, value)
+    return policies
+
+
+class HedgedCaller:
+    """Runs attempt(model, cancelled) across models on a shared thread pool"""
+
+    def __init__(self, max_workers=32, policies=None, lane_workers=None):
+        self.policies = policies if policies is not None else load_policies()
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'hedges': 0, 'losers_cancelled': 0, 'losers_abandoned': 0}
+        self._losers_in_flight = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-hedge')
+        self._lane_executors = {
+            lane: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'ai-hedge-{lane}')
+            for lane, workers in (lane_workers or {}).items()
+        }
+
+    def policy_for(self, endpoint):
+        return self.policies.get(endpoint) or self.policies.get('default', DEFAULT_POLICY)
+
+    def call(self, models, attempt, width=1, delay=None, timeout=None, lane=None):
+        """Return (model, result) from the first attempt that does not raise"""
+        executor = self._lane_executors.get(lane, self._executor)
+        queue = list(models)
+        pending = {}
+        errors = []
+        cancelled = threading.Event()
+        deadline = time.monotonic() + timeout if timeout else None
+        width = max(1, width)
+
+        def launch():
+            model = queue.pop(0)
+            pending[executor.submit(attempt, model, cancelled)] = model
+
+        with self._lock:
+            self._counters['calls'] += 1
+        try:
+            if queue:
+                launch()
+            while pending:
+                can_hedge = bool(queue) and len(pending) < width and delay is not None
+                wait_for = delay if can_hedge else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    wait_for = remaining if wait_for is None else min(wait_for, remaining)
+
+                done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+                if not done:
+                    if can_hedge:
+                        launch()
+                        with self._lock:
+                            self._counters['hedges'] += 1
+                    continue
+
+                for future in done:
+                    model = pending.pop(future)
+                    try:
+                        return model, future.result()
+                    except Exception as e:
+                        errors.append((model, e))
+
+                # Replace failed attempts straight away, as the sequential fallback did
+                while queue and len(pending) < width:
+                    launch()
+        finally:
+            cancelled.set()
+            for future in pending:
+                if future.cancel():
+                    self._count_loser('losers_cancelled')
+                elif not future.done():
+                    # Already sending: it runs to its reply or read timeout. Futures that
+                    # finished in the same wait() round as the winner are not losers.
+                    self._count_loser('losers_abandoned')
+                    future.add_done_callback(self._loser_finished)
+
+        if pending:
+            errors.extend((model, TimeoutError("deadline exceeded")) for model in pending.values())
+        raise AllModelsFailed(errors)
+
+    def _count_loser(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+            if counter == 'losers_abandoned':
+                self._losers_in_flight += 1
+
+    def _loser_finished(self, future):
+        with self._lock:
+            self._losers_in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'losers_in_flight': self._losers_in_flight}
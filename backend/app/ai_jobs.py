@@ -0,0 +1,130 @@
+"""
+Asynchronous AI job queue.
+
+Jobs are accepted immediately and run on a bounded worker pool so a burst
+of slow LLM calls can't tie up the request workers. Finished jobs are kept
+for a while so clients can poll them, and an optional callback lets the app
+push results to a Socket.IO room.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .model_health import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the queue already holds max_queue waiting jobs"""
+
+
+class AIJobQueue:
+    """Bounded pool running runner(feature, payload) -> (result, status)"""
+
+    def __init__(self, runner, concurrency=4, max_queue=200, result_ttl=600, on_complete=None):
+        self.runner = runner
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.on_complete = on_complete
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        self._wait_times = deque(maxlen=1000)
+        self._run_times = deque(maxlen=1000)
+
+    def submit(self, feature, payload, room=None):
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            if self._queued >= self.max_queue:
+                self._counters['rejected'] += 1
+                raise QueueFull(f"AI job queue is full ({self.max_queue} waiting)")
+            job = {
+                'id': str(uuid.uuid4()),
+                'feature': feature,
+                'status': 'queued',
+                'room': room,
+                'submitted_at': now,
+                'started_at': None,
+                'finished_at': None,
+                'status_code': None,
+                'result': None,
+            }
+            self._jobs[job['id']] = job
+            self._queued += 1
+            self._counters['submitted'] += 1
+            snapshot = dict(job)
+        self._executor.submit(self._run, job['id'], payload)
+        return snapshot
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _purge(self, now):
+        # Caller holds the lock; jobs are stored in submission order
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job['finished_at'] is None:
+                continue
+            if now - job['finished_at'] < self.result_ttl:
+                break
+            del self._jobs[job_id]
+
+    def _run(self, job_id, payload):
+        with self._lock:
+            job = self._jobs[job_id]
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+            self._queued -= 1
+            self._running += 1
+            self._wait_times.append(job['started_at'] - job['submitted_at'])
+
+        try:
+            result, status_code = self.runner(job['feature'], payload)
+            outcome = 'done' if status_code < 400 else 'failed'
+        except Exception as e:
+            result, status_code, outcome = {"error": str(e)}, 500, 'failed'
+
+        with self._lock:
+            job['status'] = outcome
+            job['result'] = result
+            job['status_code'] = status_code
+            job['finished_at'] = time.time()
+            self._running -= 1
+            self._counters['completed' if outcome == 'done' else 'failed'] += 1
+            self._run_times.append(job['finished_at'] - job['started_at'])
+            snapshot = dict(job)
+
+        if self.on_complete:
+            try:
+                self.on_complete(snapshot)
+            except Exception as e:
+                logger.warning("AI job completion callback failed: %s", e)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._wait_times)
+            runs = sorted(self._run_times)
+            return {
+                **self._counters,
+                'queue_depth': self._queued,
+                'running': self._running,
+                'concurrency': self.concurrency,
+                'max_queue': self.max_queue,
+                'stored_jobs': len(self._jobs),
+                'wait_time_avg': round(sum(waits) / len(waits), 3) if waits else None,
+                'wait_time_p50': percentile(waits, 50),
+                'wait_time_p95': percentile(waits, 95),
+                'run_time_p50': percentile(runs, 50),
+                'run_time_p95': percentile(runs, 95),
+            }
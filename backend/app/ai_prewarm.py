@@ -0,0 +1,167 @@
+"""
+AI cache pre-warming and stale-while-revalidate refreshes.
+
+A warm matrix is a list of (feature, payload) pairs, usually built from a
+destination list crossed with per-feature payload variants (data/prewarm.json).
+CacheWarmer.run() pushes every pair through the app's warm function at a
+bounded concurrency; the warm function only calls the model for entries that
+are missing or past their refresh point, so a periodic run keeps popular
+lookups cached without re-spending on fresh ones. Stale cache hits on the
+request path are refreshed through refresh_async() off a small pool.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Payload field that carries the place for each pre-warmable feature
+PLACE_FIELDS = {
+    'cultural-compass': 'destination',
+    'activity-suggestions': 'destination',
+    'vr-preview': 'destination',
+    'eco-score': 'destination',
+    'optimize-budget': 'destination',
+    'foodie-finder': 'location',
+    'emergency-help': 'location',
+    'collect-stamp': 'landmark',
+}
+DEFAULT_FEATURES = ('cultural-compass', 'foodie-finder', 'activity-suggestions')
+OUTCOMES = ('fresh', 'filled', 'refreshed', 'skipped', 'shed', 'failed')
+
+
+def build_matrix(destinations, features):
+    """[(feature, payload)] for each destination x feature x payload variant
+
+    features maps a feature name to a list of extra payload dicts (or a single
+    dict, or None for just the place field).
+    """
+    matrix = []
+    for name, variants in features.items():
+        field = PLACE_FIELDS.get(name)
+        if field is None:
+            raise ValueError(f"Feature cannot be pre-warmed by destination: {name}")
+        if not isinstance(variants, list):
+            variants = [variants or {}]
+        for destination in destinations:
+            for extra in variants:
+                matrix.append((name, {**(extra or {}), field: destination}))
+    return matrix
+
+
+def load_matrix(path):
+    """Warm matrix from a {"destinations": [...], "features": {...}} JSON file"""
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    features = spec.get('features') or {name: [{}] for name in DEFAULT_FEATURES}
+    return build_matrix(spec.get('destinations', []), features)
+
+
+class CacheWarmer:
+    """Runs warm(feature, payload) -> outcome over a matrix; dedupes background refreshes"""
+
+    def __init__(self, warm, concurrency=4, refresh_workers=2):
+        self.warm = warm
+        self.concurrency = concurrency
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='ai-refresh')
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counters = {'runs': 0, 'refreshes_scheduled': 0, 'refreshes_skipped': 0, 'refresh_failures': 0}
+        self._last_run = None
+
+    def refresh_async(self, key, fn):
+        """Run fn() in the background unless a refresh for key is already queued"""
+        with self._lock:
+            if key in self._refreshing:
+                self._counters['refreshes_skipped'] += 1
+                return False
+            self._refreshing.add(key)
+            self._counters['refreshes_scheduled'] += 1
+
+        def refresh():
+            try:
+                result = fn()
+                if isinstance(result, dict) and result.get('error'):
+                    with self._lock:
+                        self._counters['refresh_failures'] += 1
+            except Exception as e:
+                logger.warning("Background AI cache refresh failed: %s", e)
+                with self._lock:
+                    self._counters['refresh_failures'] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_pool.submit(refresh)
+        return True
+
+    def run(self, matrix, concurrency=None):
+        """Warm every (feature, payload) pair; returns outcome counts"""
+        if not self._run_lock.acquire(blocking=False):
+            return {"error": "A pre-warm run is already in progress"}
+        try:
+            started = time.monotonic()
+            summary = {outcome: 0 for outcome in OUTCOMES}
+
+            def one(item):
+                try:
+                    return self.warm(*item)
+                except Exception as e:
+                    logger.warning("Pre-warm of %s failed: %s", item[0], e)
+                    return 'failed'
+
+            with ThreadPoolExecutor(max_workers=max(1, concurrency or self.concurrency),
+                                    thread_name_prefix='ai-prewarm') as pool:
+                for outcome in pool.map(one, matrix):
+                    summary[outcome] = summary.get(outcome, 0) + 1
+            summary['total'] = len(matrix)
+            summary['elapsed'] = round(time.monotonic() - started, 2)
+            summary['finished_at'] = time.time()
+            with self._lock:
+                self._counters['runs'] += 1
+                self._last_run = summary
+            return summary
+        finally:
+            self._run_lock.release()
+
+    def run_async(self, matrix, concurrency=None):
+        """Start run() on a daemon thread; False if one is already running"""
+        if self._run_lock.locked():
+            return False
+        threading.Thread(target=self.run, args=(matrix, concurrency), daemon=True, name='ai-prewarm-run').start()
+        return True
+
+    def start(self, matrix_source, interval):
+        """Re-run the matrix every `interval` seconds on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    summary = self.run(matrix_source())
+                    logger.info("AI cache pre-warm: %s", summary)
+                except Exception as e:
+                    logger.warning("AI cache pre-warm run failed: %s", e)
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, daemon=True, name='ai-prewarm-loop')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'refreshing': len(self._refreshing),
+                'running': self._run_lock.locked(),
+                'background_loop': self._thread is not None and not self._stop.is_set(),
+                'last_run': dict(self._last_run) if self._last_run else None,
+            }
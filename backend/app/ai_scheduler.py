@@ -0,0 +1,185 @@
+"""
+Priority lanes for outbound AI calls.
+
+Every upstream call takes a slot in one of three lanes before it runs.
+Lanes have separate concurrency budgets, so safety-critical calls
+(emergency-help) never wait behind cosmetic ones (vr-preview). Each call has
+a deadline: it gives up if no slot frees up in time, and the remaining
+budget caps the hedge and HTTP timeouts once it runs. Under saturation,
+background work is shed immediately rather than queued.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .model_health import percentile
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = 'critical'
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+LANES = (CRITICAL, INTERACTIVE, BACKGROUND)
+
+# concurrency: upstream calls in flight; max_waiting: queued before shedding;
+# deadline: seconds from admission request to result
+DEFAULT_LANES = {
+    CRITICAL: {'concurrency': 8, 'max_waiting': 32, 'deadline': 20.0},
+    INTERACTIVE: {'concurrency': 12, 'max_waiting': 64, 'deadline': 60.0},
+    BACKGROUND: {'concurrency': 4, 'max_waiting': 16, 'deadline': 120.0},
+}
+
+# The critical lane is emergency-help's alone: anything sharing it (even
+# urgent-feeling translate bursts) could fill its slots and queue, and shed
+# or delay an emergency call. Unlisted endpoints are INTERACTIVE.
+ENDPOINT_PRIORITIES = {
+    'emergency-help': CRITICAL,
+    'vr-preview': BACKGROUND,
+    'collect-stamp': BACKGROUND,
+    'trip-summary-narrative': BACKGROUND,
+}
+
+
+class Overloaded(Exception):
+    """The lane shed this call instead of queueing it"""
+
+    def __init__(self, lane, reason, retry_after=5):
+        super().__init__(f"AI service busy ({lane} lane: {reason}), retry shortly")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """No slot freed up before the call's deadline"""
+
+    def __init__(self, lane):
+        super().__init__(f"AI request deadline exceeded waiting in the {lane} lane")
+        self.lane = lane
+
+
+def load_lanes(environ=None):
+    """Lane table with AI_LANE_<LANE>=concurrency:max_waiting:deadline overrides"""
+    environ = os.environ if environ is None else environ
+    lanes = {name: dict(lane) for name, lane in DEFAULT_LANES.items()}
+    for name in LANES:
+        value = environ.get('AI_LANE_' + name.upper())
+        if not value:
+            continue
+        try:
+            parts = value.split(':')
+            if parts[0]:
+                lanes[name]['concurrency'] = max(1, int(parts[0]))
+            if len(parts) > 1 and parts[1]:
+                lanes[name]['max_waiting'] = max(0, int(parts[1]))
+            if len(parts) > 2 and parts[2]:
+                lanes[name]['deadline'] = float(parts[2])
+        except ValueError:
+            logger.warning("Ignoring invalid lane config AI_LANE_%s=%s", name.upper(), value)
+    return lanes
+
+
+class _Lane:
+    def __init__(self, name, lock, concurrency, max_waiting, deadline):
+        self.name = name
+        self.ready = threading.Condition(lock)
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.deadline = deadline
+        self.active = 0
+        self.waiting = 0
+        self.counters = {'admitted': 0, 'shed': 0, 'timed_out': 0}
+        self.wait_times = deque(maxlen=1000)
+        self.run_times = deque(maxlen=1000)
+
+
+class PriorityScheduler:
+    """Admission control for upstream AI calls, one budget per priority lane"""
+
+    def __init__(self, lanes=None, priorities=None, shed_utilization=0.9):
+        self._lock = threading.Lock()
+        self._lanes = {
+            name: _Lane(name, self._lock, **config)
+            for name, config in (lanes or DEFAULT_LANES).items()
+        }
+        self.priorities = ENDPOINT_PRIORITIES if priorities is None else priorities
+        self.shed_utilization = shed_utilization
+
+    def priority_for(self, endpoint, priority=None):
+        lane = priority or self.priorities.get(endpoint, INTERACTIVE)
+        return lane if lane in self._lanes else INTERACTIVE
+
+    def _under_pressure(self):
+        # Caller holds the lock: urgent work is queueing or the non-background budget is nearly spent
+        urgent = [lane for name, lane in self._lanes.items() if name != BACKGROUND]
+        if any(lane.waiting for lane in urgent):
+            return True
+        capacity = sum(lane.concurrency for lane in urgent)
+        return capacity > 0 and sum(lane.active for lane in urgent) >= self.shed_utilization * capacity
+
+    def _shed(self, lane, reason):
+        lane.counters['shed'] += 1
+        raise Overloaded(lane.name, reason)
+
+    @contextmanager
+    def slot(self, endpoint=None, priority=None, deadline=None):
+        """Hold a lane slot for the body; yields the monotonic deadline"""
+        lane = self._lanes[self.priority_for(endpoint, priority)]
+        requested = time.monotonic()
+        deadline = deadline or requested + lane.deadline
+        with self._lock:
+            if lane.name == BACKGROUND and self._under_pressure():
+                self._shed(lane, "shedding under load")
+            if lane.active >= lane.concurrency and lane.waiting >= lane.max_waiting:
+                self._shed(lane, "queue full")
+            lane.waiting += 1
+            try:
+                while lane.active >= lane.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        lane.counters['timed_out'] += 1
+                        raise DeadlineExceeded(lane.name)
+                    lane.ready.wait(remaining)
+                    if lane.name == BACKGROUND and self._under_pressure():
+                        # Hand the wakeup on, or a freed slot sits idle until another waiter's deadline
+                        lane.ready.notify()
+                        self._shed(lane, "shedding under load")
+            finally:
+                lane.waiting -= 1
+            lane.active += 1
+            lane.counters['admitted'] += 1
+            started = time.monotonic()
+            lane.wait_times.append(started - requested)
+        try:
+            yield deadline
+        finally:
+            with self._lock:
+                lane.active -= 1
+                lane.run_times.append(time.monotonic() - started)
+                lane.ready.notify()
+
+    def stats(self):
+        with self._lock:
+            lanes = {}
+            for name, lane in self._lanes.items():
+                waits = sorted(lane.wait_times)
+                runs = sorted(lane.run_times)
+                lanes[name] = {
+                    **lane.counters,
+                    'active': lane.active,
+                    'waiting': lane.waiting,
+                    'concurrency': lane.concurrency,
+                    'max_waiting': lane.max_waiting,
+                    'deadline': lane.deadline,
+                    'wait_p50': percentile(waits, 50),
+                    'wait_p95': percentile(waits, 95),
+                    'run_p50': percentile(runs, 50),
+                    'run_p95': percentile(runs, 95),
+                }
+            return {
+                'lanes': lanes,
+                'priorities': dict(self.priorities),
+                'under_pressure': self._under_pressure(),
+            }
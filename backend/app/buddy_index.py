@@ -0,0 +1,351 @@
+"""
+Travel-buddy matching over registered users.
+
+Each user becomes a sparse vector. Its features are their interests (profile
+interests plus those of every itinerary they created, log-weighted by how
+often they recur), their travel style, and the canonical destinations of their
+trips. The vector is L2-normalized so cosine similarity is a dot product.
+Users are served from a scikit-learn NearestNeighbors index (cosine, brute
+force over a CSR matrix). Users changed since the last build are masked out
+of that index and scored directly from a small pending set. A background
+rebuild folds them back in once `rebuild_threshold` users are pending, or
+every `reload_interval` seconds from storage, so writes never wait on a
+rebuild.
+"""
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+
+logger = logging.getLogger(__name__)
+
+INTEREST_WEIGHT = 1.0
+STYLE_WEIGHT = 0.7
+DESTINATION_WEIGHT = 0.5
+
+INTEREST_ALIASES = {
+    'foodie': 'food', 'cuisine': 'food', 'food & drink': 'food',
+    'hiking': 'trekking', 'trek': 'trekking',
+    'beaches': 'beach', 'museums': 'museum', 'temples': 'temple',
+    'photo': 'photography', 'history & heritage': 'history', 'heritage': 'history',
+    'adventurous': 'adventure', 'nightlife & parties': 'nightlife',
+}
+STYLE_ALIASES = {'adventurous': 'adventure', 'relaxed': 'relaxation', 'budget-friendly': 'budget'}
+
+
+def normalize_interest(text):
+    text = ' '.join(str(text or '').replace('_', ' ').replace('-', ' ').split()).casefold()
+    return INTEREST_ALIASES.get(text, text)
+
+
+def _as_list(value):
+    if isinstance(value, str):
+        return [v for v in value.split(',') if v.strip()]
+    return list(value) if isinstance(value, (list, tuple, set)) else []
+
+
+class BuddyIndex:
+    """Cosine nearest neighbours over user interest/style/destination vectors"""
+
+    def __init__(self, gazetteer, loader=None, rebuild_threshold=500, reload_interval=600):
+        self.gazetteer = gazetteer
+        self.loader = loader
+        self.rebuild_threshold = rebuild_threshold
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._users = {}  # email -> {'id', 'name', 'interests': [...], 'style'}
+        self._itineraries = {}  # itinerary id -> {'email', 'interests': [...], 'destination'}
+        self._by_user = {}  # email -> itinerary ids
+        self._vocab = {}  # feature -> column
+        self._emails = []  # base row -> email
+        self._nn = None
+        self._width = 0
+        self._dirty = set()  # emails whose base row is stale or missing
+        self._building = set()  # emails dirty when the running rebuild took its snapshot
+        self._vectors = {}  # email -> unit vector, for pending users
+        self._rebuilding = False
+        self._loading = False
+        self._load_lock = threading.Lock()
+        self._loaded_at = None
+        self._counters = {'queries': 0, 'rebuilds': 0, 'reloads': 0, 'last_build_ms': 0.0, 'query_ms_total': 0.0}
+
+    # --- vectors ---
+
+    def _features(self, email):
+        """{feature: weight} for a user, before normalization"""
+        # Caller holds the lock
+        user = self._users.get(email) or {}
+        counts = {}
+        destinations = set()
+        for interest in user.get('interests', []):
+            counts[interest] = counts.get(interest, 0) + 1
+        for itinerary_id in self._by_user.get(email, ()):
+            itinerary = self._itineraries[itinerary_id]
+            for interest in itinerary['interests']:
+                counts[interest] = counts.get(interest, 0) + 1
+            if itinerary['destination']:
+                destinations.add(itinerary['destination'])
+        features = {f"i:{interest}": INTEREST_WEIGHT * (1 + math.log(n)) for interest, n in counts.items()}
+        if user.get('style'):
+            features[f"s:{user['style']}"] = STYLE_WEIGHT
+        for destination in destinations:
+            features[f"d:{destination}"] = DESTINATION_WEIGHT
+        return features
+
+    @staticmethod
+    def _unit(features):
+        norm = math.sqrt(sum(w * w for w in features.values()))
+        return {f: w / norm for f, w in features.items()} if norm else {}
+
+    def _vector(self, email):
+        # Caller holds the lock
+        vector = self._vectors.get(email)
+        if vector is None:
+            vector = self._vectors[email] = self._unit(self._features(email))
+        return vector
+
+    def query_vector(self, interests=(), style=None, destination=None, email=None):
+        """Unit feature dict for a request, merged with the requester's own profile when indexed"""
+        with self._lock:
+            features = self._features(email) if email in self._users else {}
+        for interest in {normalize_interest(i) for i in _as_list(interests)} - {''}:
+            features[f"i:{interest}"] = max(features.get(f"i:{interest}", 0.0), INTEREST_WEIGHT)
+        if style:
+            style = normalize_interest(style)
+            features[f"s:{STYLE_ALIASES.get(style, style)}"] = STYLE_WEIGHT
+        if destination:
+            features[f"d:{self.gazetteer.resolve(destination).name}"] = DESTINATION_WEIGHT
+        return self._unit(features)
+
+    # --- incremental updates ---
+
+    def _touch(self, email):
+        # Caller holds the lock
+        self._dirty.add(email)
+        self._vectors.pop(email, None)
+        if len(self._dirty) >= self.rebuild_threshold and not self._loading:
+            self._rebuild_async()
+
+    def upsert_user(self, email, user):
+        """Record (or merge a partial update of) a user's name, interests and travel style"""
+        email = str(email or '').strip().lower()
+        if not email:
+            return
+        with self._lock:
+            old = self._users.get(email, {})
+            style = user.get('travel_style') or user.get('travelStyle')
+            if style:
+                style = normalize_interest(style)
+                style = STYLE_ALIASES.get(style, style)
+            self._users[email] = {
+                'id': user.get('id') or old.get('id'),
+                'name': user.get('fullName') or old.get('name') or email.split('@')[0],
+                'interests': [normalize_interest(i) for i in _as_list(user['interests'])] if 'interests' in user
+                else old.get('interests', []),
+                'style': style or old.get('style'),
+            }
+            self._touch(email)
+
+    def upsert_itinerary(self, itinerary_id, itinerary):
+        """Record (or merge a partial update of) an itinerary's creator, interests and destination"""
+        with self._lock:
+            old = self._itineraries.get(itinerary_id, {})
+            email = str(itinerary.get('creator_email') or old.get('email') or '').strip().lower()
+            if not email:
+                return
+            if old.get('email') and old['email'] != email:
+                self._by_user.get(old['email'], set()).discard(itinerary_id)
+                self._touch(old['email'])
+            destination = itinerary.get('destination')
+            self._itineraries[itinerary_id] = {
+                'email': email,
+                'interests': [normalize_interest(i) for i in _as_list(itinerary['interests'])] if 'interests' in itinerary
+                else old.get('interests', []),
+                'destination': self.gazetteer.resolve(destination).name if destination else old.get('destination'),
+            }
+            self._by_user.setdefault(email, set()).add(itinerary_id)
+            self._touch(email)
+
+    def delete_itinerary(self, itinerary_id):
+        with self._lock:
+            old = self._itineraries.pop(itinerary_id, None)
+            if old is not None:
+                self._by_user.get(old['email'], set()).discard(itinerary_id)
+                self._touch(old['email'])
+
+    # --- index builds ---
+
+    def _rebuild_async(self):
+        # Caller holds the lock
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+        threading.Thread(target=self._rebuild_safely, daemon=True).start()
+
+    def _rebuild_safely(self, reload=False):
+        try:
+            self.reload() if reload else self.rebuild()
+        except Exception as e:
+            logger.warning("Buddy index rebuild failed: %s", e)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def rebuild(self):
+        """Refit the nearest-neighbour index on every user with a non-empty vector"""
+        started = time.perf_counter()
+        with self._lock:
+            self._building = set(self._dirty)
+            self._dirty.clear()
+            vectors = [(email, self._unit(self._features(email))) for email in self._users]
+        emails, rows, cols, values = [], [], [], []
+        with self._lock:
+            for email, vector in vectors:
+                if not vector:
+                    continue
+                row = len(emails)
+                emails.append(email)
+                for feature, weight in vector.items():
+                    rows.append(row)
+                    cols.append(self._vocab.setdefault(feature, len(self._vocab)))
+                    values.append(weight)
+            width = len(self._vocab)
+        nn = None
+        if emails:
+            matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(emails), width), dtype=np.float32)
+            nn = NearestNeighbors(metric='cosine', algorithm='brute').fit(matrix)
+        with self._lock:
+            self._emails, self._nn, self._width = emails, nn, width
+            self._building = set()
+            self._vectors = {email: self._vectors[email] for email in self._dirty if email in self._vectors}
+            self._counters['rebuilds'] += 1
+            self._counters['last_build_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    def reload(self):
+        """Replace everything with a fresh (users, itineraries) snapshot from the loader and rebuild"""
+        users, itineraries = self.loader()
+        with self._lock:
+            self._loading = True
+            try:
+                self._users.clear()
+                self._itineraries.clear()
+                self._by_user.clear()
+                self._vectors.clear()
+                for user in users:
+                    if user.get('email'):
+                        self.upsert_user(user['email'], user)
+                for itinerary in itineraries:
+                    if itinerary.get('id'):
+                        self.upsert_itinerary(itinerary['id'], itinerary)
+            finally:
+                self._loading = False
+            self._loaded_at = time.monotonic()
+            self._counters['reloads'] += 1
+        self.rebuild()
+
+    def load_async(self):
+        """Start the first load on a daemon thread so the first query does not pay for it"""
+        threading.Thread(target=self._ensure_loaded, daemon=True, name='buddy-index-load').start()
+
+    def reload_async(self):
+        """Reload from the loader and rebuild on a daemon thread unless a rebuild is running"""
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_safely, kwargs={'reload': True}, daemon=True).start()
+
+    def _ensure_loaded(self):
+        if self.loader is None:
+            if self._nn is None and self._dirty and not self._rebuilding:
+                self.rebuild()
+            return
+        if self._loaded_at is None:
+            with self._load_lock:
+                if self._loaded_at is None:
+                    self.reload()
+        elif time.monotonic() - self._loaded_at > self.reload_interval:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+                self._loaded_at = time.monotonic()
+            threading.Thread(target=self._rebuild_safely, kwargs={'reload': True}, daemon=True).start()
+
+    # --- queries ---
+
+    def nearest(self, vector, k=3, exclude=()):
+        """[(email, cosine similarity)] best first, over the index and the pending users"""
+        if not vector:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            nn, emails, width = self._nn, self._emails, self._width
+            masked = self._dirty | self._building | set(exclude)
+            pending = [(email, self._vector(email)) for email in self._dirty | self._building
+                       if email in self._users and email not in exclude]
+            columns = [(self._vocab[f], w) for f, w in vector.items() if self._vocab.get(f, width) < width]
+        scored = {}
+        if nn is not None and columns:
+            cols, values = zip(*columns)
+            query = sparse.csr_matrix((values, ([0] * len(cols), cols)), shape=(1, width), dtype=np.float32)
+            n = min(len(emails), k + len(masked))
+            distances, indices = nn.kneighbors(query, n_neighbors=n)
+            for distance, row in zip(distances[0], indices[0]):
+                if emails[row] not in masked and distance < 1.0:
+                    scored[emails[row]] = 1.0 - float(distance)
+        for email, other in pending:
+            similarity = sum(w * other.get(f, 0.0) for f, w in vector.items())
+            if similarity > 0:
+                scored[email] = similarity
+        return sorted(scored.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def match(self, data, k=3):
+        """buddy-match answer: real users closest to the request's interests and style"""
+        started = time.perf_counter()
+        email = str(data.get('email') or '').strip().lower()
+        vector = self.query_vector(data.get('interests', []), data.get('travel_style'), data.get('destination'), email)
+        matches = []
+        for other, similarity in self.nearest(vector, k, exclude={email} if email else ()):
+            with self._lock:
+                user = self._users.get(other)
+                features = self._features(other)
+            if user is None:
+                continue
+            theirs = sorted((f[2:] for f in features if f.startswith('i:')), key=lambda f: -features[f"i:{f}"])
+            shared = [i for i in theirs if f"i:{i}" in vector]
+            places = [f[2:] for f in features if f.startswith('d:') and f in vector]
+            reason = f"You both love {', '.join(shared[:3])}" if shared else "Similar travel style"
+            if places:
+                reason += f" and have planned trips to {', '.join(places[:2])}"
+            matches.append({
+                'user_id': user['id'],
+                'name': user['name'],
+                'match_score': int(round(similarity * 100)),
+                'reason': reason + '.',
+                'interests': (shared + [i for i in theirs if i not in shared])[:2],
+                'shared_interests': shared,
+                'travel_style': user.get('style'),
+            })
+        with self._lock:
+            self._counters['queries'] += 1
+            self._counters['query_ms_total'] += (time.perf_counter() - started) * 1000
+        return {'matches': matches, 'source': 'local'}
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            queries = counters.pop('query_ms_total')
+            return {
+                **counters,
+                'avg_query_ms': round(queries / counters['queries'], 2) if counters['queries'] else 0.0,
+                'users': len(self._users),
+                'indexed': len(self._emails),
+                'pending': len(self._dirty | self._building),
+                'features': len(self._vocab),
+                'rebuilding': self._rebuilding,
+            }
@@ -0,0 +1,351 @@
+"""
+Budget breakdowns from what travellers actually spent.
+
+The model keeps a light copy of every expense (itinerary, category,
+currency, amount), running per-itinerary totals by currency and category,
+and each itinerary's destination, party size and length. A destination's
+budget is built with pandas from the percentiles of per-traveler-day spend
+per category, across itineraries to that destination; an itinerary with no
+spend in a category counts as 0 there rather than dropping out.
+If a destination has fewer than `min_samples` itineraries, its country is
+used; with too few there either, there is no local answer and the caller asks
+the model (trips elsewhere say little about this one). Percentiles are kept
+per currency and a request is only matched against its own currency
+(`currency`, INR unless the expense or request names another), so rupee
+budgets are never compared with dollar spend. Percentile tables are cached per group. An expense or
+itinerary write only invalidates the groups it touches, so the next request
+recomputes one small group rather than the whole collection. A full reload
+from storage runs every `reload_interval` seconds so that writes made by
+other workers are picked up. It runs on a daemon thread and builds new
+tables off the lock, so requests keep the current ones until it swaps them
+in; writes that arrive meanwhile are replayed onto the new tables.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('accommodation', 'food', 'transport', 'activities', 'misc')
+CATEGORY_ALIASES = {
+    'stay': 'accommodation', 'hotel': 'accommodation', 'lodging': 'accommodation', 'hostel': 'accommodation',
+    'dining': 'food', 'meals': 'food', 'restaurant': 'food', 'drinks': 'food',
+    'travel': 'transport', 'taxi': 'transport', 'cab': 'transport', 'fuel': 'transport', 'flight': 'transport',
+    'sightseeing': 'activities', 'tickets': 'activities', 'entertainment': 'activities', 'tours': 'activities',
+    'shopping': 'misc', 'other': 'misc', 'others': 'misc',
+}
+QUANTILES = (0.25, 0.5, 0.75)
+
+SAVING_TIPS = {
+    'accommodation': "Stay a little outside the centre or book homestays; rooms are the biggest lever on most trips.",
+    'food': "Eat where locals eat and keep restaurant meals for one sitting a day.",
+    'transport': "Use trains, buses or shared cabs between sights, and book intercity tickets early.",
+    'activities': "Look for combined passes and free walking tours; pay only for the sights you care most about.",
+    'misc': "Set a daily cap for shopping and extras and carry that amount in cash.",
+}
+
+
+def normalize_category(category):
+    category = str(category or 'misc').strip().lower()
+    return category if category in CATEGORIES else CATEGORY_ALIASES.get(category, 'misc')
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _trip_days(itinerary):
+    """Inclusive day count from the itinerary's dates, or None when undated"""
+    start = itinerary.get('startDate') or itinerary.get('start_date')
+    end = itinerary.get('endDate') or itinerary.get('end_date')
+    try:
+        start, end = datetime.fromisoformat(str(start)[:10]), datetime.fromisoformat(str(end)[:10])
+    except ValueError:
+        return None
+    return max(1, (end - start).days + 1)
+
+
+class BudgetModel:
+    """Cached percentile budgets per destination and country"""
+
+    def __init__(self, gazetteer, loader=None, min_samples=3, reload_interval=600, currency='INR'):
+        self.gazetteer = gazetteer
+        self.currency = currency.upper()
+        self.loader = loader
+        self.min_samples = min_samples
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._expenses = {}  # expense id -> (itinerary id, category, currency, amount)
+        self._spend = {}  # itinerary id -> {(currency, category): total amount}
+        self._itineraries = {}  # itinerary id -> {'destination', 'country', 'travelers', 'days'}
+        self._members = {}  # ('destination', name) / ('country', code) -> itinerary ids
+        self._tables = {}  # group -> percentile table, dropped when the group changes
+        self._loaded_at = None
+        self._reloading = False
+        self._journal = None  # writes made while a reload is building, replayed onto its tables
+        self._counters = {'reloads': 0, 'group_builds': 0, 'cache_hits': 0, 'invalidations': 0, 'answered': 0, 'no_data': 0}
+
+    # --- incremental updates ---
+
+    def _groups_for(self, meta):
+        groups = [('destination', meta['destination'])]
+        if meta.get('country'):
+            groups.append(('country', meta['country']))
+        return groups
+
+    def _record(self, method, *args):
+        # Caller holds the lock
+        if self._journal is not None:
+            self._journal.append((method, args))
+
+    def _invalidate(self, itinerary_id):
+        # Caller holds the lock
+        meta = self._itineraries.get(itinerary_id)
+        if meta is None:
+            return
+        for group in self._groups_for(meta):
+            if self._tables.pop(group, None) is not None:
+                self._counters['invalidations'] += 1
+
+    def upsert_itinerary(self, itinerary_id, itinerary):
+        """Record (or merge a partial update of) an itinerary's destination, size and dates"""
+        with self._lock:
+            self._record('upsert_itinerary', itinerary_id, itinerary)
+            self._invalidate(itinerary_id)
+            old = self._itineraries.pop(itinerary_id, None)
+            if old is not None:
+                for group in self._groups_for(old):
+                    self._members.get(group, set()).discard(itinerary_id)
+            merged = {**(old or {}).get('raw', {}), **{k: v for k, v in itinerary.items() if v not in (None, '')}}
+            resolution = self.gazetteer.resolve(merged.get('destination', ''))
+            meta = {
+                'raw': {k: merged.get(k) for k in ('destination', 'travelers', 'startDate', 'endDate', 'start_date', 'end_date')},
+                'destination': resolution.name,
+                'country': resolution.place.country if resolution.place else None,
+                'travelers': max(1, int(_as_float(merged.get('travelers')) or 1)),
+                'days': _trip_days(merged),
+            }
+            self._itineraries[itinerary_id] = meta
+            for group in self._groups_for(meta):
+                self._members.setdefault(group, set()).add(itinerary_id)
+            self._invalidate(itinerary_id)
+
+    def delete_itinerary(self, itinerary_id):
+        with self._lock:
+            self._record('delete_itinerary', itinerary_id)
+            self._invalidate(itinerary_id)
+            meta = self._itineraries.pop(itinerary_id, None)
+            if meta is not None:
+                for group in self._groups_for(meta):
+                    self._members.get(group, set()).discard(itinerary_id)
+
+    def upsert_expense(self, expense_id, expense):
+        """Record (or merge a partial update of) one expense"""
+        with self._lock:
+            self._record('upsert_expense', expense_id, expense)
+            old = self._expenses.get(expense_id)
+            itinerary_id = expense.get('itineraryId') or expense.get('itinerary_id') or (old[0] if old else '')
+            category = normalize_category(expense['category']) if 'category' in expense else (old[1] if old else 'misc')
+            currency = str(expense.get('currency') or (old[2] if old else self.currency)).upper()
+            amount = _as_float(expense['amount']) if 'amount' in expense else (old[3] if old else 0.0)
+            if old is not None:
+                self._invalidate(old[0])
+                self._add_spend(old, -1)
+            new = (itinerary_id, category, currency, amount)
+            self._expenses[expense_id] = new
+            self._add_spend(new, 1)
+            self._invalidate(itinerary_id)
+
+    def delete_expense(self, expense_id):
+        with self._lock:
+            self._record('delete_expense', expense_id)
+            old = self._expenses.pop(expense_id, None)
+            if old is not None:
+                self._invalidate(old[0])
+                self._add_spend(old, -1)
+
+    def _add_spend(self, expense, sign):
+        # Caller holds the lock
+        itinerary_id, category, currency, amount = expense
+        totals = self._spend.setdefault(itinerary_id, {})
+        total = totals.get((currency, category), 0.0) + sign * amount
+        if abs(total) < 1e-9:
+            totals.pop((currency, category), None)
+            if not totals:
+                del self._spend[itinerary_id]
+        else:
+            totals[(currency, category)] = total
+
+    def reload(self):
+        """Replace everything with a fresh (itineraries, expenses) snapshot from the loader"""
+        with self._lock:
+            self._journal = []
+        try:
+            itineraries, expenses = self.loader()
+            fresh = BudgetModel(self.gazetteer, min_samples=self.min_samples, currency=self.currency)
+            for itinerary in itineraries:
+                if itinerary.get('id'):
+                    fresh.upsert_itinerary(itinerary['id'], itinerary)
+            for expense in expenses:
+                if expense.get('id'):
+                    fresh.upsert_expense(expense['id'], expense)
+            with self._lock:
+                for method, args in self._journal:
+                    getattr(fresh, method)(*args)
+                self._expenses, self._spend = fresh._expenses, fresh._spend
+                self._itineraries, self._members = fresh._itineraries, fresh._members
+                self._tables = {}
+                self._loaded_at = time.monotonic()
+                self._counters['reloads'] += 1
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def reload_async(self):
+        """Reload on a daemon thread unless one is already running"""
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload_safely, daemon=True, name='budget-model-reload').start()
+
+    def _reload_safely(self):
+        try:
+            self.reload()
+        except Exception as e:
+            logger.warning("Budget model reload failed: %s", e)
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def _ensure_loaded(self):
+        if self.loader is None:
+            return
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_interval:
+            self.reload_async()
+
+    # --- percentiles ---
+
+    def _table(self, group):
+        """{'currency': {'itineraries': n, 'percentiles': DataFrame(category x quantile)}} for a group"""
+        # Caller holds the lock
+        table = self._tables.get(group)
+        if table is not None:
+            self._counters['cache_hits'] += 1
+            return table
+        rows = []
+        for itinerary_id in self._members.get(group, set()):
+            meta = self._itineraries[itinerary_id]
+            spend = self._spend.get(itinerary_id, {})
+            if not meta['days'] or not spend:
+                continue
+            units = meta['travelers'] * meta['days']
+            # Every category gets a row, 0 where this trip spent nothing on it
+            rows.extend(
+                (itinerary_id, currency, category, max(0.0, spend.get((currency, category), 0.0)) / units)
+                for currency in {currency for currency, _ in spend} for category in CATEGORIES
+            )
+        table = {}
+        if rows:
+            spend = pd.DataFrame(rows, columns=['itinerary', 'currency', 'category', 'per_unit'])
+            for currency, frame in spend.groupby('currency'):
+                by_category = frame.groupby('category')['per_unit']
+                # Only categories some trip in the group spent on
+                percentiles = by_category.quantile(list(QUANTILES)).unstack()[by_category.max() > 0]
+                table[currency] = {'itineraries': frame['itinerary'].nunique(), 'percentiles': percentiles}
+        self._tables[group] = table
+        self._counters['group_builds'] += 1
+        return table
+
+    def estimate(self, destination, travelers=1, days=1, currency=None):
+        """Per-category p25/p50/p75 cost in `currency` (default: the model's) from the narrowest group with enough data, or None"""
+        self._ensure_loaded()
+        resolution = self.gazetteer.resolve(destination)
+        groups = [('destination', resolution.name)]
+        if resolution.place is not None:
+            groups.append(('country', resolution.place.country))
+        currency = str(currency).strip().upper() if currency else self.currency
+        with self._lock:
+            for group in groups:
+                entry = self._table(group).get(currency)
+                if entry is None or entry['itineraries'] < self.min_samples:
+                    continue
+                scaled = entry['percentiles'] * (travelers * days)
+                self._counters['answered'] += 1
+                return {
+                    'level': group[0],
+                    'basis': resolution.name if group[0] == 'destination' else self.gazetteer.country_name(group[1]),
+                    'itineraries': entry['itineraries'],
+                    'currency': currency,
+                    'percentiles': {
+                        category: {f"p{int(q * 100)}": round(float(row[q]), 2) for q in QUANTILES}
+                        for category, row in scaled.iterrows()
+                    },
+                }
+            self._counters['no_data'] += 1
+        return None
+
+    def optimize(self, data):
+        """optimize-budget answer for a request payload, or None without enough history"""
+        try:
+            travelers = max(1, int(data.get('travelers') or 1))
+            days = max(1, int(data.get('trip_duration') or data.get('days') or 1))
+        except (TypeError, ValueError):
+            return None
+        estimate = self.estimate(data.get('destination', ''), travelers, days, data.get('currency'))
+        if estimate is None:
+            return None
+        percentiles = estimate['percentiles']
+        breakdown = {category: round(p['p50']) for category, p in percentiles.items()}
+        minimum = round(sum(p['p25'] for p in percentiles.values()))
+        typical = round(sum(breakdown.values()))
+        comfortable = round(sum(p['p75'] for p in percentiles.values()))
+        budget = _as_float(data.get('current_budget'))
+        symbol = '₹' if estimate['currency'] == 'INR' else estimate['currency'] + ' '
+
+        recommendations = []
+        basis = f"{estimate['itineraries']} past trips to {estimate['basis']}"
+        if budget and budget < minimum:
+            recommendations.append(
+                f"{symbol}{budget:,.0f} is below what the thriftiest quarter of {basis} spent ({symbol}{minimum:,.0f}); "
+                f"trim the trip length or the party size, or plan for about {symbol}{minimum - budget:,.0f} more.")
+        elif budget and budget < typical:
+            recommendations.append(
+                f"{symbol}{budget:,.0f} is workable but under the typical spend of {basis} ({symbol}{typical:,.0f}); "
+                "book stays and transport early.")
+        elif budget:
+            recommendations.append(
+                f"{symbol}{budget:,.0f} covers the typical spend of {basis} ({symbol}{typical:,.0f})"
+                + (f" and even a comfortable trip ({symbol}{comfortable:,.0f})." if budget >= comfortable else "."))
+        largest = sorted(breakdown, key=breakdown.get, reverse=True)
+        for category in largest[:3 - len(recommendations)]:
+            share = 100 * breakdown[category] / typical if typical else 0
+            recommendations.append(f"{category.title()} is {share:.0f}% of typical spend. {SAVING_TIPS[category]}")
+
+        return {
+            'current_budget': budget,
+            'minimum_recommended_budget': minimum,
+            'recommended_budget': typical,
+            'comfortable_budget': comfortable,
+            'cost_breakdown': breakdown,
+            'percentiles': percentiles,
+            'recommendations': recommendations,
+            'basis': {k: estimate[k] for k in ('level', 'basis', 'itineraries', 'currency')},
+            'source': 'local',
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'expenses': len(self._expenses),
+                'itineraries': len(self._itineraries),
+                'cached_groups': len(self._tables),
+                'loaded_age': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            }
@@ -0,0 +1,114 @@
+"""
+Newline-delimited JSON export and import for the storage collections.
+
+`export_ndjson` walks a collection with Collection.iterate(), which fetches
+`batch_size` documents at a time (a Mongo cursor batch, or a keyset page in
+memory), and yields one JSON line per document, so a Flask streaming
+response or a file write never holds more than one batch. `import_ndjson`
+reads lines the same way and inserts them with Collection.insert_many in
+unordered batches; existing ids are skipped and counted, not overwritten.
+Both report throughput in docs/sec.
+"""
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+EXPORTABLE = ('itineraries', 'expenses', 'bookings')
+MAX_REPORTED_ERRORS = 20
+
+
+class TransferStats:
+    """Counters and timing for one export or import"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.started = time.monotonic()
+        self.seconds = 0.0
+        self.docs = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+
+    def finish(self):
+        self.seconds = time.monotonic() - self.started
+        return self
+
+    def invalid_line(self, line_no, reason):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_no, 'error': reason})
+
+    def to_dict(self):
+        return {
+            'collection': self.collection,
+            'docs': self.docs,
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'docs_per_sec': round(self.docs / self.seconds) if self.seconds > 0 else None,
+        }
+
+
+def iter_lines(stream, chunk_size=64 * 1024):
+    """Lines of a binary stream, read in large chunks (per-line reads are slow on WSGI input)"""
+    tail = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def export_ndjson(collection, name, fields=None, batch_size=1000, stats=None):
+    """Yield one JSON line per document of `collection`"""
+    stats = stats or TransferStats(name)
+    for doc in collection.iterate(fields=fields, batch_size=batch_size):
+        stats.docs += 1
+        yield json.dumps(doc, ensure_ascii=False, default=str) + '\n'
+    stats.finish()
+    logger.info("Exported %s %s in %.2fs (%s docs/sec)", stats.docs, name, stats.seconds,
+                stats.to_dict()['docs_per_sec'], extra={'collection': name, 'docs': stats.docs})
+
+
+def import_ndjson(collection, name, lines, batch_size=1000):
+    """Insert the JSON objects in `lines` (str or bytes) in unordered batches; returns TransferStats"""
+    stats = TransferStats(name)
+    batch = []
+
+    def flush():
+        result = collection.insert_many(batch)
+        stats.inserted += result['inserted']
+        stats.duplicates += result['duplicates']
+        batch.clear()
+
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            doc = json.loads(line)
+        except ValueError as e:
+            stats.invalid_line(line_no, f"invalid JSON: {e}")
+            continue
+        if not isinstance(doc, dict) or not doc.get(collection.key):
+            stats.invalid_line(line_no, f"not an object with '{collection.key}'")
+            continue
+        doc.pop('_id', None)
+        stats.docs += 1
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    stats.finish()
+    logger.info("Imported %s %s in %.2fs (%s docs/sec)", stats.inserted, name, stats.seconds,
+                stats.to_dict()['docs_per_sec'], extra={'collection': name, 'docs': stats.docs})
+    return stats
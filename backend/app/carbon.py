@@ -0,0 +1,234 @@
+"""
+Deterministic trip emissions for the eco-score route.
+
+Each leg's great-circle distance comes from gazetteer coordinates (haversine).
+It is stretched by a per-mode routing factor and multiplied by DEFRA-style
+emission factors: kg CO2e per passenger-km for shared transport, and per
+vehicle-km for cars, cabs, jeeps and bikes, which are divided over the
+vehicles the party needs. All legs and all transport modes are computed in
+one NumPy pass. That pass gives the chosen trip's footprint and also what the
+same route would cost in every other mode, which drives the rating and the
+suggested alternatives.
+"""
+import math
+
+import numpy as np
+
+# Transport types offered by /api/transport/options, plus a private car
+MODES = ('airplane', 'train', 'bus', 'jeep', 'bike', 'cab', 'car')
+
+# kg CO2e per passenger-km (shared) or per vehicle-km (per_vehicle), road/rail
+# distance over great-circle distance, and seats per vehicle. Flights use
+# FLIGHT_BANDS by distance instead of the single factor.
+EMISSION_FACTORS = {
+    'airplane': {'factor': 0.186, 'per_vehicle': False, 'circuity': 1.08, 'seats': 1},
+    'train': {'factor': 0.035, 'per_vehicle': False, 'circuity': 1.2, 'seats': 1},
+    'bus': {'factor': 0.027, 'per_vehicle': False, 'circuity': 1.3, 'seats': 1},
+    'jeep': {'factor': 0.209, 'per_vehicle': True, 'circuity': 1.3, 'seats': 7},
+    'bike': {'factor': 0.114, 'per_vehicle': True, 'circuity': 1.3, 'seats': 2},
+    'cab': {'factor': 0.171, 'per_vehicle': True, 'circuity': 1.3, 'seats': 4},
+    'car': {'factor': 0.171, 'per_vehicle': True, 'circuity': 1.3, 'seats': 4},
+}
+
+# Flights: (upper bound of great-circle km, kg CO2e per passenger-km). Short
+# hops spend proportionally more fuel on take-off and climb.
+FLIGHT_BANDS = ((500.0, 0.273), (3700.0, 0.186), (float('inf'), 0.150))
+
+# kg CO2e per passenger-km that maps to a rating of 10 and of 1 (log scale)
+RATING_BEST = 0.02
+RATING_WORST = 0.25
+
+# Modes suggested as alternatives need a plausible road/rail or air connection
+MIN_FLIGHT_KM = 300.0
+MAX_BIKE_KM = 800.0
+
+# Shorter flight legs are not scheduled routes; the payload goes to the model
+MIN_FLIGHT_LEG_KM = 100.0
+
+# A destination this close to the assumed default origin says nothing about
+# where the trip starts, so only an explicit origin is priced locally
+MIN_ASSUMED_ORIGIN_KM = 50.0
+
+# Countries linked overland (road/rail, short ferries). Surface modes are only
+# priced within one country or one group; anything else needs a flight.
+SURFACE_GROUPS = {
+    'IN': 'south-asia', 'NP': 'south-asia', 'BT': 'south-asia',
+    'GB': 'europe', 'FR': 'europe', 'NL': 'europe', 'CZ': 'europe', 'AT': 'europe',
+    'CH': 'europe', 'IT': 'europe', 'ES': 'europe', 'PT': 'europe', 'TR': 'europe',
+    'CN': 'east-asia', 'HK': 'east-asia', 'VN': 'east-asia', 'KH': 'east-asia',
+    'TH': 'east-asia', 'MY': 'east-asia', 'SG': 'east-asia',
+}
+
+TIPS = {
+    'airplane': "Fly direct and economy: take-off and climb burn the most fuel, and premium seats carry a larger share.",
+    'train': "Rail is already one of the lowest-carbon options; use metro, buses or walking at the destination too.",
+    'bus': "Coaches are among the lowest-carbon ways to travel; walk or cycle for short hops at the destination.",
+    'jeep': "Fill every seat: an SUV's emissions are shared by everyone riding in it.",
+    'bike': "Ride at steady speeds and keep tyres inflated to cut fuel use.",
+    'cab': "Share the ride or pick a CNG/electric cab; emissions per person fall with every extra passenger.",
+    'car': "Carpool and keep speeds moderate; emissions per person fall with every extra passenger.",
+}
+
+GENERAL_TIPS = [
+    "Pack light: every extra kilo adds fuel burn on planes, buses and cars alike.",
+    "Offset what you can't avoid through a certified (Gold Standard or VCS) project.",
+]
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts scalars or NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class CarbonCalculator:
+    """Multi-leg trip footprints over gazetteer coordinates"""
+
+    def __init__(self, gazetteer, factors=None, default_origin=None):
+        self.gazetteer = gazetteer
+        self.factors = EMISSION_FACTORS if factors is None else factors
+        self.default_origin = default_origin
+        modes = [m for m in MODES if m in self.factors]
+        self.modes = tuple(modes)
+        self._index = {m: i for i, m in enumerate(modes)}
+        self._factor = np.array([self.factors[m]['factor'] for m in modes])
+        self._per_vehicle = np.array([self.factors[m]['per_vehicle'] for m in modes])
+        self._circuity = np.array([self.factors[m]['circuity'] for m in modes])
+        self._seats = np.array([self.factors[m]['seats'] for m in modes], dtype=float)
+        self._air = np.array([m == 'airplane' for m in modes])
+        self._band_limits = np.array([limit for limit, _ in FLIGHT_BANDS])
+        self._band_factors = np.array([factor for _, factor in FLIGHT_BANDS])
+
+    def mode_for(self, text):
+        mode = str(text or 'car').strip().lower()
+        return mode if mode in self._index else None
+
+    @staticmethod
+    def overland(a, b):
+        """Whether places a and b are connected by road or rail"""
+        return a.country == b.country or (
+            SURFACE_GROUPS.get(a.country) is not None and SURFACE_GROUPS.get(a.country) == SURFACE_GROUPS.get(b.country))
+
+    def locate(self, text):
+        """Gazetteer place with coordinates for free text, else None"""
+        place = self.gazetteer.resolve(text).place
+        if place is None or place.lat is None or place.lon is None:
+            return None
+        return place
+
+    def emissions(self, lat1, lon1, lat2, lon2, travelers=1):
+        """(great-circle km per leg, kg CO2e per leg x mode) for the whole party"""
+        km = haversine_km(lat1, lon1, lat2, lon2)
+        distance = km[:, None] * self._circuity[None, :]
+        band = np.searchsorted(self._band_limits, km, side='left')
+        flight = self._band_factors[np.minimum(band, len(self._band_factors) - 1)]
+        factor = np.where(self._air[None, :], flight[:, None], self._factor[None, :])
+        vehicles = np.ceil(travelers / self._seats)
+        party = np.where(self._per_vehicle, vehicles, float(travelers))
+        return km, distance * factor * party[None, :]
+
+    def rating(self, kg_per_passenger_km):
+        """1-10, 10 for the cleanest options, on a log scale between RATING_BEST and RATING_WORST"""
+        if kg_per_passenger_km <= 0:
+            return 10
+        span = math.log(RATING_WORST / RATING_BEST)
+        score = 10 - 9 * math.log(max(kg_per_passenger_km, RATING_BEST) / RATING_BEST) / span
+        return int(round(min(10.0, max(1.0, score))))
+
+    def legs_for(self, data):
+        """[(from_place, to_place, mode)] for a payload; None if a place or mode is unknown,
+        a surface mode is asked to cross water, a flight leg is shorter than MIN_FLIGHT_LEG_KM,
+        or the destination lies within MIN_ASSUMED_ORIGIN_KM of an assumed origin
+
+        Accepts explicit `legs` ([{from, to, transport_type}]), a `route` list of
+        stops travelled with `transport_type`, or `origin`/`source` -> `destination`.
+        """
+        default_mode = data.get('transport_type') or 'car'
+        assumed = False
+        if isinstance(data.get('legs'), list) and data['legs']:
+            raw = [(leg.get('from'), leg.get('to'), leg.get('transport_type') or default_mode)
+                   for leg in data['legs'] if isinstance(leg, dict)]
+        elif isinstance(data.get('route'), list) and len(data['route']) >= 2:
+            raw = [(a, b, default_mode) for a, b in zip(data['route'], data['route'][1:])]
+        else:
+            origin = data.get('origin') or data.get('source')
+            assumed = not origin
+            raw = [(origin or self.default_origin, data.get('destination'), default_mode)]
+        legs = []
+        for start, end, mode in raw:
+            start, end, mode = self.locate(start), self.locate(end), self.mode_for(mode)
+            if start is None or end is None or mode is None:
+                return None
+            if mode != 'airplane' and not self.overland(start, end):
+                return None
+            km = float(haversine_km(start.lat, start.lon, end.lat, end.lon))
+            if mode == 'airplane' and km < MIN_FLIGHT_LEG_KM:
+                return None
+            if assumed and km < MIN_ASSUMED_ORIGIN_KM:
+                return None
+            legs.append((start, end, mode))
+        return legs or None
+
+    def score(self, data):
+        """Eco-score answer for a payload, or None when a place or mode is outside the tables"""
+        legs = self.legs_for(data)
+        if legs is None:
+            return None
+        try:
+            travelers = max(1, min(int(data.get('travelers') or 1), 100))
+        except (TypeError, ValueError):
+            travelers = 1
+        round_trip = str(data.get('round_trip', True)).lower() == 'true'
+        trips = 2 if round_trip else 1
+
+        coords = np.array([[a.lat, a.lon, b.lat, b.lon] for a, b, _ in legs], dtype=float)
+        km, per_mode = self.emissions(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3], travelers)
+        chosen = np.array([self._index[mode] for _, _, mode in legs])
+        rows = np.arange(len(legs))
+        leg_kg = per_mode[rows, chosen] * trips
+        leg_km = km * self._circuity[chosen] * trips
+        total_kg = float(leg_kg.sum())
+        total_km = float(leg_km.sum())
+        intensity = total_kg / (total_km * travelers) if total_km else 0.0
+
+        # The same route in a single mode, for comparison
+        all_modes = per_mode.sum(axis=0) * trips
+        longest = float(km.max())
+        overland = all(self.overland(a, b) for a, b, _ in legs)
+        comparison = {
+            mode: round(float(all_modes[i]), 1) for i, mode in enumerate(self.modes)
+            if (mode == 'airplane' and longest >= MIN_FLIGHT_KM)
+            or (mode != 'airplane' and overland and (mode != 'bike' or longest <= MAX_BIKE_KM))
+        }
+        primary = legs[int(np.argmax(leg_km))][2]
+        alternatives = []
+        for mode, kg in sorted(comparison.items(), key=lambda item: item[1]):
+            if kg < total_kg * 0.9 and len(alternatives) < 2:
+                saved = 100 * (1 - kg / total_kg)
+                alternatives.append(f"Going by {mode} instead would emit about {kg:,.0f} kg CO2 ({saved:.0f}% less).")
+        alternatives.append(TIPS.get(primary, TIPS['car']))
+        alternatives += GENERAL_TIPS[:max(0, 3 - len(alternatives))]
+
+        return {
+            'co2_kg': round(total_kg, 1),
+            'co2_kg_per_traveler': round(total_kg / travelers, 1),
+            'rating': self.rating(intensity),
+            'alternatives': alternatives,
+            'distance_km': round(total_km, 1),
+            'travelers': travelers,
+            'round_trip': round_trip,
+            'origin_assumed': not any(data.get(k) for k in ('legs', 'route', 'origin', 'source')),
+            'transport_type': primary,
+            'legs': [
+                {
+                    'from': a.name, 'to': b.name, 'transport_type': mode,
+                    'distance_km': round(float(leg_km[i]), 1), 'co2_kg': round(float(leg_kg[i]), 1),
+                }
+                for i, (a, b, mode) in enumerate(legs)
+            ],
+            'comparison': comparison,
+            'source': 'local',
+        }
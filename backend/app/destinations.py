@@ -0,0 +1,227 @@
+"""
+Destination canonicalization over a local gazetteer (data/gazetteer.json).
+
+Free-text destinations are normalized (Unicode NFKC, accents and punctuation
+stripped, case-folded), looked up in an alias table, retried without
+qualifiers ("Goa, India", "Taj Mahal, Agra") and finally fuzzy-matched, so
+"Goa", "goa ", "Goa, India" and "GOA" all resolve to the same place id. A
+qualifier must name the place's country or a parent place: "Paris, Texas"
+stays unresolved and is passed through as typed. Routes build
+prompts from the canonical name, which makes them share cache entries.
+"""
+import difflib
+import json
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_NON_WORD = re.compile(r"[^\w]+")
+_QUALIFIER_SPLIT = re.compile(r'\s*[,/()|;]\s*|\s+-\s+')
+
+
+def normalize(text):
+    """Case-, accent-, punctuation- and whitespace-insensitive form of text"""
+    text = unicodedata.normalize('NFKD', unicodedata.normalize('NFKC', str(text or '')))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', text.casefold().replace('_', ' ')).strip()
+
+
+class Place:
+    __slots__ = ('id', 'name', 'country', 'kind', 'lat', 'lon', 'parent')
+
+    def __init__(self, entry):
+        self.id = entry['id']
+        self.name = entry['name']
+        self.country = entry.get('country')
+        self.kind = entry.get('kind', 'city')
+        self.lat = entry.get('lat')
+        self.lon = entry.get('lon')
+        self.parent = entry.get('parent')
+
+    def to_dict(self):
+        return {s: getattr(self, s) for s in self.__slots__}
+
+
+class Resolution:
+    """Outcome of resolving one free-text destination"""
+    __slots__ = ('text', 'place', 'method', 'score')
+
+    def __init__(self, text, place=None, method='unresolved', score=0.0):
+        self.text = text
+        self.place = place
+        self.method = method
+        self.score = score
+
+    @property
+    def id(self):
+        return self.place.id if self.place else None
+
+    @property
+    def name(self):
+        """Canonical name, or the input with whitespace collapsed when unknown"""
+        return self.place.name if self.place else ' '.join(str(self.text or '').split())
+
+    def to_dict(self):
+        return {
+            'input': self.text,
+            'id': self.id,
+            'name': self.name,
+            'method': self.method,
+            'score': round(self.score, 3),
+            'place': self.place.to_dict() if self.place else None,
+        }
+
+
+class Gazetteer:
+    """Alias table plus fuzzy fallback mapping free text to Place records"""
+
+    def __init__(self, data, fuzzy_cutoff=0.86, memo_size=4096):
+        self.places = {}
+        self.countries = {}
+        self._aliases = {}
+        self._country_aliases = {}
+        for code, country in (data.get('countries') or {}).items():
+            self.countries[code] = country['name']
+            for alias in [country['name'], code] + list(country.get('aliases', [])):
+                self._country_aliases[normalize(alias)] = code
+        for entry in data.get('places', []):
+            place = Place(entry)
+            self.places[place.id] = place
+            for alias in [place.name, place.id] + list(entry.get('aliases', [])):
+                self._aliases.setdefault(normalize(alias), place.id)
+        self._alias_keys = list(self._aliases)
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+        self._counters = {'resolved': 0, 'unresolved': 0, 'merged_variants': 0}
+        self._by_method = {}
+        self._variants = {}  # place id -> distinct raw inputs seen
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    def get(self, place_id):
+        return self.places.get(place_id)
+
+    def country_name(self, code):
+        return self.countries.get(code)
+
+    def resolve(self, text):
+        """Resolution for text; never raises, unknown input comes back unresolved"""
+        key = normalize(text)
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+        if cached is None:
+            place_id, method, score = self._lookup(text, key)
+            cached = (place_id, method, score)
+            with self._lock:
+                self._memo[key] = cached
+                if len(self._memo) > self._memo_size:
+                    self._memo.popitem(last=False)
+        place_id, method, score = cached
+        resolution = Resolution(text, self.places.get(place_id), method, score)
+        self._record(str(text or ''), resolution)
+        return resolution
+
+    def canonical_name(self, text):
+        return self.resolve(text).name
+
+    def country_code(self, text):
+        """ISO code of a country named anywhere in text ("France", "somewhere in Japan"), or None"""
+        key = normalize(text)
+        if key in self._country_aliases:
+            return self._country_aliases[key]
+        for part in reversed([normalize(p) for p in _QUALIFIER_SPLIT.split(str(text or ''))]):
+            if part in self._country_aliases:
+                return self._country_aliases[part]
+            words = part.split()
+            for n in (3, 2, 1):
+                if len(words) > n and ' '.join(words[-n:]) in self._country_aliases:
+                    return self._country_aliases[' '.join(words[-n:])]
+        return None
+
+    def _lookup(self, text, key):
+        if not key:
+            return None, 'unresolved', 0.0
+        place_id = self._aliases.get(key)
+        if place_id:
+            exact = key == normalize(self.places[place_id].name)
+            return place_id, 'exact' if exact else 'alias', 1.0
+
+        # "Goa, India" / "Taj Mahal (Agra)" / "Paris France"
+        parts = [normalize(p) for p in _QUALIFIER_SPLIT.split(str(text)) if normalize(p)]
+        if len(parts) == 1:
+            words = key.split()
+            for n in (3, 2, 1):
+                if len(words) > n and ' '.join(words[-n:]) in self._country_aliases:
+                    parts = [' '.join(words[:-n]), ' '.join(words[-n:])]
+                    break
+        if len(parts) > 1:
+            named = False
+            for i, part in enumerate(parts):
+                place_id = self._aliases.get(part)
+                if not place_id:
+                    continue
+                named = True
+                if all(self._qualifies(place_id, q) for q in parts[:i] + parts[i + 1:]):
+                    return place_id, 'qualified', 1.0
+            if named:
+                # "Paris, Texas": a known name qualified by something that is not
+                # its country or region is a different place we have no record of
+                return None, 'unresolved', 0.0
+
+        if len(key) >= 4:
+            match = difflib.get_close_matches(key, self._alias_keys, n=1, cutoff=self.fuzzy_cutoff)
+            if match:
+                score = difflib.SequenceMatcher(None, key, match[0]).ratio()
+                return self._aliases[match[0]], 'fuzzy', score
+        return None, 'unresolved', 0.0
+
+    def _qualifies(self, place_id, qualifier):
+        """Whether qualifier names place_id's country or one of its parent places"""
+        place = self.places[place_id]
+        if qualifier in self._country_aliases:
+            return self._country_aliases[qualifier] == place.country
+        parent_id, seen = place.parent, set()
+        target = self._aliases.get(qualifier)
+        while parent_id and parent_id not in seen:
+            if parent_id == target:
+                return True
+            seen.add(parent_id)
+            parent = self.places.get(parent_id)
+            parent_id = parent.parent if parent else None
+        return False
+
+    def _record(self, raw, resolution):
+        with self._lock:
+            self._by_method[resolution.method] = self._by_method.get(resolution.method, 0) + 1
+            if resolution.place is None:
+                self._counters['unresolved'] += 1
+                return
+            self._counters['resolved'] += 1
+            seen = self._variants.setdefault(resolution.id, set())
+            if raw not in seen:
+                # A new spelling of a place we've already prompted for: keyed on
+                # the raw string this would have been a cache miss
+                if seen:
+                    self._counters['merged_variants'] += 1
+                if len(seen) < 64:
+                    seen.add(raw)
+
+    def stats(self):
+        with self._lock:
+            variants = sum(len(v) for v in self._variants.values())
+            return {
+                **self._counters,
+                'by_method': dict(self._by_method),
+                'distinct_inputs': variants,
+                'distinct_places': len(self._variants),
+                'places': len(self.places),
+                'aliases': len(self._aliases),
+            }
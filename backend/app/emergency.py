@@ -0,0 +1,143 @@
+"""
+Offline emergency info from a local dataset (data/emergency_info.json).
+
+Emergency numbers, local-language distress phrases and first next steps are
+indexed by country, gazetteer region and situation, and every combination is
+assembled once at load time. A lookup is a gazetteer resolution, a keyword
+classification (every situation is scored, and keywords just after a negation
+such as "no fire" do not count) and a dict read, so the emergency route answers in well under
+a millisecond without an upstream model call. Only exact, alias and
+verified-qualifier gazetteer matches are trusted (a country named in the text
+is the other way in). Anything else, such as a fuzzy guess or "Paris, Texas",
+or a location outside the dataset, returns None and the caller falls back to
+the model.
+"""
+import json
+import threading
+
+from .destinations import normalize
+
+GENERAL = 'general'
+
+# Gazetteer matches trusted for emergency numbers; a fuzzy guess ("Parris")
+# could be a different city, so it falls back to the country or the model
+TRUSTED_METHODS = ('exact', 'alias', 'qualified')
+
+# Words that cancel a keyword up to NEGATION_WINDOW words later ("no fire",
+# "not a fire"); normalize() turns "isn't" into "isn t"
+NEGATIONS = frozenset(('no', 'not', 'never', 'without', 'nor', 't', 'nothing'))
+NEGATION_WINDOW = 2
+
+
+class EmergencyDirectory:
+    """Precomputed emergency answers keyed by (country, region, situation)"""
+
+    def __init__(self, data, gazetteer):
+        self.gazetteer = gazetteer
+        self.phrases = data.get('phrases') or {}
+        self._situations = [
+            (name, tuple(tuple(normalize(k).split()) for k in spec.get('keywords', [])), spec.get('next_steps', []))
+            for name, spec in (data.get('situations') or {}).items()
+        ]
+        if GENERAL not in {name for name, _, _ in self._situations}:
+            raise ValueError("Emergency dataset needs a 'general' situation")
+        self._regions = data.get('regions') or {}
+        self._answers = {}
+        for code, country in (data.get('countries') or {}).items():
+            self._index(code, None, country['numbers'], country.get('languages') or ['en'])
+        for region_id, region in self._regions.items():
+            place = gazetteer.get(region_id)
+            country = (data.get('countries') or {}).get(place.country) if place else None
+            if country is None:
+                raise ValueError(f"Emergency region {region_id} is not a gazetteer place in a known country")
+            numbers = {**country['numbers'], **(region.get('numbers') or {})}
+            languages = region.get('languages') or []
+            languages += [l for l in country.get('languages') or ['en'] if l not in languages]
+            self._index(place.country, region_id, numbers, languages)
+        self._lock = threading.Lock()
+        self._counters = {'answered': 0, 'unknown_location': 0}
+        self._by_situation = {}
+
+    @classmethod
+    def load(cls, path, gazetteer):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), gazetteer)
+
+    def _index(self, code, region_id, numbers, languages):
+        languages = [l for l in languages if l in self.phrases] or ['en']
+        for situation, _, steps in self._situations:
+            phrases = [self._phrase(language, situation) for language in languages]
+            local = phrases[0]
+            self._answers[(code, region_id, situation)] = {
+                'numbers': dict(numbers),
+                'distress_message': local['text'] if local['language'] == 'en' else f"{local['text']} ({local['english']})",
+                'phrases': phrases,
+                'next_steps': [step.format(**numbers) for step in steps],
+                'country': self.gazetteer.country_name(code),
+                'country_code': code,
+                'situation': situation,
+                'source': 'local',
+            }
+
+    def _phrase(self, language, situation):
+        table, english = self.phrases[language], self.phrases.get('en', {})
+        key = situation if situation in table else GENERAL
+        return {'language': language, 'text': table[key], 'english': english.get(key, table[key])}
+
+    @staticmethod
+    def _hits(words, keyword):
+        """Non-negated occurrences of keyword (its last word matched as a prefix) in words"""
+        head, last, n = keyword[:-1], keyword[-1], len(keyword)
+        hits = 0
+        for i in range(len(words) - n + 1):
+            if tuple(words[i:i + n - 1]) == head and words[i + n - 1].startswith(last):
+                hits += not NEGATIONS.intersection(words[max(0, i - NEGATION_WINDOW):i])
+        return hits
+
+    def classify(self, situation):
+        """Situation with the most non-negated keyword hits (ties go to dataset order), else 'general'"""
+        words = normalize(situation).split()
+        best, best_score = GENERAL, 0
+        for name, keywords, _ in self._situations:
+            score = sum(self._hits(words, keyword) for keyword in keywords if keyword)
+            if score > best_score:
+                best, best_score = name, score
+        return best
+
+    def locate(self, location):
+        """(country code, region id, place name) for free text; country code None when unknown"""
+        resolution = self.gazetteer.resolve(location)
+        place = resolution.place if resolution.method in TRUSTED_METHODS else None
+        if place is not None:
+            node, seen = place, set()
+            while node is not None and node.id not in seen:
+                if node.id in self._regions:
+                    return place.country, node.id, place.name
+                seen.add(node.id)
+                node = self.gazetteer.get(node.parent) if node.parent else None
+            return place.country, None, place.name
+        code = self.gazetteer.country_code(location)
+        return code, None, self.gazetteer.country_name(code) if code else None
+
+    def lookup(self, location, situation=None):
+        """Emergency answer for a tourist at location, or None outside the dataset"""
+        code, region_id, name = self.locate(location)
+        category = self.classify(situation)
+        answer = self._answers.get((code, region_id, category))
+        with self._lock:
+            if answer is None:
+                self._counters['unknown_location'] += 1
+                return None
+            self._counters['answered'] += 1
+            self._by_situation[category] = self._by_situation.get(category, 0) + 1
+        return {**answer, 'location': name}
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'by_situation': dict(self._by_situation),
+                'countries': len({key[0] for key in self._answers}),
+                'regions': len(self._regions),
+                'languages': len(self.phrases),
+            }
@@ -0,0 +1,222 @@
+"""
+Per-itinerary expense and booking totals for the stats and expense routes.
+
+On MongoDB each figure is one aggregation round trip that returns only
+totals. Itinerary stats are one pipeline on itineraries with $unionWith
+branches that total the expenses and bookings, so they need MongoDB 4.4 or
+later. Splits are one $facet pipeline giving the totals, paid per payer and
+owed per person. The category summary is one $group. On the in-memory backend the
+same figures come from the itinerary hash index and NumPy: amounts are
+converted once into a float array, and per-key sums are np.bincount over
+factorized keys.
+
+Both paths coerce amounts like MongoDB's $convert with onError/onNull 0: a
+number or a numeric string counts, and anything else counts as 0. A missing
+category is 'misc' and a missing payer is 'Unknown'. A booking costs its
+`cost`, or its `price` when the cost is 0.
+"""
+import numpy as np
+
+SETTLEMENT_EPSILON = 0.01
+
+
+def _to_double(field):
+    return {'$convert': {'input': field, 'to': 'double', 'onError': 0.0, 'onNull': 0.0}}
+
+
+BOOKING_COST = {'$let': {
+    'vars': {'cost': _to_double('$cost'), 'price': _to_double('$price')},
+    'in': {'$cond': [{'$ne': ['$$cost', 0]}, '$$cost', '$$price']},
+}}
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _floats(values):
+    """Float array of `values`: one C-level cast, per-item fallback for None and non-numeric text"""
+    values = np.fromiter(values, dtype=object)
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        return np.fromiter((_as_float(v) for v in values), dtype=float, count=len(values))
+
+
+def _factorize(values):
+    """(distinct values in first-seen order, code of each value)"""
+    labels = {}
+    codes = np.fromiter((labels.setdefault(v, len(labels)) for v in values), dtype=np.intp)
+    return list(labels), codes
+
+
+def _sums(values, weights):
+    """{value: summed weight}, in first-seen order"""
+    labels, codes = _factorize(values)
+    return dict(zip(labels, np.bincount(codes, weights=weights, minlength=len(labels)).tolist()))
+
+
+def _settle(total, count, paid, owes, travelers_count):
+    splits = {person: {'paid': amount, 'owes': 0} for person, amount in paid.items()}
+    for person, amount in owes.items():
+        splits.setdefault(person, {'paid': 0, 'owes': 0})['owes'] = amount
+    settlements = []
+    for person, totals in splits.items():
+        balance = totals['paid'] - totals['owes']
+        if balance > SETTLEMENT_EPSILON:
+            settlements.append({'person': person, 'amount': round(balance, 2), 'type': 'receives'})
+        elif balance < -SETTLEMENT_EPSILON:
+            settlements.append({'person': person, 'amount': round(abs(balance), 2), 'type': 'pays'})
+    return {
+        'total_amount': round(total, 2),
+        'per_person': round(total / travelers_count, 2) if travelers_count > 0 else 0,
+        'travelers_count': travelers_count,
+        'splits': splits,
+        'settlements': settlements,
+        'expense_count': count,
+    }
+
+
+class ExpenseAggregator:
+    """Stats, splits and category totals for one itinerary, computed by the storage backend"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.server_side = storage.backend == 'mongodb'
+
+    def itinerary_stats(self, itinerary_id):
+        """Budget, expense and booking totals, or None when the itinerary does not exist"""
+        if self.server_side:
+            parts = self._itinerary_stats_pipeline(itinerary_id)
+        else:
+            parts = self._itinerary_stats_memory(itinerary_id)
+        itinerary = parts.get('itinerary')
+        if itinerary is None:
+            return None
+        expenses = parts.get('expenses', {'total': 0, 'count': 0})
+        transport = parts.get('transport', {'total': 0, 'count': 0})
+        return {
+            'itinerary_id': itinerary_id,
+            'destination': itinerary.get('destination'),
+            'budget': itinerary.get('budget', 0),
+            'expenses': expenses,
+            'transport': transport,
+            'total_cost': expenses['total'] + transport['total'],
+        }
+
+    def _itinerary_stats_pipeline(self, itinerary_id):
+        def totals(part, amount):
+            return [
+                {'$match': {'itineraryId': itinerary_id}},
+                {'$group': {'_id': None, 'total': {'$sum': amount}, 'count': {'$sum': 1}}},
+                {'$project': {'_id': 0, 'part': {'$literal': part}, 'total': 1, 'count': 1}},
+            ]
+
+        rows = self.storage.itineraries.aggregate([
+            {'$match': {'id': itinerary_id}},
+            {'$limit': 1},
+            {'$project': {'_id': 0, 'part': {'$literal': 'itinerary'}, 'destination': 1, 'budget': 1}},
+            {'$unionWith': {'coll': 'expenses', 'pipeline': totals('expenses', _to_double('$amount'))}},
+            {'$unionWith': {'coll': 'bookings', 'pipeline': totals('transport', BOOKING_COST)}},
+        ])
+        return {row.pop('part'): row for row in rows}
+
+    def _itinerary_stats_memory(self, itinerary_id):
+        itinerary = self.storage.itineraries.get(itinerary_id)
+        if itinerary is None:
+            return {}
+        expenses = self.storage.expenses.query({'itineraryId': itinerary_id})
+        bookings = self.storage.bookings.query({'itineraryId': itinerary_id})
+        cost = _floats(b.get('cost', 0) for b in bookings)
+        price = _floats(b.get('price', 0) for b in bookings)
+        return {
+            'itinerary': itinerary,
+            'expenses': {'total': float(_floats(e.get('amount', 0) for e in expenses).sum()), 'count': len(expenses)},
+            'transport': {'total': float(np.where(cost != 0, cost, price).sum()), 'count': len(bookings)},
+        }
+
+    def splits(self, itinerary_id, travelers_count):
+        """Paid/owed per person and who settles with whom"""
+        if self.server_side:
+            total, count, paid, owes = self._splits_pipeline(itinerary_id)
+        else:
+            total, count, paid, owes = self._splits_memory(itinerary_id)
+        return _settle(total, count, paid, owes, travelers_count)
+
+    def _splits_pipeline(self, itinerary_id):
+        rows = self.storage.expenses.aggregate([
+            {'$match': {'itineraryId': itinerary_id}},
+            {'$project': {
+                '_id': 0, 'amount': _to_double('$amount'),
+                'paid_by': {'$ifNull': ['$paid_by', 'Unknown']}, 'split_among': 1,
+            }},
+            {'$facet': {
+                'totals': [{'$group': {'_id': None, 'total': {'$sum': '$amount'}, 'count': {'$sum': 1}}}],
+                'paid': [{'$group': {'_id': '$paid_by', 'amount': {'$sum': '$amount'}}}],
+                'owes': [
+                    {'$match': {'split_among': {'$type': 'array'}, 'split_among.0': {'$exists': True}}},
+                    {'$project': {'split_among': 1, 'share': {'$divide': ['$amount', {'$size': '$split_among'}]}}},
+                    {'$unwind': '$split_among'},
+                    {'$group': {'_id': '$split_among', 'amount': {'$sum': '$share'}}},
+                ],
+            }},
+        ])
+        facets = rows[0] if rows else {}
+        totals = (facets.get('totals') or [{'total': 0, 'count': 0}])[0]
+        paid = {row['_id']: row['amount'] for row in facets.get('paid', [])}
+        owes = {row['_id']: row['amount'] for row in facets.get('owes', [])}
+        return totals['total'], totals['count'], paid, owes
+
+    def _splits_memory(self, itinerary_id):
+        expenses = self.storage.expenses.query({'itineraryId': itinerary_id})
+        if not expenses:
+            return 0, 0, {}, {}
+        amounts = _floats(e.get('amount', 0) for e in expenses)
+        payers = (e.get('paid_by') for e in expenses)
+        paid = _sums((p if p is not None else 'Unknown' for p in payers), amounts)
+        shared = [e.get('split_among') for e in expenses]
+        sizes = np.fromiter((len(s) if isinstance(s, list) else 0 for s in shared), dtype=np.intp, count=len(shared))
+        people = [person for s in shared if isinstance(s, list) for person in s]
+        owes = {}
+        if people:
+            has_split = sizes > 0
+            shares = np.repeat(amounts[has_split] / sizes[has_split], sizes[has_split])
+            owes = _sums(people, shares)
+        return float(amounts.sum()), len(expenses), paid, owes
+
+    def category_summary(self, itinerary_id):
+        """{category: {total, count, items}}; items keep id, description, amount and paid_by"""
+        if self.server_side:
+            rows = self.storage.expenses.aggregate([
+                {'$match': {'itineraryId': itinerary_id}},
+                {'$group': {
+                    '_id': {'$ifNull': ['$category', 'misc']},
+                    'total': {'$sum': _to_double('$amount')},
+                    'count': {'$sum': 1},
+                    'items': {'$push': {
+                        'id': '$id', 'description': '$description', 'amount': '$amount', 'paid_by': '$paid_by'}},
+                }},
+            ])
+            # $push leaves out missing fields; the response always carries all four
+            return {row['_id']: {
+                'total': row['total'], 'count': row['count'],
+                'items': [{f: item.get(f) for f in ('id', 'description', 'amount', 'paid_by')} for item in row['items']],
+            } for row in rows}
+        expenses = self.storage.expenses.query({'itineraryId': itinerary_id})
+        if not expenses:
+            return {}
+        categories = [e.get('category') for e in expenses]
+        labels, codes = _factorize(c if c is not None else 'misc' for c in categories)
+        amounts = _floats(e.get('amount', 0) for e in expenses)
+        totals = np.bincount(codes, weights=amounts, minlength=len(labels)).tolist()
+        counts = np.bincount(codes, minlength=len(labels)).tolist()
+        summary = {label: {'total': totals[i], 'count': counts[i], 'items': []} for i, label in enumerate(labels)}
+        for code, e in zip(codes.tolist(), expenses):
+            summary[labels[code]]['items'].append({
+                'id': e.get('id'), 'description': e.get('description'),
+                'amount': e.get('amount'), 'paid_by': e.get('paid_by'),
+            })
+        return summary
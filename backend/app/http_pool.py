@@ -0,0 +1,100 @@
+"""
+Process-wide pooled HTTP client for outbound OpenRouter traffic.
+
+All threads (or eventlet greenlets, once monkey-patched) share one
+keep-alive connection pool. Each thread gets its own lightweight Session
+mounted on that shared adapter, so cookies and other session state never
+leak between concurrent requests while TCP/TLS connections are reused.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PooledHTTPClient:
+    """Keep-alive client with separate connect/read timeouts and reuse metrics"""
+
+    def __init__(self, pool_size=32, connect_timeout=5.0, read_timeout=25.0, headers=None):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.headers = dict(headers or {})
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'errors': 0}
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def timeout(self, read_timeout=None):
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def request(self, method, url, read_timeout=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout(read_timeout))
+        with self._lock:
+            self._counters['requests'] += 1
+        try:
+            return self._session().request(method, url, **kwargs)
+        except Exception:
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+
+    def post(self, url, read_timeout=None, **kwargs):
+        return self.request('POST', url, read_timeout=read_timeout, **kwargs)
+
+    def stats(self):
+        new_connections = 0
+        pooled_requests = 0
+        hosts = []
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_connections += pool.num_connections
+            pooled_requests += pool.num_requests
+            hosts.append({
+                'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': pool.pool.qsize() if pool.pool is not None else 0,
+            })
+        with self._lock:
+            counters = dict(self._counters)
+        reused = max(0, pooled_requests - new_connections)
+        return {
+            **counters,
+            'connections_opened': new_connections,
+            'connections_reused': reused,
+            'reuse_ratio': round(reused / pooled_requests, 4) if pooled_requests else 0.0,
+            'pool_size': self.pool_size,
+            'connect_timeout': self.connect_timeout,
+            'read_timeout': self.read_timeout,
+            'hosts': hosts,
+        }
+
+
+def init_pool(pool_size=32, connect_timeout=5.0, read_timeout=25.0, headers=None):
+    """Create the process-wide client once; later calls return the same one"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PooledHTTPClient(pool_size, connect_timeout, read_timeout, headers)
+        return _pool
+
+
+def get_pool():
+    return _pool or init_pool()
@@ -0,0 +1,101 @@
+"""
+MongoDB indexes the routes rely on, and a query-plan check that proves it.
+
+INDEXES declares every index per collection. `ensure_indexes` creates them
+with create_indexes(), which is a no-op for indexes that already exist, so it
+runs on every startup. HOT_QUERIES are the lookups the storage layer issues
+on each request: get by key, expenses/bookings of one itinerary and chat
+history sorted by time. `check_query_plans` explains each one and flags any
+whose winning plan contains a COLLSCAN.
+"""
+import logging
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    'itineraries': [
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+    ],
+    'expenses': [
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+        IndexModel([('itineraryId', ASCENDING)], name='itineraryId'),
+    ],
+    'bookings': [
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+        IndexModel([('itineraryId', ASCENDING)], name='itineraryId'),
+    ],
+    'chat_messages': [
+        IndexModel([('id', ASCENDING)], name='id_unique', unique=True),
+        IndexModel([('itinerary_id', ASCENDING), ('timestamp', ASCENDING)], name='itinerary_id_timestamp'),
+    ],
+    'users': [
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+}
+
+# (collection, label, filter, sort); filter values are placeholders, the plan
+# only depends on the fields
+HOT_QUERIES = [
+    ('itineraries', 'get itinerary', {'id': 'itinerary-0'}, None),
+    ('expenses', 'get expense', {'id': 'expense-0'}, None),
+    ('expenses', 'expenses of itinerary', {'itineraryId': 'itinerary-0'}, None),
+    ('bookings', 'get booking', {'id': 'booking-0'}, None),
+    ('bookings', 'bookings of itinerary', {'itineraryId': 'itinerary-0'}, None),
+    ('chat_messages', 'chat history', {'itinerary_id': 'itinerary-0'}, [('timestamp', ASCENDING)]),
+    ('users', 'get user', {'email': 'user@example.com'}, None),
+]
+
+
+class QueryPlanError(Exception):
+    """A hot query would scan its whole collection"""
+
+
+def ensure_indexes(db):
+    """Create any missing INDEXES; returns {collection: [index names]}"""
+    created = {}
+    for name, models in INDEXES.items():
+        try:
+            created[name] = db[name].create_indexes(models)
+        except OperationFailure as e:
+            # Typically duplicate ids written before the unique index existed;
+            # leave the collection usable and let the plan check report it.
+            logger.error("Creating indexes on %s failed: %s", name, e)
+            created[name] = []
+    return created
+
+
+def _stages(plan):
+    """Every stage name in an explain() plan tree"""
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan['stage']] if 'stage' in plan else []
+    for child in ('inputStage', 'queryPlan'):
+        stages += _stages(plan.get(child))
+    for child in plan.get('inputStages', []):
+        stages += _stages(child)
+    return stages
+
+
+def check_query_plans(db):
+    """explain() every HOT_QUERY; each result has collection, query, stages and ok"""
+    results = []
+    for name, label, where, sort in HOT_QUERIES:
+        cursor = db[name].find(where, {'_id': 0})
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        stages = _stages(plan)
+        results.append({'collection': name, 'query': label, 'stages': stages, 'ok': 'COLLSCAN' not in stages})
+    return results
+
+
+def assert_query_plans(db):
+    """check_query_plans, raising QueryPlanError naming every query that scans"""
+    results = check_query_plans(db)
+    scans = [f"{r['collection']}: {r['query']}" for r in results if not r['ok']]
+    if scans:
+        raise QueryPlanError("COLLSCAN in " + ", ".join(scans))
+    return results
@@ -0,0 +1,167 @@
+"""
+JSON extraction for model replies.
+
+Replies wrap the JSON in prose and ``` fences, and sometimes get the JSON
+slightly wrong. find_object() locates the first brace-balanced object in a
+single pass (string- and escape-aware, so braces in text don't confuse it),
+repair() fixes the usual LLM mistakes (single quotes, trailing commas,
+Python literals, raw newlines in strings) and validate() checks the result
+against the shape each endpoint expects.
+"""
+import json
+import re
+
+_SPECIAL = re.compile(r'[{}"\'\\]')
+# A whole double- or single-quoted string, a run of non-string text, or a stray quote
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|[^"\']+|["\']', re.S)
+_SQ_BODY_FIX = re.compile(r'\\(.)|["\n\t]', re.S)
+_SQ_NEEDS_FIX = re.compile(r'[\\"\n\t]')
+_SQ_REPLACEMENTS = {'"': '\\"', '\n': '\\n', '\t': '\\t'}
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+_PY_LITERAL = re.compile(r'\b(?:True|False|None)\b')
+_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_NUMBER = (int, float, str)
+_DECODER = json.JSONDecoder()
+
+# Top-level keys each endpoint needs, with the types we accept for them
+SCHEMAS = {
+    'generate-itinerary': {'itinerary': (list,)},
+    'recommend-destinations': {'recommendations': (list,)},
+    'optimize-budget': {'cost_breakdown': (dict,)},
+    'activity-suggestions': {'activities': (list,)},
+    'cultural-compass': {'etiquette': (list, dict), 'taboos': (list, dict)},
+    'eco-score': {'co2_kg': _NUMBER, 'rating': _NUMBER},
+    'eco-tips': {'alternatives': (list,)},
+    'destination-descriptions': {'descriptions': (dict,)},
+    'trip-summary-narrative': {'narrative': (str,), 'highlights': (list,)},
+    'translate': {'translated_text': (str,)},
+    'translate-batch': {'translations': (dict, list)},
+    'emergency-help': {'numbers': (dict,), 'next_steps': (list,)},
+    'emergency-next-steps': {'next_steps': (list,)},
+    'collect-stamp': {'stamp_name': (str,), 'story': (str,)},
+    'foodie-finder': {'recommendations': (list,)},
+    'vr-preview': {'visuals': (str,)},
+}
+
+
+class AIParseError(ValueError):
+    """A model replied, but not with the JSON object we asked for"""
+
+    def __init__(self, content, reason="JSON Parsing failed"):
+        super().__init__(reason)
+        self.content = content
+
+
+def find_object(text, start=0):
+    """(begin, end) of the first balanced {...} at or after start, or None"""
+    begin = text.find('{', start)
+    if begin == -1:
+        return None
+    depth = 0
+    quote = None
+    skip = -1
+    for match in _SPECIAL.finditer(text, begin):
+        i = match.start()
+        if i == skip:
+            continue
+        c = match.group()
+        if c == '\\':
+            if quote:
+                skip = i + 1
+            continue
+        if quote:
+            if c == quote:
+                quote = None
+        elif c == '"' or c == "'":
+            quote = c
+        elif c == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return begin, i + 1
+    return None
+
+
+def _fix_sq_char(match):
+    escaped = match.group(1)
+    if escaped is not None:
+        return "'" if escaped == "'" else match.group(0)
+    return _SQ_REPLACEMENTS[match.group(0)]
+
+
+def repair(text):
+    """Rewrite common LLM JSON mistakes into valid JSON"""
+    out = []
+    append = out.append
+    for token in _TOKEN.findall(text):
+        first = token[0]
+        if first == "'" and len(token) > 1 and token[-1] == "'":
+            body = token[1:-1]
+            if _SQ_NEEDS_FIX.search(body):
+                body = _SQ_BODY_FIX.sub(_fix_sq_char, body)
+            append('"' + body + '"')
+        elif first == '"':
+            append(token.replace('\n', '\\n').replace('\t', '\\t'))
+        else:
+            if ',' in token:
+                token = _TRAILING_COMMA.sub(r'\1', token)
+            if 'e' in token:  # True / False / None all contain an 'e'
+                token = _PY_LITERAL.sub(lambda m: _LITERALS[m.group(0)], token)
+            append(token)
+    return ''.join(out)
+
+
+def loads_lenient(text):
+    """json.loads, retried once after repair(); None if both fail"""
+    try:
+        return json.loads(text)
+    except (ValueError, RecursionError):
+        pass
+    try:
+        return json.loads(repair(text))
+    except (ValueError, RecursionError):
+        return None
+
+
+def validate(obj, schema):
+    """List of problems with obj against a {key: types} schema"""
+    if not isinstance(obj, dict):
+        return ["not a JSON object"]
+    problems = []
+    for key, types in (schema or {}).items():
+        if key not in obj:
+            problems.append(f"missing '{key}'")
+        elif not isinstance(obj[key], types):
+            problems.append(f"'{key}' is {type(obj[key]).__name__}")
+    return problems
+
+
+def extract_json(content, schema=None):
+    """First JSON object in content that parses (after repair) and fits schema"""
+    problems = []
+    begin = content.find('{')
+    if begin != -1:
+        # Fast path: well-formed JSON decodes in C and trailing prose is ignored
+        try:
+            obj, _ = _DECODER.raw_decode(content, begin)
+        except (ValueError, RecursionError):
+            obj = None
+        if isinstance(obj, dict):
+            problems = validate(obj, schema)
+            if not problems:
+                return obj
+
+    pos = 0
+    while True:
+        span = find_object(content, pos)
+        if span is None:
+            break
+        obj = loads_lenient(content[span[0]:span[1]])
+        if isinstance(obj, dict):
+            problems = validate(obj, schema)
+            if not problems:
+                return obj
+        pos = span[1]
+    reason = "Schema validation failed: " + ", ".join(problems) if problems else "No JSON object found"
+    raise AIParseError(content, reason)
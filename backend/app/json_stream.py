@@ -0,0 +1,95 @@
+"""
+Incremental parser for streamed itinerary JSON.
+
+Fed the model's output chunk by chunk, it tracks string/escape state and
+bracket depth in a single pass and hands back each element of the top-level
+"itinerary" array as soon as its closing brace arrives, long before the
+whole document is complete.
+"""
+from .json_extract import loads_lenient
+
+
+class ItineraryStreamParser:
+    """Emit each object of the top-level array `key` as soon as it is complete"""
+
+    def __init__(self, key='itinerary'):
+        self.key = key
+        self.buffer = ''
+        self.items = []
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._await_array = False
+        self._array_depth = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the items completed by it"""
+        self.buffer += chunk
+        buf = self.buffer
+        completed = []
+        i = self._pos
+        while i < len(buf):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = buf[self._string_start + 1:i]
+                i += 1
+                continue
+
+            if not self._started:
+                # Skip any prose or ```json fence before the document
+                if c == '{':
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if c in ' \t\r\n':
+                i += 1
+                continue
+
+            if c == '[' and self._await_array:
+                self._array_depth = self._depth + 1
+            self._await_array = False
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ':':
+                self._await_array = self._depth == 1 and self._last_key == self.key
+            elif c == ',':
+                if self._depth == 1:
+                    self._last_key = None
+            elif c in '{[':
+                if c == '{' and self._array_depth is not None and self._depth == self._array_depth:
+                    self._item_start = i
+                self._depth += 1
+            elif c in '}]':
+                if (c == '}' and self._item_start is not None
+                        and self._depth == self._array_depth + 1):
+                    item = self._decode(buf[self._item_start:i + 1])
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+                    self._item_start = None
+                elif c == ']' and self._array_depth is not None and self._depth == self._array_depth:
+                    self._array_depth = None
+                self._depth -= 1
+            i += 1
+        self._pos = i
+        return completed
+
+    def _decode(self, text):
+        item = loads_lenient(text)
+        return item if isinstance(item, dict) else None
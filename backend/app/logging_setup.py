@@ -0,0 +1,197 @@
+"""
+Queue-based logging for the backend.
+
+`configure_logging` puts a single QueueHandler on the root logger. Request
+threads only merge the message arguments and enqueue the record. A
+QueueListener on its own OS thread does the formatting and the console and
+file I/O; the thread is native even under eventlet's monkey patching, so
+writes never block the hub. File records are JSON lines holding the message
+plus any `extra=` fields, and the file rotates by size. The queue is bounded:
+when the writer falls behind, records are dropped and counted rather than
+blocking callers. Verbose AI prompt/response records on PAYLOAD_LOGGER pass
+through PayloadSampler, which keeps a fixed fraction of them and truncates
+the text.
+"""
+import atexit
+import importlib
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+from datetime import datetime, timezone
+
+PAYLOAD_LOGGER = 'ai.payload'
+PAYLOAD_FIELDS = ('prompt', 'result')
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+# LogRecord attributes that are not user-supplied `extra=` fields
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def _native(module_name):
+    """The unpatched stdlib module when eventlet has monkey-patched threads"""
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return importlib.import_module(module_name)
+    if patcher.is_monkey_patched('thread'):
+        return patcher.original(module_name)
+    return importlib.import_module(module_name)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, extra fields and exc"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class PayloadSampler(logging.Filter):
+    """Keeps `rate` of the records it sees, with payload fields cut to `max_chars`"""
+
+    def __init__(self, rate=0.01, max_chars=2000):
+        super().__init__()
+        self.rate = rate
+        self.max_chars = max_chars
+        self.logged = 0
+        self.skipped = 0
+
+    def filter(self, record):
+        if self.rate <= 0 or (self.rate < 1 and random.random() >= self.rate):
+            self.skipped += 1
+            return False
+        for field in PAYLOAD_FIELDS:
+            value = getattr(record, field, None)
+            if isinstance(value, str) and len(value) > self.max_chars:
+                setattr(record, field, value[:self.max_chars] + f"... [{len(value) - self.max_chars} more chars]")
+        record.sample_rate = self.rate
+        self.logged += 1
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record"""
+
+    def __init__(self, queue, maxsize):
+        super().__init__(queue)
+        self.maxsize = maxsize
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the arguments now, while they still hold the values at call time;
+        # everything else (formatting, exc text) happens on the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        # SimpleQueue is unbounded and lock-free on put; the size check is
+        # approximate under concurrency, which is fine for a safety bound.
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+        self.enqueued += 1
+
+
+class NativeQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose worker is an OS thread even under eventlet"""
+
+    def start(self):
+        self._thread = _native('threading').Thread(target=self._monitor, daemon=True, name='log-writer')
+        self._thread.start()
+
+
+class LogPipeline:
+    """The installed queue, handlers and listener, with counters for the admin API"""
+
+    def __init__(self, level, queue_size, handlers, sampler, path):
+        self.level = level
+        self.queue = _native('queue').SimpleQueue()
+        self.handler = DroppingQueueHandler(self.queue, queue_size)
+        self.handlers = handlers
+        self.listener = NativeQueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.sampler = sampler
+        self.path = path
+
+    def start(self):
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        logging.getLogger(PAYLOAD_LOGGER).addFilter(self.sampler)
+        self.listener.start()
+
+    def stop(self):
+        """Detach from the loggers, then flush what is queued and close the handlers"""
+        logging.getLogger().removeHandler(self.handler)
+        logging.getLogger(PAYLOAD_LOGGER).removeFilter(self.sampler)
+        if self.listener._thread is not None:
+            self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def stats(self):
+        return {
+            'level': logging.getLevelName(self.level),
+            'enqueued': self.handler.enqueued,
+            'dropped': self.handler.dropped,
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.handler.maxsize,
+            'payloads_logged': self.sampler.logged,
+            'payloads_skipped': self.sampler.skipped,
+            'payload_sample_rate': self.sampler.rate,
+            'file': self.path,
+        }
+
+
+def configure_logging(level='INFO', log_dir=None, max_bytes=10 * 1024 * 1024, backup_count=5, console_format='text',
+                      queue_size=10000, payload_sample_rate=0.01, payload_max_chars=2000):
+    """Install (or replace) the process-wide pipeline and return it"""
+    global _pipeline
+    level = logging.getLevelName(str(level).upper()) if not isinstance(level, int) else level
+    if not isinstance(level, int):
+        level = logging.INFO
+    # Neither format uses caller, thread or process fields; skipping them roughly
+    # halves the cost of creating a record (see "Optimization" in the logging HOWTO).
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter() if console_format == 'json' else logging.Formatter(TEXT_FORMAT))
+    handlers, path = [console], None
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        path = os.path.join(log_dir, 'app.log')
+        rotating = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        rotating.setFormatter(JsonFormatter())
+        handlers.append(rotating)
+
+    pipeline = LogPipeline(level, queue_size, handlers, PayloadSampler(payload_sample_rate, payload_max_chars), path)
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+        else:
+            atexit.register(lambda: _pipeline.stop() if _pipeline is not None else None)
+        _pipeline = pipeline
+        pipeline.start()
+    return pipeline
@@ -0,0 +1,169 @@
+"""
+Rolling health scoreboard and circuit breaker for OpenRouter models.
+
+Every model attempt records its latency, whether the HTTP call succeeded and
+whether the reply parsed as JSON. The scoreboard ranks models per request on
+those numbers and takes a model out of rotation for a cool-down window once
+it keeps failing. After the cool-down a single trial request is let through
+(half-open); a success closes the breaker, a failure re-opens it.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Latency assumed for a model we have no samples for yet
+DEFAULT_LATENCY = 5.0
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class _ModelHealth:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)  # (latency, ok, json_ok)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.total_calls = 0
+        self.times_opened = 0
+        self.last_error = None
+
+    def success_rate(self):
+        # Optimistic prior so one early failure doesn't bury a model
+        successes = sum(1 for _, ok, json_ok in self.samples if ok and json_ok is not False)
+        return (successes + 2.0) / (len(self.samples) + 2.0)
+
+    def median_latency(self):
+        latencies = sorted(latency for latency, ok, _ in self.samples if ok)
+        return percentile(latencies, 50) or DEFAULT_LATENCY
+
+
+class ModelScoreboard:
+    """Thread-safe per-process model health table"""
+
+    def __init__(self, window=50, failure_threshold=3, error_rate_threshold=0.5,
+                 min_samples=5, cooldown=60.0):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model):
+        health = self._models.get(model)
+        if health is None:
+            health = self._models[model] = _ModelHealth(self.window)
+        return health
+
+    def record(self, model, latency, ok, json_ok=None, error=None):
+        """Record one finished attempt; json_ok is None when no reply was parsed"""
+        failed = not ok or json_ok is False
+        with self._lock:
+            health = self._health(model)
+            health.samples.append((latency, ok, json_ok))
+            health.total_calls += 1
+            if not failed:
+                health.consecutive_failures = 0
+                if health.state != CLOSED:
+                    logger.info("Circuit closed for model %s", model)
+                    health.state = CLOSED
+                    # Start the window afresh so old failures don't re-trip it
+                    health.samples.clear()
+                    health.samples.append((latency, ok, json_ok))
+                return
+
+            health.consecutive_failures += 1
+            health.last_error = error
+            if health.state == HALF_OPEN or self._should_open(health):
+                if health.state != OPEN:
+                    health.times_opened += 1
+                    logger.warning("Circuit opened for model %s (%s)", model, error)
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    def _should_open(self, health):
+        if health.consecutive_failures >= self.failure_threshold:
+            return True
+        if len(health.samples) < self.min_samples:
+            return False
+        failures = sum(1 for _, ok, json_ok in health.samples if not ok or json_ok is False)
+        return failures / len(health.samples) >= self.error_rate_threshold
+
+    def _available(self, health, now):
+        # Caller holds the lock
+        if health.state == CLOSED:
+            return True
+        if now - health.opened_at < self.cooldown:
+            return False
+        # Let one trial through; re-arm the timer so only one is in flight
+        health.state = HALF_OPEN
+        health.opened_at = now
+        return True
+
+    def order(self, models):
+        """Healthy models best-first; falls back to the given order if all are open"""
+        now = time.monotonic()
+        with self._lock:
+            ranked = []
+            for index, model in enumerate(models):
+                health = self._health(model)
+                if not self._available(health, now):
+                    continue
+                score = health.success_rate() / (1.0 + health.median_latency() / 10.0)
+                ranked.append((-score, index, model))
+        if not ranked:
+            return list(models)
+        ranked.sort()
+        return [model for _, _, model in ranked]
+
+    def reset(self):
+        with self._lock:
+            self._models.clear()
+
+    def snapshot(self):
+        now = time.monotonic()
+        data = {}
+        with self._lock:
+            for model, health in self._models.items():
+                samples = list(health.samples)
+                count = len(samples)
+                latencies = sorted(latency for latency, ok, _ in samples if ok)
+                errors = sum(1 for _, ok, _ in samples if not ok)
+                parsed = [json_ok for _, ok, json_ok in samples if ok and json_ok is not None]
+                data[model] = {
+                    'state': health.state,
+                    'samples': count,
+                    'total_calls': health.total_calls,
+                    'error_rate': round(errors / count, 4) if count else 0.0,
+                    'json_success_rate': round(sum(parsed) / len(parsed), 4) if parsed else None,
+                    'latency_p50': percentile(latencies, 50),
+                    'latency_p95': percentile(latencies, 95),
+                    'consecutive_failures': health.consecutive_failures,
+                    'times_opened': health.times_opened,
+                    'cooldown_remaining': round(max(0.0, self.cooldown - (now - health.opened_at)), 1)
+                    if health.state == OPEN else 0.0,
+                    'last_error': health.last_error,
+                }
+        return {
+            'models': data,
+            'config': {
+                'window': self.window,
+                'failure_threshold': self.failure_threshold,
+                'error_rate_threshold': self.error_rate_threshold,
+                'min_samples': self.min_samples,
+                'cooldown': self.cooldown,
+            },
+        }
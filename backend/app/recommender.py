@@ -0,0 +1,193 @@
+"""
+Content-based destination recommendations from a local catalog
+(data/destination_catalog.json).
+
+Each catalog entry's tags (counted twice) and description are turned into a
+TF-IDF vector once at load. Tokens are lightly stemmed and aliased ("beaches",
+"foodie", "hiking"), and tag phrases also contribute bigrams such as
+"street food". A request's interests go through the same analyzer. One NumPy
+pass over all entries then combines cosine similarity to the interests, how
+the party's estimated trip cost fits the budget, and whether the travel
+month is in season. The cost estimate is the per-person daily cost band times
+days, plus a round-trip access cost from a major Indian city. The top k
+entries are returned without an upstream model call.
+"""
+import json
+import re
+from datetime import datetime
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+INTEREST_WEIGHT = 0.65
+BUDGET_WEIGHT = 0.25
+SEASON_WEIGHT = 0.10
+
+TOKEN_ALIASES = {
+    'foodie': 'food', 'cuisine': 'food', 'culinary': 'food', 'eating': 'food',
+    'hike': 'trekking', 'hiking': 'trekking', 'trek': 'trekking',
+    'spiritual': 'spirituality', 'religious': 'spirituality', 'pilgrimage': 'spirituality',
+    'adventurous': 'adventure', 'thrill': 'adventure',
+    'snorkeling': 'snorkelling', 'partying': 'party', 'clubbing': 'nightlife',
+    'monument': 'history', 'historical': 'history', 'heritage': 'history',
+    'photo': 'photography', 'relax': 'relaxation', 'relaxing': 'relaxation',
+    'romantic': 'romance', 'shop': 'shopping', 'wild': 'wildlife',
+}
+
+_WORD = re.compile(r"[a-z]+")
+_PHRASE_BREAK = re.compile(r"[|,.;:!?()]+")
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('ches', 'shes', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def analyze(text):
+    """Stemmed, aliased unigrams plus within-phrase bigrams"""
+    terms = []
+    for phrase in _PHRASE_BREAK.split(str(text or '').lower()):
+        words = [TOKEN_ALIASES.get(_stem(w), _stem(w)) for w in _WORD.findall(phrase)]
+        terms += words
+        terms += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return terms
+
+
+def _month(data):
+    """Travel month (1-12) from `month` or `start_date`/`startDate`, else None"""
+    month = data.get('month')
+    if month not in (None, ''):
+        try:
+            month = int(month)
+            return month if 1 <= month <= 12 else None
+        except (TypeError, ValueError):
+            try:
+                return datetime.strptime(str(month)[:3].title(), '%b').month
+            except ValueError:
+                return None
+    start = data.get('start_date') or data.get('startDate')
+    try:
+        return datetime.fromisoformat(str(start)[:10]).month
+    except ValueError:
+        return None
+
+
+class DestinationRecommender:
+    """TF-IDF + cost band + season scoring over the destination catalog"""
+
+    def __init__(self, catalog, gazetteer):
+        self.gazetteer = gazetteer
+        self.currency = catalog.get('currency', 'INR')
+        self.entries = []
+        for entry in catalog.get('destinations', []):
+            place = gazetteer.get(entry['id'])
+            if place is None:
+                raise ValueError(f"Catalog destination {entry['id']} is not a gazetteer place")
+            self.entries.append({**entry, 'name': place.name, 'country': gazetteer.country_name(place.country)})
+        if not self.entries:
+            raise ValueError("Destination catalog is empty")
+        months = catalog.get('seasons', {})
+        self._vectorizer = TfidfVectorizer(analyzer=analyze, sublinear_tf=True)
+        self._matrix = self._vectorizer.fit_transform(
+            ' | '.join(e['tags'] * 2 + [e['description']]) for e in self.entries)
+        self._terms = [set(analyze(' | '.join(e['tags']))) for e in self.entries]
+        self._daily = np.array([e['daily_cost'] for e in self.entries], dtype=float)
+        self._access = np.array([e['access_cost'] for e in self.entries], dtype=float)
+        self._days = np.array([e.get('typical_days', 3) for e in self.entries], dtype=float)
+        self._international = np.array([bool(e.get('international')) for e in self.entries])
+        self._in_season = np.zeros((13, len(self.entries)))
+        for i, entry in enumerate(self.entries):
+            for season in entry.get('best_season', []):
+                self._in_season[months.get(season, []), i] = 1.0
+        # Ties keep catalog order (roughly popularity)
+        self._order = -np.arange(len(self.entries)) * 1e-6
+
+    @classmethod
+    def load(cls, path, gazetteer):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), gazetteer)
+
+    def scores(self, interests, budget=0.0, travelers=1, days=None, month=None, international=False):
+        """(score per entry, estimated cost low/high per entry) for one request"""
+        query = self._vectorizer.transform([' | '.join(interests)])
+        similarity = np.asarray((self._matrix @ query.T).todense()).ravel()
+        interest = similarity / similarity.max() if similarity.max() > 0 else similarity
+
+        trip_days = self._days if days is None else np.full(len(self.entries), float(days))
+        cost = travelers * (self._daily * trip_days[:, None] + self._access)
+        typical = cost.mean(axis=1)
+        fit = np.clip(budget / typical, 0.0, 1.0) ** 2 if budget > 0 else np.ones(len(self.entries))
+
+        if month is None:
+            total = INTEREST_WEIGHT + BUDGET_WEIGHT
+            score = (INTEREST_WEIGHT * interest + BUDGET_WEIGHT * fit) / total
+        else:
+            score = INTEREST_WEIGHT * interest + BUDGET_WEIGHT * fit + SEASON_WEIGHT * self._in_season[month]
+        if not any(interests):
+            score = fit if month is None else (BUDGET_WEIGHT * fit + SEASON_WEIGHT * self._in_season[month]) / (
+                BUDGET_WEIGHT + SEASON_WEIGHT)
+        score = np.where(self._international & (not international), -np.inf, score + self._order)
+        return score, cost
+
+    def recommend(self, data, k=3):
+        """recommend-destinations answer: top-k catalog entries for interests, budget and dates"""
+        interests = data.get('interests') or []
+        if isinstance(interests, str):
+            interests = interests.split(',')
+        interests = [str(i).strip() for i in interests if str(i).strip()]
+        try:
+            budget = max(0.0, float(data.get('budget') or 0))
+            travelers = max(1, min(int(data.get('travelers') or 1), 50))
+            days = data.get('trip_duration') or data.get('days')
+            days = max(1, min(int(days), 60)) if days else None
+        except (TypeError, ValueError):
+            return None
+        month = _month(data)
+        international = str(data.get('international', False)).lower() == 'true'
+
+        score, cost = self.scores(interests, budget, travelers, days, month, international)
+        k = min(k, int(np.isfinite(score).sum()))
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top])]
+        asked = {term: interest for interest in interests for term in analyze(interest)}
+
+        recommendations = []
+        for i in top:
+            entry = self.entries[i]
+            low, high = cost[i]
+            typical = (low + high) / 2
+            matched = sorted({asked[t] for t in self._terms[i] if t in asked})
+            recommendations.append({
+                'destination': entry['name'],
+                'id': entry['id'],
+                'country': entry['country'],
+                'score': int(round(100 * max(0.0, min(1.0, float(score[i]))))),
+                'difficulty': entry['difficulty'],
+                'estimated_cost': int(round(typical / 500) * 500),
+                'estimated_cost_range': [int(round(low / 500) * 500), int(round(high / 500) * 500)],
+                'budget_fit': 'unknown' if not budget else (
+                    'within' if typical <= budget else 'stretch' if low <= budget else 'over'),
+                'best_season': entry.get('best_season', []),
+                'in_season': None if month is None else bool(self._in_season[month, i]),
+                'typical_days': entry.get('typical_days'),
+                'description': entry['description'],
+                'matched_interests': matched,
+            })
+        return {
+            'recommendations': recommendations,
+            'currency': self.currency,
+            'basis': {'interests': interests, 'travelers': travelers, 'days': days, 'budget': budget, 'month': month},
+            'source': 'local',
+        }
+
+    def stats(self):
+        return {
+            'destinations': len(self.entries),
+            'international': int(self._international.sum()),
+            'features': len(self._vectorizer.vocabulary_),
+        }
@@ -0,0 +1,68 @@
+"""
+Single-flight de-duplication of identical in-flight calls.
+
+The first caller for a key runs the function; callers arriving with the same
+key while it is still running wait for that call and receive a copy of its
+result (or its exception) instead of starting their own.
+"""
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent do(key, fn) calls that share a key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'leaders': 0, 'coalesced': 0, 'max_waiters': 0}
+        self._by_label = {}
+
+    def do(self, key, fn, label=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters['leaders'] += 1
+            else:
+                call.waiters += 1
+                self._counters['coalesced'] += 1
+                self._counters['max_waiters'] = max(self._counters['max_waiters'], call.waiters)
+                if label:
+                    self._by_label[label] = self._by_label.get(label, 0) + 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # No new followers can join once the key is gone
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        # Followers copy call.result, so hand the leader its own copy if any joined
+        return copy.deepcopy(call.result) if call.waiters else call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'in_flight': len(self._calls),
+                'coalesced_by_endpoint': dict(self._by_label),
+            }
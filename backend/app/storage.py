@@ -0,0 +1,380 @@
+"""
+Repository layer for the app's collections.
+
+`open_storage(db)` picks the backend once at startup: MongoDB collections when
+a database handle is given, plain dicts otherwise. Both expose the same
+per-collection operations, so routes never branch on the connection state:
+
+    get(key)                         one document or None
+    put(doc)                         insert or replace by key
+    insert_one(doc)                  insert only; DuplicateKey when the key exists
+    put_many(docs)                   bulk put, returns the count written
+    query(where, fields, sort, limit) equality filter, optional projection
+    page(where, fields, limit, after) keyset page in key order, plus next cursor
+    iterate(fields, batch_size)      every document, fetched batch_size at a time
+    insert_many(docs)                bulk insert, skipping keys that already exist
+    update(key, changes)             $set-style merge, returns the new document
+    delete(key)                      True when a document was removed
+
+Documents never carry Mongo's `_id` (it is projected out server-side), and the
+memory backend returns its stored dicts without copying; callers treat
+returned documents as read-only and change them through update(). `fields`
+either names the fields to return or, prefixed with "-", the fields to leave
+out (`['-days', '-packing_list']`); the two cannot be mixed. The memory
+backend keeps a hash index on each collection's lookup fields (expenses by
+itinerary and so on) so per-itinerary queries do not scan every document.
+MongoDB errors surface as StorageError. MongoDB collections also take
+aggregate(pipeline); callers that use it keep an equivalent in-memory path
+(see expense_stats).
+"""
+import bisect
+import threading
+from collections.abc import Hashable
+
+from pymongo import ReplaceOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+DUPLICATE_KEY = 11000
+
+# Collection name -> (key field, fields queried by equality)
+COLLECTIONS = {
+    'itineraries': ('id', ()),
+    'expenses': ('id', ('itineraryId',)),
+    'bookings': ('id', ('itineraryId',)),
+    'chat_messages': ('id', ('itinerary_id',)),
+    'users': ('email', ()),
+}
+
+
+class StorageError(Exception):
+    """The backing store rejected or failed an operation"""
+
+
+class DuplicateKey(StorageError):
+    """insert_one found a document with the same key"""
+
+
+def _parse_fields(fields):
+    """(include, names) from a fields list; "-name" entries exclude"""
+    excluded = [f[1:] for f in fields if f.startswith('-')]
+    if excluded and len(excluded) != len(fields):
+        raise ValueError("fields must be all included or all excluded ('-name')")
+    return (False, excluded) if excluded else (True, list(fields))
+
+
+def _projector(fields, key):
+    if not fields:
+        return None
+    include, names = _parse_fields(fields)
+    if include:
+        names = names if key in names else [key] + names
+        return lambda doc: {f: doc[f] for f in names if f in doc}
+    names = set(names) - {key}
+    return lambda doc: {f: v for f, v in doc.items() if f not in names}
+
+
+def _mongo_projection(fields, key):
+    if not fields:
+        return {'_id': 0}
+    include, names = _parse_fields(fields)
+    if include:
+        return {**dict.fromkeys(names, 1), key: 1, '_id': 0}
+    return {**dict.fromkeys((f for f in names if f != key), 0), '_id': 0}
+
+
+def _sort_key(field):
+    def key(doc):
+        # Missing values sort first, like MongoDB's null ordering
+        value = doc.get(field)
+        return (value is not None, '' if value is None else value)
+    return key
+
+
+class MemoryCollection:
+    """Dict-backed collection keyed on `key`, with hash indexes on `indexed` fields"""
+
+    def __init__(self, key, indexed=()):
+        self.key = key
+        self._docs = {}
+        self._keys = []  # sorted, for keyset pages
+        self._indexes = {field: {} for field in indexed}
+        self._lock = threading.Lock()
+
+    def _index(self, doc, add):
+        for field, index in self._indexes.items():
+            value = doc.get(field)
+            if not isinstance(value, Hashable):
+                continue
+            keys = index.setdefault(value, {})  # a dict keeps insertion order, like the scan
+            if add:
+                keys[doc[self.key]] = None
+            else:
+                keys.pop(doc[self.key], None)
+                if not keys:
+                    del index[value]
+
+    def get(self, key):
+        return self._docs.get(key)
+
+    def put(self, doc):
+        with self._lock:
+            old = self._docs.get(doc[self.key])
+            if old is not None:
+                self._index(old, add=False)
+            else:
+                bisect.insort(self._keys, doc[self.key])
+            self._docs[doc[self.key]] = doc
+            self._index(doc, add=True)
+        return doc
+
+    def insert_one(self, doc):
+        # Check and insert under one lock, so two concurrent inserts cannot both pass
+        with self._lock:
+            if doc[self.key] in self._docs:
+                raise DuplicateKey(f"{self.key} {doc[self.key]!r} already exists")
+            bisect.insort(self._keys, doc[self.key])
+            self._docs[doc[self.key]] = doc
+            self._index(doc, add=True)
+        return doc
+
+    def put_many(self, docs):
+        count = 0
+        with self._lock:
+            added = []
+            for doc in docs:
+                old = self._docs.get(doc[self.key])
+                if old is not None:
+                    self._index(old, add=False)
+                else:
+                    added.append(doc[self.key])
+                self._docs[doc[self.key]] = doc
+                self._index(doc, add=True)
+                count += 1
+            if added:
+                # Timsort merges the two sorted runs in linear time
+                self._keys.extend(sorted(set(added)))
+                self._keys.sort()
+        return count
+
+    def query(self, where=None, fields=None, sort=None, limit=None):
+        items = list(where.items()) if where else []
+        indexed = next(((k, v) for k, v in items if k in self._indexes and isinstance(v, Hashable)), None)
+        if indexed is not None:
+            field, value = indexed
+            docs = self._docs
+            docs = [docs[k] for k in list(self._indexes[field].get(value, ())) if k in docs]
+            items.remove(indexed)
+        else:
+            docs = list(self._docs.values())
+        if items:
+            docs = [d for d in docs if all(d.get(k) == v for k, v in items)]
+        if sort:
+            field, direction = sort
+            docs.sort(key=_sort_key(field), reverse=direction < 0)
+        if limit:
+            docs = docs[:limit]
+        project = _projector(fields, self.key)
+        return [project(d) for d in docs] if project else docs
+
+    def page(self, where=None, fields=None, limit=100, after=None):
+        project = _projector(fields, self.key)
+        items = list(where.items()) if where else []
+        docs = []
+        with self._lock:
+            start = 0 if after is None else bisect.bisect_right(self._keys, after)
+            if not items:
+                docs = [self._docs[k] for k in self._keys[start:start + limit]]
+            else:
+                for k in self._keys[start:]:
+                    doc = self._docs[k]
+                    if all(doc.get(f) == v for f, v in items):
+                        docs.append(doc)
+                        if len(docs) == limit:
+                            break
+        next_cursor = docs[-1][self.key] if len(docs) == limit else None
+        return ([project(d) for d in docs] if project else docs), next_cursor
+
+    def iterate(self, fields=None, batch_size=1000):
+        # Keyset pages, so documents added or removed meanwhile never shift the walk
+        docs, after = self.page(fields=fields, limit=batch_size)
+        while docs:
+            yield from docs
+            if after is None:
+                return
+            docs, after = self.page(fields=fields, limit=batch_size, after=after)
+
+    def insert_many(self, docs):
+        fresh = []
+        with self._lock:
+            known = set()
+            for doc in docs:
+                key = doc[self.key]
+                if key not in self._docs and key not in known:
+                    known.add(key)
+                    fresh.append(doc)
+        inserted = self.put_many(fresh)
+        return {'inserted': inserted, 'duplicates': len(docs) - inserted}
+
+    def count(self, where=None):
+        return len(self.query(where)) if where else len(self._docs)
+
+    def update(self, key, changes):
+        # The key field is never rewritten; _docs and _keys are keyed on it
+        changes = {k: v for k, v in changes.items() if k != self.key}
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is not None:
+                self._index(doc, add=False)
+                doc.update(changes)
+                self._index(doc, add=True)
+            return doc
+
+    def delete(self, key):
+        with self._lock:
+            doc = self._docs.pop(key, None)
+            if doc is not None:
+                self._index(doc, add=False)
+                del self._keys[bisect.bisect_left(self._keys, key)]
+        return doc is not None
+
+
+class MongoCollection:
+    """pymongo collection keyed on `key`, with `_id` always projected out"""
+
+    def __init__(self, collection, key):
+        self.key = key
+        self._collection = collection
+
+    def get(self, key):
+        try:
+            return self._collection.find_one({self.key: key}, {'_id': 0})
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+    def put(self, doc):
+        try:
+            self._collection.replace_one({self.key: doc[self.key]}, doc, upsert=True)
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+        return doc
+
+    def insert_one(self, doc):
+        try:
+            # The unique index on the key (indexes.INDEXES) rejects the second of two racing inserts;
+            # insert_one adds _id to the dict it is given, so it gets a copy
+            self._collection.insert_one(dict(doc))
+        except DuplicateKeyError as e:
+            raise DuplicateKey(f"{self.key} {doc[self.key]!r} already exists") from e
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+        return doc
+
+    def put_many(self, docs):
+        ops = [ReplaceOne({self.key: doc[self.key]}, doc, upsert=True) for doc in docs]
+        if not ops:
+            return 0
+        try:
+            result = self._collection.bulk_write(ops, ordered=False)
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+        return result.upserted_count + result.matched_count
+
+    def query(self, where=None, fields=None, sort=None, limit=None):
+        projection = _mongo_projection(fields, self.key)
+        try:
+            cursor = self._collection.find(where or {}, projection)
+            if sort:
+                cursor = cursor.sort(*sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+    def page(self, where=None, fields=None, limit=100, after=None):
+        where = dict(where or {})
+        if after is not None:
+            where[self.key] = {'$gt': after}
+        try:
+            cursor = self._collection.find(where, _mongo_projection(fields, self.key))
+            docs = list(cursor.sort(self.key, 1).limit(limit))
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+        return docs, (docs[-1][self.key] if len(docs) == limit else None)
+
+    def iterate(self, fields=None, batch_size=1000):
+        try:
+            yield from self._collection.find({}, _mongo_projection(fields, self.key)).batch_size(batch_size)
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+    def insert_many(self, docs):
+        if not docs:
+            return {'inserted': 0, 'duplicates': 0}
+        try:
+            # insert_many adds _id to each dict; the docs are the caller's parsed copies
+            inserted = len(self._collection.insert_many(docs, ordered=False).inserted_ids)
+            return {'inserted': inserted, 'duplicates': 0}
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            duplicates = sum(1 for err in errors if err.get('code') == DUPLICATE_KEY)
+            if duplicates != len(errors):
+                raise StorageError(errors[0].get('errmsg', str(e))) from e
+            return {'inserted': e.details.get('nInserted', 0), 'duplicates': duplicates}
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+    def count(self, where=None):
+        try:
+            return self._collection.count_documents(where or {})
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+    def aggregate(self, pipeline):
+        try:
+            return list(self._collection.aggregate(pipeline))
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+    def update(self, key, changes):
+        # The server rejects a $set on _id, and the key field is never rewritten
+        changes = {k: v for k, v in changes.items() if k not in (self.key, '_id')}
+        if not changes:
+            return self.get(key)  # an empty $set is rejected by the server
+        try:
+            return self._collection.find_one_and_update(
+                {self.key: key}, {'$set': changes}, projection={'_id': 0}, return_document=ReturnDocument.AFTER)
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+    def delete(self, key):
+        try:
+            return self._collection.delete_one({self.key: key}).deleted_count > 0
+        except PyMongoError as e:
+            raise StorageError(str(e)) from e
+
+
+class Storage:
+    """One repository per collection in COLLECTIONS, all on the same backend"""
+
+    def __init__(self, backend, collections):
+        self.backend = backend
+        self.collections = collections
+        for name, collection in collections.items():
+            setattr(self, name, collection)
+
+    def stats(self):
+        counts = {}
+        for name, collection in self.collections.items():
+            try:
+                counts[name] = collection.count()
+            except StorageError:
+                counts[name] = None
+        return {'backend': self.backend, 'documents': counts}
+
+
+def open_storage(db=None):
+    """MongoDB-backed storage when `db` is a database handle, in-memory otherwise"""
+    if db is None:
+        return Storage('memory', {name: MemoryCollection(key, indexed) for name, (key, indexed) in COLLECTIONS.items()})
+    return Storage('mongodb', {name: MongoCollection(db[name], key) for name, (key, _) in COLLECTIONS.items()})
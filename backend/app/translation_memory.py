@@ -0,0 +1,245 @@
+"""
+Translation memory for the translate routes.
+
+Finished translations are stored under (target language, normalized source
+text) in an in-memory LRU, mirrored to a diskcache store when a directory is
+configured. A lookup tries the exact normalized text first and then a
+near-duplicate: trigram postings pick a few candidates, and one is accepted
+only if it has the same words in the same order and the same numbers, and
+every word that differs is a typo-sized edit of a long word: at least
+MIN_TYPO_WORD characters (the longer of the pair), the same first letter, one edit apart (two from
+TYPO_LONG_WORD characters on), and neither word a negation or contraction.
+That way "where is the staton?" reuses "Where is the station", but "I can't
+eat nuts", "I cant eat nuts" and "I want beer" never reuse "I can eat nuts"
+or "I want beef".
+
+The module also builds the numbered multi-string prompt for batch
+translation and splits the model's reply back into one string per input.
+"""
+import difflib
+import json
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+import diskcache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_DIGITS = re.compile(r'\d+')
+_EDGE_PUNCTUATION = ' .!?,;:"\'¡¿“”«»。！？、'
+_SEPARATOR = '\x1f'
+
+# A differing word is only a typo of the stored one when the longer of the two
+# has at least MIN_TYPO_WORD characters; short words ("can"/"cant", "beef"/"beer") change meaning with one letter
+MIN_TYPO_WORD = 6
+TYPO_LONG_WORD = 9
+NEGATIONS = frozenset((
+    'no', 'not', 'nor', 'never', 'none', 'nothing', 'neither', 'without',
+    'cannot', 'cant', 'dont', 'wont', 'isnt', 'arent', 'wasnt', 'doesnt', 'didnt', 'shouldnt', 'couldnt',
+))
+
+
+def normalize_text(text):
+    """Case-folded, NFKC, whitespace-collapsed text without leading/trailing punctuation"""
+    text = unicodedata.normalize('NFKC', str(text or '')).casefold()
+    return _WHITESPACE.sub(' ', text).strip(_EDGE_PUNCTUATION)
+
+
+def normalize_lang(lang):
+    return _WHITESPACE.sub(' ', str(lang or '')).strip().casefold()
+
+
+def _edit_distance(a, b, limit):
+    """Edit distance of a and b counting an adjacent swap as one edit, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _negation(word):
+    return word in NEGATIONS or "n't" in word or "n’t" in word
+
+
+def _typo_of(a, b):
+    """Whether differing words a and b are a spelling slip rather than a different word"""
+    if max(len(a), len(b)) < MIN_TYPO_WORD or a[0] != b[0] or _negation(a) or _negation(b):
+        return False
+    limit = 2 if min(len(a), len(b)) >= TYPO_LONG_WORD else 1
+    return _edit_distance(a, b, limit) <= limit
+
+
+def _trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TranslationMemory:
+    """Exact and near-duplicate reuse of earlier translations, per target language"""
+
+    def __init__(self, directory=None, max_entries=20000, near_cutoff=0.9, min_near_length=6, max_candidates=8):
+        self.max_entries = max_entries
+        self.near_cutoff = near_cutoff
+        self.min_near_length = min_near_length
+        self.max_candidates = max_candidates
+        self._entries = OrderedDict()  # (lang, text) -> translation
+        self._postings = {}  # (lang, trigram) -> set of texts
+        self._lock = threading.Lock()
+        self._counters = {'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._disk = None
+        if directory:
+            try:
+                self._disk = diskcache.Cache(directory)
+                for key in self._disk.iterkeys():
+                    lang, _, text = key.partition(_SEPARATOR)
+                    translation = self._disk.get(key)
+                    if translation is not None:
+                        self._remember(lang, text, translation)
+            except Exception as e:
+                logger.warning("Translation memory disk store unavailable (%s), using memory only", e)
+                self._disk = None
+
+    def _remember(self, lang, text, translation):
+        # Caller holds the lock (or is __init__)
+        key = (lang, text)
+        if key not in self._entries:
+            for gram in _trigrams(text):
+                self._postings.setdefault((lang, gram), set()).add(text)
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            (old_lang, old_text), _ = self._entries.popitem(last=False)
+            for gram in _trigrams(old_text):
+                texts = self._postings.get((old_lang, gram))
+                if texts is not None:
+                    texts.discard(old_text)
+                    if not texts:
+                        del self._postings[(old_lang, gram)]
+            self._counters['evictions'] += 1
+
+    def _near(self, lang, text):
+        # Caller holds the lock
+        shared = Counter()
+        for gram in _trigrams(text):
+            shared.update(self._postings.get((lang, gram), ()))
+        words = text.split()
+        digits = _DIGITS.findall(text)
+        best, best_score = None, 0.0
+        for candidate, _ in shared.most_common(self.max_candidates):
+            other = candidate.split()
+            if len(other) != len(words) or _DIGITS.findall(candidate) != digits:
+                continue
+            if any(a != b and not _typo_of(a, b) for a, b in zip(words, other)):
+                continue
+            score = difflib.SequenceMatcher(None, text, candidate).ratio()
+            if score >= self.near_cutoff and score > best_score:
+                best, best_score = candidate, score
+        return best, best_score
+
+    def lookup(self, text, lang):
+        """{'translated_text', 'match': 'exact'|'near', 'score', 'source'} or None"""
+        lang, text = normalize_lang(lang), normalize_text(text)
+        if not text:
+            return None
+        with self._lock:
+            translation = self._entries.get((lang, text))
+            if translation is not None:
+                self._entries.move_to_end((lang, text))
+                self._counters['exact_hits'] += 1
+                return {'translated_text': translation, 'match': 'exact', 'score': 1.0, 'source': text}
+            if len(text) >= self.min_near_length:
+                candidate, score = self._near(lang, text)
+                if candidate is not None:
+                    self._entries.move_to_end((lang, candidate))
+                    self._counters['near_hits'] += 1
+                    return {'translated_text': self._entries[(lang, candidate)], 'match': 'near',
+                            'score': round(score, 3), 'source': candidate}
+            self._counters['misses'] += 1
+        return None
+
+    def store(self, text, lang, translation):
+        lang, text = normalize_lang(lang), normalize_text(text)
+        if not text or not isinstance(translation, str) or not translation.strip():
+            return False
+        translation = translation.strip()
+        with self._lock:
+            self._remember(lang, text, translation)
+            self._counters['stores'] += 1
+        if self._disk is not None:
+            try:
+                self._disk.set(lang + _SEPARATOR + text, translation)
+            except Exception as e:
+                logger.warning("Translation memory disk write failed: %s", e)
+        return True
+
+    def hit_rate(self):
+        with self._lock:
+            hits = self._counters['exact_hits'] + self._counters['near_hits']
+            lookups = hits + self._counters['misses']
+        return round(hits / lookups, 4) if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+            languages = len({lang for lang, _ in self._entries})
+        hits = counters['exact_hits'] + counters['near_hits']
+        lookups = hits + counters['misses']
+        return {
+            **counters,
+            'lookups': lookups,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'languages': languages,
+            'near_cutoff': self.near_cutoff,
+            'persistent': self._disk is not None,
+        }
+
+
+def build_batch_prompt(texts, target_lang):
+    """One prompt translating every text, keyed by 1-based position"""
+    numbered = json.dumps({str(i + 1): text for i, text in enumerate(texts)}, ensure_ascii=False)
+    return f"""Translate each numbered text below to {target_lang}. Keep the numbers as keys.
+        Texts: {numbered}
+
+        Strictly return ONLY a JSON object in this format:
+        {{
+            "translations": {{ "1": "TRANSLATION OF TEXT 1", "2": "TRANSLATION OF TEXT 2" }}
+        }}
+
+        Do not include any other text, warnings, or explanations."""
+
+
+def split_batch_result(result, count):
+    """List of `count` translations (None where the reply skipped one)"""
+    translations = result.get('translations') if isinstance(result, dict) else None
+    if isinstance(translations, list):
+        translations = {str(i + 1): value for i, value in enumerate(translations)}
+    if not isinstance(translations, dict):
+        return [None] * count
+    out = []
+    for i in range(count):
+        value = translations.get(str(i + 1))
+        out.append(value.strip() if isinstance(value, str) and value.strip() else None)
+    return out
@@ -1,30 +1,71 @@
 """
 Development version of app.py with MongoDB integration
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
+import click
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import itertools
+import logging
 import os
 import requests
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 from datetime import datetime
 from bson.objectid import ObjectId
 import uuid
+import time
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from app.ai_batch import BatchRunner
+from app.ai_cache import AIResponseCache, load_ttls, make_key
+from app.ai_hedge import AllModelsFailed, HedgeCancelled, HedgedCaller, load_policies as load_hedge_policies
+from app.ai_jobs import AIJobQueue, QueueFull
+from app.ai_prewarm import DEFAULT_FEATURES as PREWARM_FEATURES, CacheWarmer, build_matrix, load_matrix
+from app.ai_scheduler import BACKGROUND, DeadlineExceeded, Overloaded, PriorityScheduler, load_lanes
+from app.buddy_index import BuddyIndex
+from app.budget_model import BudgetModel
+from app.bulk_io import EXPORTABLE, TransferStats, export_ndjson, import_ndjson, iter_lines
+from app.carbon import CarbonCalculator
+from app.destinations import Gazetteer
+from app.emergency import EmergencyDirectory
+from app.expense_stats import ExpenseAggregator
+from app.http_pool import init_pool as init_http_pool
+from app.indexes import QueryPlanError, assert_query_plans, check_query_plans, ensure_indexes
+from app.json_extract import SCHEMAS as JSON_SCHEMAS, AIParseError, extract_json
+from app.json_stream import ItineraryStreamParser
+from app.logging_setup import PAYLOAD_LOGGER, configure_logging
+from app.model_health import ModelScoreboard
+from app.recommender import DestinationRecommender
+from app.single_flight import SingleFlight
+from app.storage import DuplicateKey, StorageError, open_storage
+from app.translation_memory import TranslationMemory, build_batch_prompt, normalize_text, split_batch_result
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger('app_dev')
+payload_logger = logging.getLogger(PAYLOAD_LOGGER)
+
 # MongoDB Connection
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/ai_tour_planner')
 mongo_client = None
 db = None
 socketio = SocketIO(cors_allowed_origins="*", async_mode='threading')
 
+# OpenRouter models to try in order of preference
+OPENROUTER_MODELS = [
+    "google/gemini-2.0-flash-001",
+    "google/gemini-2.0-flash-lite-001",
+    "google/gemini-1.5-flash-v1.0",
+    "meta-llama/llama-3.2-11b-vision-instruct:free",
+    "mistralai/pixtral-12b:free",
+    "openai/gpt-3.5-turbo"
+]
+
 def init_mongodb():
     global mongo_client, db
     try:
@@ -32,30 +73,18 @@ def init_mongodb():
         # Test connection
         mongo_client.admin.command('ping')
         db = mongo_client.get_database()
-        print("[SUCCESS] MongoDB Connected Successfully!")
-        print(f"[INFO] Database: {db.name}")
+        logger.info("MongoDB Connected Successfully!")
+        logger.info("Database: %s", db.name)
         
-        # Create collections if they don't exist
-        if 'itineraries' not in db.list_collection_names():
-            db.create_collection('itineraries')
-        if 'expenses' not in db.list_collection_names():
-            db.create_collection('expenses')
-        if 'bookings' not in db.list_collection_names():
-            db.create_collection('bookings')
+        # Create collections and their indexes if they don't exist
+        ensure_indexes(db)
         
         return True
     except Exception as e:
-        print(f"[ERROR] MongoDB Connection Error: {str(e)}")
-        print("[WARN] Falling back to in-memory storage")
+        logger.error("MongoDB Connection Error: %s", e)
+        logger.warning("Falling back to in-memory storage")
         return False
 
-# Fallback in-memory storage
-in_memory_db = {
-    'itineraries': {},
-    'expenses': {},
-    'bookings': {}
-}
-
 def create_app():
     app = Flask(__name__)
     app.url_map.strict_slashes = False
@@ -64,11 +93,100 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 86400  # 24 hours
     app.config['OPENROUTER_API_KEY'] = os.getenv('OPENROUTER_API_KEY')
-    app.config['OPENROUTER_BASE_URL'] = 'https://openrouter.ai/api/v1'
+    app.config['OPENROUTER_BASE_URL'] = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
+    app.config['OPENROUTER_POOL_SIZE'] = int(os.getenv('OPENROUTER_POOL_SIZE', 32))
+    app.config['OPENROUTER_CONNECT_TIMEOUT'] = float(os.getenv('OPENROUTER_CONNECT_TIMEOUT', 5))
+    app.config['OPENROUTER_READ_TIMEOUT'] = float(os.getenv('OPENROUTER_READ_TIMEOUT', 25))  # Shorter timeout per model
+    app.config['AI_CACHE_ENABLED'] = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+    app.config['AI_CACHE_DIR'] = os.getenv('AI_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.ai_cache'))
+    app.config['AI_CACHE_MAX_ENTRIES'] = int(os.getenv('AI_CACHE_MAX_ENTRIES', 1024))
+    app.config['AI_CACHE_DISK_LIMIT'] = int(os.getenv('AI_CACHE_DISK_LIMIT', 256 * 1024 * 1024))
+    app.config['AI_CACHE_REFRESH_RATIO'] = float(os.getenv('AI_CACHE_REFRESH_RATIO', 0.8))
+    app.config['AI_CACHE_REFRESH_WORKERS'] = int(os.getenv('AI_CACHE_REFRESH_WORKERS', 2))
+    app.config['AI_TM_ENABLED'] = os.getenv('AI_TM_ENABLED', 'true').lower() == 'true'
+    app.config['AI_TM_DIR'] = os.getenv('AI_TM_DIR', os.path.join(app.config['AI_CACHE_DIR'], 'translation_memory'))
+    app.config['AI_TM_MAX_ENTRIES'] = int(os.getenv('AI_TM_MAX_ENTRIES', 20000))
+    app.config['AI_TM_NEAR_CUTOFF'] = float(os.getenv('AI_TM_NEAR_CUTOFF', 0.9))
+    app.config['AI_TRANSLATE_BATCH_MAX'] = int(os.getenv('AI_TRANSLATE_BATCH_MAX', 200))
+    app.config['AI_TRANSLATE_BATCH_CHUNK'] = int(os.getenv('AI_TRANSLATE_BATCH_CHUNK', 40))
+    app.config['AI_PREWARM_ENABLED'] = os.getenv('AI_PREWARM_ENABLED', 'false').lower() == 'true'
+    app.config['AI_PREWARM_FILE'] = os.getenv('AI_PREWARM_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prewarm.json'))
+    app.config['AI_PREWARM_INTERVAL'] = int(os.getenv('AI_PREWARM_INTERVAL', 1800))
+    app.config['AI_PREWARM_CONCURRENCY'] = int(os.getenv('AI_PREWARM_CONCURRENCY', 4))
+    app.config['AI_HEDGE_ENABLED'] = os.getenv('AI_HEDGE_ENABLED', 'true').lower() == 'true'
+    app.config['AI_HEDGE_MAX_WORKERS'] = int(os.getenv('AI_HEDGE_MAX_WORKERS', 32))
+    app.config['AI_SHED_UTILIZATION'] = float(os.getenv('AI_SHED_UTILIZATION', 0.9))
+    app.config['AI_JOB_CONCURRENCY'] = int(os.getenv('AI_JOB_CONCURRENCY', 4))
+    app.config['AI_JOB_MAX_QUEUE'] = int(os.getenv('AI_JOB_MAX_QUEUE', 200))
+    app.config['AI_JOB_RESULT_TTL'] = int(os.getenv('AI_JOB_RESULT_TTL', 600))
+    app.config['AI_BATCH_MAX_ITEMS'] = int(os.getenv('AI_BATCH_MAX_ITEMS', 20))
+    app.config['AI_BATCH_MAX_CONCURRENCY'] = int(os.getenv('AI_BATCH_MAX_CONCURRENCY', 5))
+    app.config['AI_BATCH_MAX_WORKERS'] = int(os.getenv('AI_BATCH_MAX_WORKERS', 16))
+    app.config['AI_SCOREBOARD_WINDOW'] = int(os.getenv('AI_SCOREBOARD_WINDOW', 50))
+    app.config['AI_BREAKER_FAILURES'] = int(os.getenv('AI_BREAKER_FAILURES', 3))
+    app.config['AI_BREAKER_ERROR_RATE'] = float(os.getenv('AI_BREAKER_ERROR_RATE', 0.5))
+    app.config['AI_BREAKER_COOLDOWN'] = float(os.getenv('AI_BREAKER_COOLDOWN', 60))
+    app.config['GAZETTEER_PATH'] = os.getenv('GAZETTEER_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.json'))
+    app.config['DESTINATION_FUZZY_CUTOFF'] = float(os.getenv('DESTINATION_FUZZY_CUTOFF', 0.86))
+    app.config['EMERGENCY_INFO_PATH'] = os.getenv('EMERGENCY_INFO_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'emergency_info.json'))
+    app.config['AI_EMERGENCY_ENRICH'] = os.getenv('AI_EMERGENCY_ENRICH', 'false').lower() == 'true'
+    app.config['ECO_DEFAULT_ORIGIN'] = os.getenv('ECO_DEFAULT_ORIGIN', 'Delhi')
+    app.config['AI_ECO_ENRICH'] = os.getenv('AI_ECO_ENRICH', 'false').lower() == 'true'
+    app.config['DESTINATION_CATALOG_PATH'] = os.getenv('DESTINATION_CATALOG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'destination_catalog.json'))
+    app.config['RECOMMEND_MAX_RESULTS'] = int(os.getenv('RECOMMEND_MAX_RESULTS', 10))
+    app.config['AI_RECOMMEND_ENRICH'] = os.getenv('AI_RECOMMEND_ENRICH', 'false').lower() == 'true'
+    app.config['BUDGET_MIN_SAMPLES'] = int(os.getenv('BUDGET_MIN_SAMPLES', 3))
+    app.config['BUDGET_RELOAD_INTERVAL'] = int(os.getenv('BUDGET_RELOAD_INTERVAL', 600))
+    app.config['DEFAULT_CURRENCY'] = os.getenv('DEFAULT_CURRENCY', 'INR').upper()
+    app.config['BUDDY_REBUILD_THRESHOLD'] = int(os.getenv('BUDDY_REBUILD_THRESHOLD', 500))
+    app.config['BUDDY_RELOAD_INTERVAL'] = int(os.getenv('BUDDY_RELOAD_INTERVAL', 600))
+    app.config['BUDDY_MAX_MATCHES'] = int(os.getenv('BUDDY_MAX_MATCHES', 20))
+    app.config['LIST_DEFAULT_LIMIT'] = int(os.getenv('LIST_DEFAULT_LIMIT', 0))  # 0 = whole collection unless ?limit=
+    app.config['LIST_MAX_LIMIT'] = int(os.getenv('LIST_MAX_LIMIT', 500))
+    app.config['MONGODB_PLAN_CHECK'] = os.getenv('MONGODB_PLAN_CHECK', 'warn').lower()
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO')
+    app.config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'text')
+    app.config['LOG_DIR'] = os.getenv('LOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs'))
+    app.config['LOG_MAX_BYTES'] = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['LOG_BACKUP_COUNT'] = int(os.getenv('LOG_BACKUP_COUNT', 5))
+    app.config['LOG_QUEUE_SIZE'] = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    app.config['AI_LOG_PAYLOAD_SAMPLE'] = float(os.getenv('AI_LOG_PAYLOAD_SAMPLE', 0.01))
+    app.config['AI_LOG_PAYLOAD_MAX_CHARS'] = int(os.getenv('AI_LOG_PAYLOAD_MAX_CHARS', 2000))
+
+    # Queue-based logging: callers only enqueue, a writer thread formats, prints and rotates
+    log_pipeline = configure_logging(
+        level=app.config['LOG_LEVEL'],
+        log_dir=app.config['LOG_DIR'],
+        max_bytes=app.config['LOG_MAX_BYTES'],
+        backup_count=app.config['LOG_BACKUP_COUNT'],
+        console_format=app.config['LOG_FORMAT'],
+        queue_size=app.config['LOG_QUEUE_SIZE'],
+        payload_sample_rate=app.config['AI_LOG_PAYLOAD_SAMPLE'],
+        payload_max_chars=app.config['AI_LOG_PAYLOAD_MAX_CHARS']
+    )
+    app.extensions['log_pipeline'] = log_pipeline
     
     # Initialize MongoDB
     mongodb_connected = init_mongodb()
     app.config['MONGODB_CONNECTED'] = mongodb_connected
+
+    # Every hot query must be served by an index (off | warn | strict)
+    if mongodb_connected and app.config['MONGODB_PLAN_CHECK'] != 'off':
+        try:
+            assert_query_plans(db)
+        except QueryPlanError as e:
+            if app.config['MONGODB_PLAN_CHECK'] == 'strict':
+                raise
+            logger.error("Query plan check failed: %s", e)
+        except PyMongoError as e:
+            logger.warning("Query plan check skipped: %s", e)
+
+    # Repositories for every collection; the backend is chosen here, once
+    storage = open_storage(db if mongodb_connected else None)
+    app.extensions['storage'] = storage
+    # Per-itinerary totals: aggregation pipelines on MongoDB, NumPy over the hash indexes in memory
+    expense_aggregator = ExpenseAggregator(storage)
+    app.extensions['expense_aggregator'] = expense_aggregator
     
     # Initialize extensions with proper CORS configuration
     CORS(app, resources={
@@ -82,94 +200,243 @@ def create_app():
     jwt = JWTManager(app)
     socketio.init_app(app)
     
-    print("[WARN] Running in DEVELOPMENT mode - Firebase disabled for testing")
-    print("[NOTE] Note: Routes that require Firebase are disabled")
-    print("[INFO] OpenRouter API configured for AI features")
-    if app.config['MONGODB_CONNECTED'] and db is not None:
-        print("[INFO] Using MongoDB for persistent storage")
+    logger.warning("Running in DEVELOPMENT mode - Firebase disabled for testing")
+    logger.info("Routes that require Firebase are disabled")
+    logger.info("OpenRouter API configured for AI features")
+    if storage.backend == 'mongodb':
+        logger.info("Using MongoDB for persistent storage")
     else:
-        print("[INFO] Using in-memory storage (fallback)")
+        logger.info("Using in-memory storage (fallback)")
+
+    # Shared keep-alive connection pool for OpenRouter
+    openrouter_http = init_http_pool(
+        pool_size=app.config['OPENROUTER_POOL_SIZE'],
+        connect_timeout=app.config['OPENROUTER_CONNECT_TIMEOUT'],
+        read_timeout=app.config['OPENROUTER_READ_TIMEOUT'],
+        headers={
+            "HTTP-Referer": "http://localhost:3001",
+            "X-Title": "AI Tour Planner"
+        }
+    )
+    app.extensions['openrouter_http'] = openrouter_http
+
+    # AI response cache (memory LRU + shared disk tier)
+    ai_cache = AIResponseCache(
+        directory=app.config['AI_CACHE_DIR'],
+        max_entries=app.config['AI_CACHE_MAX_ENTRIES'],
+        disk_size_limit=app.config['AI_CACHE_DISK_LIMIT'],
+        ttls=load_ttls(),
+        refresh_ratio=app.config['AI_CACHE_REFRESH_RATIO']
+    )
+    app.extensions['ai_cache'] = ai_cache
+
+    # Translation memory: (target language, normalized text) -> earlier translation
+    translation_memory = TranslationMemory(
+        directory=app.config['AI_TM_DIR'],
+        max_entries=app.config['AI_TM_MAX_ENTRIES'],
+        near_cutoff=app.config['AI_TM_NEAR_CUTOFF']
+    )
+    app.extensions['translation_memory'] = translation_memory
+
+    # Priority lanes for upstream AI calls (critical / interactive / background)
+    ai_lanes = load_lanes()
+    ai_scheduler = PriorityScheduler(lanes=ai_lanes, shed_utilization=app.config['AI_SHED_UTILIZATION'])
+    app.extensions['ai_scheduler'] = ai_scheduler
+
+    # Hedged fan-out across the model list, with a thread pool per lane
+    hedge_policies = load_hedge_policies()
+    hedge_width = max(policy['width'] for policy in hedge_policies.values())
+    ai_hedger = HedgedCaller(
+        max_workers=app.config['AI_HEDGE_MAX_WORKERS'],
+        policies=hedge_policies,
+        lane_workers={name: lane['concurrency'] * hedge_width for name, lane in ai_lanes.items()}
+    )
+    app.extensions['ai_hedger'] = ai_hedger
+
+    # Model health scoreboard / circuit breaker
+    model_scoreboard = ModelScoreboard(
+        window=app.config['AI_SCOREBOARD_WINDOW'],
+        failure_threshold=app.config['AI_BREAKER_FAILURES'],
+        error_rate_threshold=app.config['AI_BREAKER_ERROR_RATE'],
+        cooldown=app.config['AI_BREAKER_COOLDOWN']
+    )
+    app.extensions['model_scoreboard'] = model_scoreboard
+
+    # Coalesces identical in-flight prompts
+    ai_single_flight = SingleFlight()
+    app.extensions['ai_single_flight'] = ai_single_flight
+
+    # Free-text destination -> gazetteer place, so spellings share prompts and cache entries
+    destinations = Gazetteer.load(app.config['GAZETTEER_PATH'], fuzzy_cutoff=app.config['DESTINATION_FUZZY_CUTOFF'])
+    app.extensions['destinations'] = destinations
+
+    # Emergency numbers and distress phrases answered from local data, no model call
+    emergency_directory = EmergencyDirectory.load(app.config['EMERGENCY_INFO_PATH'], destinations)
+    app.extensions['emergency_directory'] = emergency_directory
+
+    # Trip CO2 from emission factors and gazetteer coordinates, no model call
+    carbon_calculator = CarbonCalculator(destinations, default_origin=app.config['ECO_DEFAULT_ORIGIN'])
+    app.extensions['carbon_calculator'] = carbon_calculator
+
+    # Destination suggestions scored against a local catalog, no model call
+    destination_recommender = DestinationRecommender.load(app.config['DESTINATION_CATALOG_PATH'], destinations)
+    app.extensions['destination_recommender'] = destination_recommender
+
+    def _load_budget_history():
+        """(itineraries, expenses) with just the fields the budget model reads"""
+        itinerary_fields = ['id', 'destination', 'travelers', 'startDate', 'endDate', 'start_date', 'end_date']
+        expense_fields = ['id', 'itineraryId', 'itinerary_id', 'category', 'currency', 'amount']
+        try:
+            return storage.itineraries.query(fields=itinerary_fields), storage.expenses.query(fields=expense_fields)
+        except StorageError as e:
+            logger.warning("Budget history load failed: %s", e)
+            return [], []
+
+    # Percentile budgets from recorded expenses, kept current by the expense/itinerary routes
+    budget_model = BudgetModel(
+        destinations,
+        loader=_load_budget_history,
+        min_samples=app.config['BUDGET_MIN_SAMPLES'],
+        reload_interval=app.config['BUDGET_RELOAD_INTERVAL'],
+        currency=app.config['DEFAULT_CURRENCY']
+    )
+    app.extensions['budget_model'] = budget_model
+
+    def _load_buddy_profiles():
+        """(users, itineraries) with just the fields buddy matching reads"""
+        user_fields = ['id', 'email', 'fullName', 'interests', 'travel_style']
+        itinerary_fields = ['id', 'creator_email', 'interests', 'destination']
+        try:
+            return storage.users.query(fields=user_fields), storage.itineraries.query(fields=itinerary_fields)
+        except StorageError as e:
+            logger.warning("Buddy profile load failed: %s", e)
+            return [], []
+
+    # Nearest-neighbour index over registered users, kept current by the auth/itinerary routes
+    buddy_index = BuddyIndex(
+        destinations,
+        loader=_load_buddy_profiles,
+        rebuild_threshold=app.config['BUDDY_REBUILD_THRESHOLD'],
+        reload_interval=app.config['BUDDY_RELOAD_INTERVAL']
+    )
+    app.extensions['buddy_index'] = buddy_index
     
-    def _call_openrouter(prompt, system_prompt="You are a helpful travel assistant."):
+    def _call_openrouter(prompt, system_prompt="You are a helpful travel assistant.", endpoint=None):
         """Helper to call OpenRouter API"""
-        import requests
+        key = make_key(system_prompt, prompt, OPENROUTER_MODELS[0])
+        use_cache = bool(app.config['AI_CACHE_ENABLED'] and endpoint and ai_cache.ttl_for(endpoint) > 0)
+        if use_cache:
+            cached, stale = ai_cache.lookup(key, endpoint)
+            if cached is not None:
+                logger.debug("AI cache hit for %s", endpoint, extra={'endpoint': endpoint, 'stale': stale})
+                if stale:
+                    # Serve the cached copy now and refresh it off the request path
+                    ai_warmer.refresh_async(key, lambda: _fetch_openrouter(key, prompt, system_prompt, endpoint, use_cache, BACKGROUND))
+                return cached
+        return _fetch_openrouter(key, prompt, system_prompt, endpoint, use_cache)
+
+    def _fetch_openrouter(key, prompt, system_prompt, endpoint=None, use_cache=False, priority=None):
+        """Call the models in the endpoint's priority lane, caching a successful result under key"""
+        lane = ai_scheduler.priority_for(endpoint, priority)
+
+        def fetch():
+            with ai_scheduler.slot(endpoint, lane) as deadline:
+                result = _request_openrouter(prompt, system_prompt, list(OPENROUTER_MODELS), endpoint, deadline, lane)
+            if use_cache and isinstance(result, dict) and not result.get('error'):
+                ai_cache.set(key, result, endpoint)
+            return result
+
+        # Identical prompts already in flight in the same lane share one upstream call; a
+        # foreground caller never waits behind a background prewarm or refresh
+        return ai_single_flight.do((lane, key), fetch, label=endpoint)
+
+    def _parse_ai_content(content, endpoint=None):
+        """Extract the endpoint's JSON object from a model reply, raising AIParseError"""
+        try:
+            return extract_json(content, JSON_SCHEMAS.get(endpoint))
+        except AIParseError as e:
+            logger.error("JSON Parsing failed: %s", e, extra={'endpoint': endpoint})
+            raise
+
+    def _attempt_model(model, cancelled, prompt, system_prompt, api_key, endpoint=None, deadline=None):
+        """One model attempt; raises unless the model returned parseable JSON"""
+        if cancelled.is_set():
+            raise HedgeCancelled(model)
+        logger.debug("Trying model: %s", model, extra={'model': model, 'endpoint': endpoint})
+        started = time.monotonic()
+        read_timeout = None
+        if deadline is not None:
+            # Don't wait on a model past the caller's deadline
+            read_timeout = max(1.0, min(app.config['OPENROUTER_READ_TIMEOUT'], deadline - started))
+        try:
+            response = openrouter_http.post(
+                f"{app.config['OPENROUTER_BASE_URL']}/chat/completions",
+                read_timeout=read_timeout,
+                headers={"Authorization": f"Bearer {api_key}"},
+                json={
+                    "model": model,
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ]
+                }
+            )
+            
+            if response.status_code != 200:
+                logger.debug("Model %s failed with %s: %s", model, response.status_code, response.text[:100],
+                             extra={'model': model, 'endpoint': endpoint, 'status': response.status_code})
+                raise RuntimeError(f"HTTP {response.status_code}")
+            
+            content = response.json()['choices'][0]['message']['content']
+            if not content:
+                raise RuntimeError("Empty content")
+        except Exception as e:
+            model_scoreboard.record(model, time.monotonic() - started, ok=False, error=str(e)[:200])
+            raise
+        latency_ms = round((time.monotonic() - started) * 1000)
+        logger.debug("Success with model %s", model, extra={'model': model, 'endpoint': endpoint, 'latency_ms': latency_ms})
+
+        # Sampled (AI_LOG_PAYLOAD_SAMPLE) prompt/reply record for deep debugging
+        payload_logger.info("AI reply from %s", model, extra={
+            'model': model, 'endpoint': endpoint, 'latency_ms': latency_ms, 'prompt': prompt, 'result': content})
+        
+        try:
+            result = _parse_ai_content(content, endpoint)
+        except AIParseError:
+            model_scoreboard.record(model, time.monotonic() - started, ok=True, json_ok=False, error="JSON parsing failed")
+            raise
+        model_scoreboard.record(model, time.monotonic() - started, ok=True, json_ok=True)
+        return result
+
+    def _request_openrouter(prompt, system_prompt, models_to_try, endpoint=None, deadline=None, lane=None):
+        """Send the prompt upstream, hedging across models_to_try"""
         try:
             api_key = app.config.get('OPENROUTER_API_KEY')
             if not api_key:
                 return {"error": "OpenRouter API key not configured"}
             
-            print(f"DEBUG: Calling AI with multi-model fallback...")
+            if app.config['AI_HEDGE_ENABLED']:
+                policy = ai_hedger.policy_for(endpoint)
+            else:
+                policy = {'width': 1, 'delay': None}
+            logger.debug("Calling AI with hedged fan-out (width=%s, delay=%s)...", policy['width'], policy['delay'])
             
-            # List of models to try in order of preference
-            models_to_try = [
-                "google/gemini-2.0-flash-001",
-                "google/gemini-2.0-flash-lite-001",
-                "google/gemini-1.5-flash-v1.0",
-                "meta-llama/llama-3.2-11b-vision-instruct:free",
-                "mistralai/pixtral-12b:free",
-                "openai/gpt-3.5-turbo"
-            ]
+            def attempt(model, cancelled):
+                return _attempt_model(model, cancelled, prompt, system_prompt, api_key, endpoint, deadline)
             
-            content = None
-            for model in models_to_try:
-                try:
-                    print(f"DEBUG: Trying model: {model}")
-                    response = requests.post(
-                        f"{app.config['OPENROUTER_BASE_URL']}/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {api_key}",
-                            "HTTP-Referer": "http://localhost:3001",
-                            "X-Title": "AI Tour Planner"
-                        },
-                        json={
-                            "model": model,
-                            "messages": [
-                                {"role": "system", "content": system_prompt},
-                                {"role": "user", "content": prompt}
-                            ]
-                        },
-                        timeout=25 # Shorter timeout per model
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        content = result['choices'][0]['message']['content']
-                        print(f"DEBUG: Success with model {model}")
-                        break
-                    else:
-                        print(f"DEBUG: Model {model} failed with {response.status_code}: {response.text[:100]}")
-                except Exception as e:
-                    print(f"DEBUG: Model {model} error: {str(e)}")
-                    continue
-            
-            if content:
-                # Log to file for deep debugging
-                try:
-                    with open("ai_debug.log", "a", encoding="utf-8") as f:
-                        f.write(f"\n--- {datetime.now()} ---\n")
-                        f.write(f"PROMPT: {prompt[:100]}...\n")
-                        f.write(f"RESULT: {content}\n")
-                except:
-                    pass
-                    
-                import json
-                try:
-                    # More robust JSON extraction
-                    import re
-                    json_match = re.search(r'(\{.*\})', content, re.DOTALL)
-                    if json_match:
-                        return json.loads(json_match.group(1))
-                    
-                    # Fallback to existing logic
-                    if "```json" in content:
-                        content = content.split("```json")[1].split("```")[0].strip()
-                    elif "```" in content:
-                        content = content.split("```")[1].split("```")[0].strip()
-                    return json.loads(content)
-                except Exception as e:
-                    print(f"ERROR: JSON Parsing failed: {str(e)}")
-                    return {"content": content, "error": "Parsing failed"}
-            else:
+            try:
+                ranked = model_scoreboard.order(models_to_try)
+                timeout = max(0.0, deadline - time.monotonic()) if deadline else None
+                model, result = ai_hedger.call(ranked, attempt, policy['width'], policy['delay'], timeout=timeout, lane=lane)
+                return result
+            except AllModelsFailed as failure:
+                for model, error in failure.errors:
+                    if not isinstance(error, (AIParseError, HedgeCancelled)):
+                        logger.debug("Model %s error: %s", model, error, extra={'model': model, 'endpoint': endpoint})
+                # Keep the raw reply when a model answered but not with JSON
+                unparsed = [error for _, error in failure.errors if isinstance(error, AIParseError)]
+                if unparsed:
+                    return {"content": unparsed[0].content, "error": "Parsing failed"}
                 return {"error": f"API Error: All models failed or returned empty content"}
         except Exception as e:
             return {"error": str(e)}
@@ -180,15 +447,412 @@ def create_app():
         """Test OpenRouter API integration"""
         data = request.get_json()
         prompt = data.get('prompt', 'Hello, provide a travel recommendation')
-        result = _call_openrouter(prompt)
+        result = _call_openrouter(prompt, endpoint='test')
         return jsonify(result)
 
+    @app.route('/api/admin/ai/cache', methods=['GET', 'DELETE', 'OPTIONS'])
+    def ai_cache_admin():
+        """Inspect or clear the AI response cache"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        if request.method == 'DELETE':
+            ai_cache.clear()
+            return jsonify({"success": True, "message": "AI cache cleared"}), 200
+        data = ai_cache.stats()
+        data['single_flight'] = ai_single_flight.stats()
+        data['canonicalization'] = destinations.stats()
+        data['emergency_local'] = emergency_directory.stats()
+        data['budget_model'] = budget_model.stats()
+        data['buddy_index'] = buddy_index.stats()
+        return jsonify({"success": True, "data": data}), 200
+
+    @app.route('/api/admin/ai/models', methods=['GET', 'DELETE', 'OPTIONS'])
+    def ai_models_admin():
+        """Inspect or reset the model health scoreboard"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        if request.method == 'DELETE':
+            model_scoreboard.reset()
+            return jsonify({"success": True, "message": "Model scoreboard reset"}), 200
+        data = model_scoreboard.snapshot()
+        data['configured_order'] = list(OPENROUTER_MODELS)
+        return jsonify({"success": True, "data": data}), 200
+
+    @app.route('/api/admin/ai/lanes', methods=['GET', 'OPTIONS'])
+    def ai_lanes_admin():
+        """Per-lane concurrency, queueing and shedding for upstream AI calls, plus hedge losers"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        data = ai_scheduler.stats()
+        data['hedging'] = ai_hedger.stats()
+        return jsonify({"success": True, "data": data}), 200
+
+    @app.route('/api/admin/ai/http', methods=['GET', 'OPTIONS'])
+    def ai_http_admin():
+        """Connection pool reuse metrics for OpenRouter traffic"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        return jsonify({"success": True, "data": openrouter_http.stats()}), 200
+
+    @app.route('/api/admin/logging', methods=['GET', 'OPTIONS'])
+    def logging_admin():
+        """Log queue depth, dropped records and AI payload sampling counters"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        return jsonify({"success": True, "data": log_pipeline.stats()}), 200
+
+    @app.route('/api/admin/storage', methods=['GET', 'OPTIONS'])
+    def storage_admin():
+        """Active storage backend and document count per collection"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        return jsonify({"success": True, "data": storage.stats()}), 200
+
+    def _fields_arg(value):
+        return [f.strip() for f in (value or '').split(',') if f.strip()] or None
+
+    @app.route('/api/admin/export/<collection>', methods=['GET', 'OPTIONS'])
+    def export_collection(collection):
+        """Stream a collection as newline-delimited JSON (?fields=, ?batch_size=)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        if collection not in EXPORTABLE:
+            return jsonify({"error": f"Unknown collection: {collection}"}), 404
+        batch_size = max(1, min(request.args.get('batch_size', 1000, type=int), 10000))
+        lines = export_ndjson(getattr(storage, collection), collection, _fields_arg(request.args.get('fields')), batch_size)
+        try:
+            # Pull the first batch now so bad fields or a storage error still get a proper status
+            first = next(lines, '')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return Response(
+            stream_with_context(itertools.chain([first], lines)),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename={collection}.ndjson'}
+        )
+
+    @app.route('/api/admin/import/<collection>', methods=['POST', 'OPTIONS'])
+    def import_collection(collection):
+        """Insert newline-delimited JSON from the request body, skipping existing ids"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        if collection not in EXPORTABLE:
+            return jsonify({"error": f"Unknown collection: {collection}"}), 404
+        batch_size = max(1, min(request.args.get('batch_size', 1000, type=int), 10000))
+        stats = import_ndjson(getattr(storage, collection), collection, iter_lines(request.stream), batch_size)
+        # Derived models read these collections; they pick up the imported documents in the background
+        if collection in ('itineraries', 'expenses'):
+            budget_model.reload_async()
+        if collection == 'itineraries':
+            buddy_index.reload_async()
+        return jsonify({"success": True, "data": stats.to_dict()}), 200
+
+    @app.route('/api/destinations/resolve', methods=['GET', 'OPTIONS'])
+    def resolve_destination():
+        """Map a free-text destination to its gazetteer place"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        query = request.args.get('q', '')
+        if not query.strip():
+            return jsonify({"error": "q is required"}), 400
+        return jsonify({"success": True, "data": destinations.resolve(query).to_dict()}), 200
+
+    # --- AI FEATURE REGISTRY & JOB QUEUE ---
+
+    # name -> prompt builder, system prompt and result handling for each AI route
+    ai_features = {}
+
+    def ai_feature(name, system_prompt, postprocess=None, error_status=500, places=(), local=None):
+        """Register a prompt builder so routes, jobs and batches share it
+
+        local(data) may answer without the model; returning None falls through to the prompt.
+        It sees the request as sent: place fields are canonicalized for the prompt only,
+        so local answers can tell an exact place from a fuzzy guess.
+        """
+        def register(build_prompt):
+            ai_features[name] = {
+                'build_prompt': build_prompt,
+                'system_prompt': system_prompt,
+                'postprocess': postprocess,
+                'error_status': error_status,
+                'places': places,
+                'local': local
+            }
+            return build_prompt
+        return register
+
+    def _canonicalize_places(data, fields):
+        """Copy of data with free-text place fields replaced by their canonical names"""
+        data = dict(data)
+        for field in fields:
+            if isinstance(data.get(field), str) and data[field].strip():
+                data[field] = destinations.canonical_name(data[field])
+        return data
+
+    def _run_ai_feature(name, data):
+        """Run a registered AI feature, returning (payload, status_code)"""
+        feature = ai_features.get(name)
+        if feature is None:
+            return {"error": f"Unknown AI feature: {name}"}, 400
+        data = data or {}
+        if feature['local']:
+            local = feature['local'](data)
+            if local is not None:
+                return local, 200
+        if feature['places']:
+            data = _canonicalize_places(data, feature['places'])
+        prompt = feature['build_prompt'](data)
+        try:
+            result = _call_openrouter(prompt, feature['system_prompt'], endpoint=name)
+        except Overloaded as e:
+            return {"error": str(e), "retry_after": e.retry_after}, 503
+        except DeadlineExceeded as e:
+            return {"error": str(e)}, 504
+        
+        if feature['postprocess']:
+            return feature['postprocess'](data, result)
+        if feature['error_status'] and isinstance(result, dict) and result.get('error'):
+            return {"error": result['error']}, feature['error_status']
+        return result, 200
+
+    def _push_job_result(job):
+        if job.get('room'):
+            socketio.emit('ai_job_done', job, room=job['room'])
+
+    ai_jobs = AIJobQueue(
+        runner=_run_ai_feature,
+        concurrency=app.config['AI_JOB_CONCURRENCY'],
+        max_queue=app.config['AI_JOB_MAX_QUEUE'],
+        result_ttl=app.config['AI_JOB_RESULT_TTL'],
+        on_complete=_push_job_result
+    )
+    app.extensions['ai_jobs'] = ai_jobs
+
+    def _submit_ai_job(name, data, room=None):
+        if name not in ai_features:
+            return jsonify({"error": f"Unknown AI feature: {name}"}), 400
+        try:
+            job = ai_jobs.submit(name, data or {}, room=room)
+        except QueueFull as e:
+            return jsonify({"error": str(e)}), 503
+        return jsonify({"success": True, "data": {"job_id": job['id'], "status": job['status']}}), 202
+
+    def _wants_enrichment(data, config_key):
+        """?enrich=true, or "enrich" in the body, defaulting to app.config[config_key]"""
+        return request.args.get('enrich', str(data.get('enrich', app.config[config_key]))).lower() == 'true'
+
+    def _enrich_in_background(payload, name, job_data):
+        """Queue model-written extras for a locally answered payload; adds enrichment.job_id"""
+        try:
+            job = ai_jobs.submit(name, job_data, room=request.args.get('room'))
+        except QueueFull as e:
+            logger.warning("%s enrichment skipped: %s", name, e)
+            return payload
+        return {**payload, 'enrichment': {"job_id": job['id'], "status": job['status']}}
+
+    def _ai_feature_response(name, data):
+        """Answer an AI route inline, or as a background job with ?async=true"""
+        if request.args.get('async', 'false').lower() == 'true':
+            return _submit_ai_job(name, data, room=request.args.get('room'))
+        payload, status = _run_ai_feature(name, data)
+        return jsonify(payload), status
+
+    @app.route('/api/ai/jobs', methods=['POST', 'OPTIONS'])
+    def create_ai_job():
+        """Queue an AI feature call and return its job id immediately"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        data = request.get_json() or {}
+        return _submit_ai_job(data.get('feature'), data.get('payload'), room=data.get('room'))
+
+    @app.route('/api/ai/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+    def get_ai_job(job_id):
+        """Poll an AI job"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        job = ai_jobs.get(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify({"success": True, "data": job}), 200
+
+    ai_batches = BatchRunner(
+        runner=_run_ai_feature,
+        max_workers=app.config['AI_BATCH_MAX_WORKERS'],
+        max_items=app.config['AI_BATCH_MAX_ITEMS'],
+        max_concurrency=app.config['AI_BATCH_MAX_CONCURRENCY']
+    )
+
+    @app.route('/api/ai/batch', methods=['POST', 'OPTIONS'])
+    def ai_batch():
+        """Run several AI features concurrently and return a keyed result map"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object with an items list"}), 400
+        items = data.get('items', [])
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items must be a non-empty list"}), 400
+        if len(items) > ai_batches.max_items:
+            return jsonify({"error": f"A batch can hold at most {ai_batches.max_items} items"}), 400
+        
+        work = []
+        results = {}
+        seen = set()
+        for index, item in enumerate(items):
+            named = (item.get('id') or item.get('feature')) if isinstance(item, dict) else None
+            key = str(named or index)
+            if key in seen:
+                key = f"{key}-{index}"
+            seen.add(key)
+            if not isinstance(item, dict):
+                results[key] = {"status": 400, "error": "Item must be an object with a feature"}
+                continue
+            if not isinstance(item.get('feature'), str) or item['feature'] not in ai_features:
+                results[key] = {"status": 400, "error": f"Unknown AI feature: {item.get('feature')}"}
+                continue
+            if not isinstance(item.get('payload') or {}, dict):
+                results[key] = {"status": 400, "error": "payload must be an object"}
+                continue
+            work.append((key, item['feature'], item.get('payload') or {}))
+        
+        try:
+            timeout = float(data['timeout']) if data.get('timeout') else None
+            concurrency = int(data['concurrency']) if data.get('concurrency') else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "timeout and concurrency must be numbers"}), 400
+        
+        started = time.monotonic()
+        results.update(ai_batches.run(work, concurrency=concurrency, timeout=timeout))
+        failed = sum(1 for r in results.values() if r['status'] >= 400)
+        return jsonify({
+            "success": failed == 0,
+            "data": results,
+            "completed": len(results) - failed,
+            "failed": failed,
+            "elapsed": round(time.monotonic() - started, 3)
+        }), 200
+
+    @app.route('/api/admin/ai/jobs', methods=['GET', 'OPTIONS'])
+    def ai_jobs_admin():
+        """Queue depth and wait-time metrics for AI jobs"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        return jsonify({"success": True, "data": ai_jobs.stats()}), 200
+
+    def _warm_ai_feature(name, data):
+        """Make sure a feature's cached answer for data is fresh; returns the outcome"""
+        feature = ai_features[name]
+        if not app.config['AI_CACHE_ENABLED'] or ai_cache.ttl_for(name) <= 0:
+            return 'skipped'
+        if feature['local'] and feature['local'](data) is not None:
+            return 'skipped'
+        if feature['places']:
+            data = _canonicalize_places(data, feature['places'])
+        prompt = feature['build_prompt'](data)
+        key = make_key(feature['system_prompt'], prompt, OPENROUTER_MODELS[0])
+        state = ai_cache.peek(key, name)
+        if state == 'fresh':
+            return 'fresh'
+        try:
+            result = _fetch_openrouter(key, prompt, feature['system_prompt'], name, use_cache=True, priority=BACKGROUND)
+        except (Overloaded, DeadlineExceeded):
+            return 'shed'
+
+        if isinstance(result, dict) and result.get('error'):
+            return 'failed'
+        return 'refreshed' if state == 'stale' else 'filled'
+
+    ai_warmer = CacheWarmer(
+        warm=_warm_ai_feature,
+        concurrency=app.config['AI_PREWARM_CONCURRENCY'],
+        refresh_workers=app.config['AI_CACHE_REFRESH_WORKERS']
+    )
+    app.extensions['ai_warmer'] = ai_warmer
+
+    def _prewarm_matrix(destinations=None, features=None, path=None):
+        if destinations:
+            names = features or PREWARM_FEATURES
+            return build_matrix(destinations, {name: [{}] for name in names})
+        return load_matrix(path or app.config['AI_PREWARM_FILE'])
+
+    @app.route('/api/admin/ai/prewarm', methods=['GET', 'POST', 'OPTIONS'])
+    def ai_prewarm_admin():
+        """Pre-warm status, or start a run (optionally for given destinations/features)"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        if request.method == 'GET':
+            return jsonify({"success": True, "data": ai_warmer.stats()}), 200
+        data = request.get_json(silent=True) or {}
+        try:
+            matrix = _prewarm_matrix(data.get('destinations'), data.get('features'))
+        except (OSError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        if not ai_warmer.run_async(matrix, data.get('concurrency')):
+            return jsonify({"error": "A pre-warm run is already in progress"}), 409
+        return jsonify({"success": True, "data": {"queued": len(matrix)}}), 202
+
+    @app.cli.command('ai-prewarm')
+    @click.option('--file', 'path', default=None, help='Warm matrix JSON (defaults to AI_PREWARM_FILE)')
+    @click.option('--destinations', default=None, help='Comma-separated destinations, instead of --file')
+    @click.option('--features', default=None, help='Comma-separated features to warm with --destinations')
+    @click.option('--concurrency', type=int, default=None)
+    def ai_prewarm_command(path, destinations, features, concurrency):
+        """Populate the AI response cache for popular destinations"""
+        matrix = _prewarm_matrix(
+            [d.strip() for d in destinations.split(',') if d.strip()] if destinations else None,
+            [f.strip() for f in features.split(',') if f.strip()] if features else None,
+            path
+        )
+        logger.info("Pre-warming %s AI cache entries", len(matrix))
+        summary = ai_warmer.run(matrix, concurrency)
+        logger.info("AI cache pre-warm finished: %s", summary)
+
+    @app.cli.command('db-check')
+    def db_check_command():
+        """Create missing MongoDB indexes and explain() every hot query"""
+        if not mongodb_connected:
+            raise click.ClickException("MongoDB is not connected")
+        for name, indexes in ensure_indexes(db).items():
+            click.echo(f"{name:<15} indexes: {', '.join(indexes) or '-'}")
+        results = check_query_plans(db)
+        for r in results:
+            click.echo(f"{'ok' if r['ok'] else 'SCAN':<5} {r['collection']:<15} {r['query']:<24} {' > '.join(r['stages'])}")
+        if not all(r['ok'] for r in results):
+            raise click.ClickException("Some hot queries plan a COLLSCAN")
+
+    @app.cli.command('data-export')
+    @click.argument('collection', type=click.Choice(EXPORTABLE))
+    @click.option('--out', type=click.File('w', encoding='utf-8'), default='-', help='Output file (default stdout)')
+    @click.option('--fields', default=None, help='Comma-separated fields to keep, or -field to drop')
+    @click.option('--batch-size', type=int, default=1000)
+    def data_export_command(collection, out, fields, batch_size):
+        """Write a collection as newline-delimited JSON"""
+        stats = TransferStats(collection)
+        for line in export_ndjson(getattr(storage, collection), collection, _fields_arg(fields), batch_size, stats):
+            out.write(line)
+        summary = stats.to_dict()
+        click.echo(f"{summary['docs']} {collection} in {summary['seconds']}s ({summary['docs_per_sec']} docs/sec)", err=True)
+
+    @app.cli.command('data-import')
+    @click.argument('collection', type=click.Choice(EXPORTABLE))
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--batch-size', type=int, default=1000)
+    def data_import_command(collection, source, batch_size):
+        """Insert newline-delimited JSON into a collection, skipping existing ids"""
+        summary = import_ndjson(getattr(storage, collection), collection, source, batch_size).to_dict()
+        click.echo(f"{summary['inserted']} inserted, {summary['duplicates']} duplicates, {summary['invalid']} invalid "
+                   f"in {summary['seconds']}s ({summary['docs_per_sec']} docs/sec)", err=True)
+        for error in summary['errors']:
+            click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
     # --- CORE AI BACKEND ROUTES (Fixing 404s) ---
 
-    @app.route('/api/ai/generate-itinerary', methods=['POST'])
-    def ai_generate_itinerary():
-        """Real AI Itinerary Generation"""
-        data = request.get_json()
+    ITINERARY_SYSTEM_PROMPT = "You are an expert travel planner. Return raw JSON only."
+
+    @ai_feature('generate-itinerary', ITINERARY_SYSTEM_PROMPT)
+    def _itinerary_prompt(data):
+        """Build the itinerary generation prompt from request data"""
         dest = data.get('destination', 'Unknown')
         start = data.get('start_date', '')
         end = data.get('end_date', '')
@@ -196,7 +860,7 @@ def create_app():
         interests = ", ".join(data.get('interests', []))
         style = data.get('travel_style', 'balanced')
         
-        prompt = f"""Generate a {style} travel itinerary for {dest} from {start} to {end}.
+        return f"""Generate a {style} travel itinerary for {dest} from {start} to {end}.
         Budget: ₹{budget}. Interests: {interests}.
         Return ONLY valid JSON with this structure:
         {{
@@ -210,74 +874,194 @@ def create_app():
             {{ "day": 1, "date": "YYYY-MM-DD", "activities": [{{ "name": "Activity", "duration": 2, "cost": 500 }}] }}
           ]
         }}"""
-        
-        result = _call_openrouter(prompt, "You are an expert travel planner. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
 
-        return jsonify(result)
+    @app.route('/api/ai/generate-itinerary', methods=['POST'])
+    def ai_generate_itinerary():
+        """Real AI Itinerary Generation"""
+        return _ai_feature_response('generate-itinerary', request.get_json())
 
-    @app.route('/api/ai/recommend-destinations', methods=['POST'])
-    def ai_recommend_destinations():
-        """AI Destination Recommendations"""
-        data = request.get_json()
+    def _stream_openrouter(prompt, system_prompt):
+        """Yield content deltas of a streamed completion, falling back across models"""
+        import json
+        api_key = app.config.get('OPENROUTER_API_KEY')
+        if not api_key:
+            raise RuntimeError("OpenRouter API key not configured")
+        
+        for model in model_scoreboard.order(OPENROUTER_MODELS):
+            started = time.monotonic()
+            try:
+                response = openrouter_http.post(
+                    f"{app.config['OPENROUTER_BASE_URL']}/chat/completions",
+                    headers={"Authorization": f"Bearer {api_key}"},
+                    json={
+                        "model": model,
+                        "stream": True,
+                        "messages": [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt}
+                        ]
+                    },
+                    stream=True
+                )
+                if response.status_code != 200:
+                    logger.debug("Stream model %s failed with %s", model, response.status_code)
+                    response.close()
+                    raise RuntimeError(f"HTTP {response.status_code}")
+            except Exception as e:
+                model_scoreboard.record(model, time.monotonic() - started, ok=False, error=str(e)[:200])
+                continue
+            
+            logger.debug("Streaming from model %s", model)
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    # Skip keep-alive comments (": OPENROUTER PROCESSING") and blank lines
+                    if not line or not line.startswith('data:'):
+                        continue
+                    payload = line[len('data:'):].strip()
+                    if payload == '[DONE]':
+                        break
+                    try:
+                        delta = json.loads(payload)['choices'][0].get('delta', {}).get('content')
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    if delta:
+                        yield delta
+            model_scoreboard.record(model, time.monotonic() - started, ok=True)
+            return
+        raise RuntimeError("API Error: All models failed or returned empty content")
+
+    def _stream_itinerary_events(data, include_tokens=False):
+        """Yield (event, payload) pairs as a streamed itinerary comes in"""
+        prompt = _itinerary_prompt(data)
+        parser = ItineraryStreamParser('itinerary')
+        yield 'meta', {"destination": data.get('destination', 'Unknown'), "status": "generating"}
+        try:
+            # The lane deadline bounds admission only; a stream may run longer once started
+            with ai_scheduler.slot('generate-itinerary'):
+                for delta in _stream_openrouter(prompt, ITINERARY_SYSTEM_PROMPT):
+                    if include_tokens:
+                        yield 'token', {"text": delta}
+                    for day in parser.feed(delta):
+                        yield 'day', day
+        except Exception as e:
+            yield 'error', {"error": str(e)}
+            return
+        
+        try:
+            result = _parse_ai_content(parser.buffer, 'generate-itinerary')
+        except AIParseError:
+            yield 'error', {"error": "Parsing failed", "content": parser.buffer}
+            return
+        yield 'done', result
+
+    @app.route('/api/ai/generate-itinerary/stream', methods=['GET', 'POST'])
+    def ai_generate_itinerary_stream():
+        """Stream itinerary days over Server-Sent Events as they are generated"""
+        import json
+        if request.method == 'POST':
+            data = request.get_json() or {}
+        else:
+            # EventSource can only GET: accept the same fields as query args
+            data = request.args.to_dict()
+            data['interests'] = [i for i in request.args.get('interests', '').split(',') if i]
+        include_tokens = request.args.get('tokens', 'false').lower() == 'true'
+        
+        def event_stream():
+            for event, payload in _stream_itinerary_events(data, include_tokens):
+                yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        
+        return Response(
+            stream_with_context(event_stream()),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    @socketio.on('generate_itinerary')
+    def on_generate_itinerary(data):
+        """Socket.IO variant of the itinerary stream, pushed back to the caller"""
+        data = data or {}
+        for event, payload in _stream_itinerary_events(data, bool(data.get('tokens'))):
+            emit(f"itinerary_{event}", payload)
+
+    def _recommend_destinations_local(data):
+        try:
+            limit = max(1, min(int(data.get('limit', 3)), app.config['RECOMMEND_MAX_RESULTS']))
+        except (TypeError, ValueError):
+            limit = 3
+        return destination_recommender.recommend(data, k=limit)
+
+    @ai_feature('recommend-destinations', "You are a travel recommendation expert. Return raw JSON only.",
+                local=_recommend_destinations_local)
+    def _recommend_destinations_prompt(data):
+        # Only reached for payloads the catalog scorer rejects (non-numeric budget, travelers or duration)
         interests_list = data.get('interests', [])
         interests = ", ".join(interests_list)
         budget = data.get('budget', 50000)
         
-        prompt = f"""Based on interests in {interests} and a budget of ₹{budget}, suggest 3 travel destinations in India.
+        return f"""Based on interests in {interests} and a budget of ₹{budget}, suggest 3 travel destinations in India.
         Return ONLY valid JSON.
         Format: {{ "recommendations": [ {{ "destination": "Name", "score": 90, "difficulty": "Easy", "estimated_cost": 20000, "best_season": ["Winter"] }} ] }}"""
-        
-        result = _call_openrouter(prompt, "You are a travel recommendation expert. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
 
-        return jsonify(result)
+    @ai_feature('destination-descriptions', "You are a travel writer. Return raw JSON only.")
+    def _destination_descriptions_prompt(data):
+        interests = ", ".join(data.get('interests', [])) or "general sightseeing"
+        names = ", ".join(data.get('destinations', []))
+        return f"""Write a two-sentence pitch for each of these destinations, aimed at a traveler into {interests}: {names}.
+        Mention what to do there that fits those interests, and when to go.
+        Return ONLY valid JSON, keyed by the destination names exactly as given.
+        Format: {{ "descriptions": {{ "Destination": "..." }} }}"""
 
-    @app.route('/api/ai/optimize-budget', methods=['POST'])
-    def ai_optimize_budget():
-        """AI Budget Optimization"""
-        data = request.get_json()
+    @app.route('/api/ai/recommend-destinations', methods=['POST'])
+    def ai_recommend_destinations():
+        """Destination Recommendations, scored locally from data/destination_catalog.json"""
+        data = request.get_json() or {}
+        if request.args.get('async', 'false').lower() == 'true':
+            return _submit_ai_job('recommend-destinations', data, room=request.args.get('room'))
+        payload, status = _run_ai_feature('recommend-destinations', data)
+        if status == 200 and payload.get('source') == 'local' and _wants_enrichment(data, 'AI_RECOMMEND_ENRICH'):
+            payload = _enrich_in_background(payload, 'destination-descriptions', {
+                'destinations': [r['destination'] for r in payload['recommendations']],
+                'interests': payload['basis']['interests']
+            })
+        return jsonify(payload), status
+
+    def _optimize_budget_local(data):
+        return budget_model.optimize(data)
+
+    @ai_feature('optimize-budget', "You are a travel budget consultant. Return raw JSON only.", places=('destination',),
+                local=_optimize_budget_local)
+    def _optimize_budget_prompt(data):
+        # Only reached until enough expenses have been recorded (BUDGET_MIN_SAMPLES itineraries)
         dest = data.get('destination', 'Unknown')
         budget = data.get('current_budget', 50000)
         
-        prompt = f"""Analyze and optimize a travel budget for a trip to {dest} with a total budget of ₹{budget}.
+        return f"""Analyze and optimize a travel budget for a trip to {dest} with a total budget of ₹{budget}.
         Provide a detailed cost breakdown and 3 money-saving tips.
         Return ONLY valid JSON.
         Format: {{ "current_budget": {budget}, "minimum_recommended_budget": 40000, "cost_breakdown": {{ "stay": 15000, "food": 10000, "transport": 10000, "activities": 5000 }}, "recommendations": ["Tip 1", "Tip 2", "Tip 3"] }}"""
-        
-        result = _call_openrouter(prompt, "You are a travel budget consultant. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
 
-        return jsonify(result)
+    @app.route('/api/ai/optimize-budget', methods=['POST'])
+    def ai_optimize_budget():
+        """AI Budget Optimization"""
+        return _ai_feature_response('optimize-budget', request.get_json())
+
+    @ai_feature('activity-suggestions', "You are a local travel guide. Return raw JSON only.", places=('destination',))
+    def _activity_suggestions_prompt(data):
+        dest = data.get('destination', 'Unknown')
+        interests = data.get('interests', '')
+        
+        return f"Suggest top activities for a trip to {dest} focused on {interests}. Return ONLY valid JSON format: {{ 'activities': [ {{ 'name': 'Activity Name', 'description': '...', 'cost': 500 }} ] }}"
 
     @app.route('/api/ai/activity-suggestions', methods=['GET'])
     def ai_activity_suggestions():
         """AI Activity Suggestions"""
-        dest = request.args.get('destination', 'Unknown')
-        interests = request.args.get('interests', '')
-        
-        prompt = f"Suggest top activities for a trip to {dest} focused on {interests}. Return ONLY valid JSON format: {{ 'activities': [ {{ 'name': 'Activity Name', 'description': '...', 'cost': 500 }} ] }}"
-        
-        result = _call_openrouter(prompt, "You are a local travel guide. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
-
-        return jsonify(result)
+        return _ai_feature_response('activity-suggestions', request.args.to_dict())
 
-    @app.route('/api/ai/cultural-compass', methods=['POST'])
-    def ai_cultural_compass():
-        """Feature 1: AI Cultural Etiquette Guide"""
-        data = request.get_json()
+    @ai_feature('cultural-compass', "You are a cultural sensitivity expert. Return raw JSON only.", places=('destination',))
+    def _cultural_compass_prompt(data):
         dest = data.get('destination')
         
-        prompt = f"""Provide sensitive and useful cultural advice for a tourist visiting {dest}.
+        return f"""Provide sensitive and useful cultural advice for a tourist visiting {dest}.
         Include:
         1. General Etiquette (Greetings, gestures)
         2. Dress Code (Religious sites, public spaces)
@@ -285,13 +1069,11 @@ def create_app():
         4. "Must Avoid" Taboos
         Return ONLY valid JSON with categories and bullet points.
         Format: {{ "destination": "{dest}", "etiquette": [], "dress_code": [], "tipping": [], "taboos": [] }}"""
-        
-        result = _call_openrouter(prompt, "You are a cultural sensitivity expert. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
 
-        return jsonify(result)
+    @app.route('/api/ai/cultural-compass', methods=['POST'])
+    def ai_cultural_compass():
+        """Feature 1: AI Cultural Etiquette Guide"""
+        return _ai_feature_response('cultural-compass', request.get_json())
 
     @app.route('/api/ai/receipt-ocr', methods=['POST'])
     def ai_receipt_ocr():
@@ -307,83 +1089,125 @@ def create_app():
         selected = random.choice(mock_receipts)
         return jsonify({"success": True, "data": selected})
 
-    @app.route('/api/ai/eco-score', methods=['POST'])
-    def ai_eco_score():
-        """Feature 3: Eco-Trip Sustainability Score"""
-        data = request.get_json()
+    def _eco_score_local(data):
+        return carbon_calculator.score(data)
+
+    @ai_feature('eco-score', "You are an environmental sustainability expert. Return raw JSON only.",
+                places=('destination', 'origin', 'source'), local=_eco_score_local)
+    def _eco_score_prompt(data):
+        # Only reached for places or transport types outside app/carbon.py's tables
         transport = data.get('transport_type', 'car')
         dest = data.get('destination', 'Unknown')
-        prompt = f"""Calculate the estimated carbon footprint for a trip to {dest} using {transport}.
+        return f"""Calculate the estimated carbon footprint for a trip to {dest} using {transport}.
         Provide:
         1. Estimated CO2 emission in kg.
         2. Sustainability rating (1-10, where 10 is most eco-friendly).
         3. Three "Green Alternatives" or tips for this specific trip.
         Return ONLY valid JSON.
         Format: {{ "co2_kg": 250, "rating": 7, "alternatives": ["Tip 1", "Tip 2", "Tip 3"] }}"""
-        result = _call_openrouter(prompt, "You are an environmental sustainability expert. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
 
-        return jsonify(result)
+    @ai_feature('eco-tips', "You are an environmental sustainability expert. Return raw JSON only.")
+    def _eco_tips_prompt(data):
+        legs = ', '.join(f"{leg['from']} to {leg['to']} by {leg['transport_type']}" for leg in data.get('legs', []))
+        return f"""A trip for {data.get('travelers', 1)} traveler(s): {legs}{' and back' if data.get('round_trip') else ''}.
+        It emits about {data.get('co2_kg')} kg CO2 in total.
+        Give three "Green Alternatives" or tips specific to this route and its destinations.
+        Return ONLY valid JSON.
+        Format: {{ "alternatives": ["Tip 1", "Tip 2", "Tip 3"] }}"""
 
-    @app.route('/api/ai/trip-summary-narrative', methods=['POST'])
-    def ai_trip_summary_narrative():
-        """Feature 4: Memory Mosaic (AI Trip Highlights)"""
-        data = request.get_json()
+    @app.route('/api/ai/eco-score', methods=['POST'])
+    def ai_eco_score():
+        """Feature 3: Eco-Trip Sustainability Score"""
+        data = request.get_json() or {}
+        if request.args.get('async', 'false').lower() == 'true':
+            return _submit_ai_job('eco-score', data, room=request.args.get('room'))
+        payload, status = _run_ai_feature('eco-score', data)
+        if status == 200 and payload.get('source') == 'local' and _wants_enrichment(data, 'AI_ECO_ENRICH'):
+            payload = _enrich_in_background(payload, 'eco-tips', {
+                'legs': payload['legs'],
+                'travelers': payload['travelers'],
+                'round_trip': payload['round_trip'],
+                'co2_kg': payload['co2_kg']
+            })
+        return jsonify(payload), status
+
+    def _trip_summary_result(data, result):
+        if isinstance(result, dict) and result.get('error'):
+            return {"error": result['error']}, 500
+        
+        # Ensure destination matches input (prevent AI hallucination like "everytime")
+        if isinstance(result, dict) and not result.get('error'):
+            result['destination'] = data.get('destination', 'Unknown')
+            
+        return result, 200
+
+    @ai_feature('trip-summary-narrative', "You are a professional travel writer and storyteller. Return raw JSON only.",
+                postprocess=_trip_summary_result)
+    def _trip_summary_prompt(data):
         dest = data.get('destination', 'Unknown')
         activities = ", ".join(data.get('activities', []))
         
-        prompt = f"""Write a beautiful, nostalgic, and story-driven summary of a trip to {dest}.
+        return f"""Write a beautiful, nostalgic, and story-driven summary of a trip to {dest}.
         The traveler did the following: {activities}.
         Provide:
         1. A narrative "Story of your trip" (max 200 words).
         2. Three key "Memory Highlights".
         Return ONLY valid JSON.
         Format: {{ "destination": "{dest}", "narrative": "...", "highlights": ["...", "...", "..."] }}"""
-        
-        result = _call_openrouter(prompt, "You are a professional travel writer and storyteller. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
-        
-        # Ensure destination matches input (prevent AI hallucination like "everytime")
-        if isinstance(result, dict) and not result.get('error'):
-            result['destination'] = dest
-            
-        return jsonify(result)
+
+    @app.route('/api/ai/trip-summary-narrative', methods=['POST'])
+    def ai_trip_summary_narrative():
+        """Feature 4: Memory Mosaic (AI Trip Highlights)"""
+        return _ai_feature_response('trip-summary-narrative', request.get_json())
 
     @app.route('/api/ai/buddy-match', methods=['POST'])
     def ai_buddy_match():
-        """Feature 5: Travel Buddy Match (Social)"""
-        data = request.get_json()
-        interests = ", ".join(data.get('interests', []))
-        style = data.get('travel_style', 'balanced')
-        
-        prompt = f"""Suggest three mock "Travel Buddies" for someone who loves {interests} and has a {style} travel style.
-        For each buddy, provide:
-        1. A name.
-        2. A match percentage (80-99%).
-        3. A "Why we matched" reason.
-        4. Their top 2 travel interests.
-        Return ONLY valid JSON.
-        Format: {{ "matches": [ {{ "name": "...", "match_score": 92, "reason": "...", "interests": ["...", "..."] }} ] }}"""
-        
-        result = _call_openrouter(prompt, "You are a social travel coordinator. Return raw JSON only.")
+        """Feature 5: Travel Buddy Match (Social), over registered users only"""
+        data = request.get_json() or {}
+        try:
+            limit = max(1, min(int(data.get('limit', 3)), app.config['BUDDY_MAX_MATCHES']))
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit must be an integer"}), 400
+        return jsonify(buddy_index.match(data, k=limit)), 200
+
+    def _translate_from_memory(data):
+        if not app.config['AI_TM_ENABLED']:
+            return None
+        match = translation_memory.lookup(data.get('text', ''), data.get('target_lang', 'English'))
+        if match is None:
+            return None
+        return {
+            "translated_text": match['translated_text'],
+            "tm": {"match": match['match'], "score": match['score'], "hit_rate": translation_memory.hit_rate()}
+        }
+
+    def _translate_result(data, result):
+        # Smart extraction for translation
+        tm = {"match": None, "hit_rate": translation_memory.hit_rate()} if app.config['AI_TM_ENABLED'] else None
+        if isinstance(result, dict):
+            if 'translated_text' in result:
+                if tm is not None:
+                    translation_memory.store(data.get('text', ''), data.get('target_lang', 'English'), result['translated_text'])
+                    result['tm'] = tm
+                return result, 200
+            if 'content' in result and result.get('error') == "Parsing failed":
+                # If JSON parsing failed but we have content, the content is likely the raw translation
+                return {"translated_text": result['content'].strip(), "tm": tm}, 200
         
         if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
-
-        return jsonify(result)
+            return {"error": result['error']}, 500
+            
+        # Fallback as last resort
+        fallback = { "translated_text": f"[Translation of '{data.get('text', '')}' to {data.get('target_lang', 'English')}]" }
+        return fallback, 200
 
-    @app.route('/api/ai/translate', methods=['POST'])
-    def ai_translate():
-        """Feature 6: Live Translation Whisper"""
-        data = request.get_json()
+    @ai_feature('translate', "You are a professional translator. Return raw JSON only.", postprocess=_translate_result,
+                local=_translate_from_memory)
+    def _translate_prompt(data):
         text = data.get('text', '')
         target_lang = data.get('target_lang', 'English')
         
-        prompt = f"""Translate the following text to {target_lang}: "{text}".
+        return f"""Translate the following text to {target_lang}: "{text}".
         
         Strictly return ONLY a JSON object in this format:
         {{
@@ -391,67 +1215,162 @@ def create_app():
         }}
         
         Do not include any other text, warnings, or explanations."""
-        
-        result = _call_openrouter(prompt, "You are a professional translator. Return raw JSON only.")
-        
-        # Smart extraction for translation
-        if isinstance(result, dict):
-            if 'translated_text' in result:
-                return jsonify(result)
-            if 'content' in result and result.get('error') == "Parsing failed":
-                # If JSON parsing failed but we have content, the content is likely the raw translation
-                return jsonify({"translated_text": result['content'].strip()})
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
-            
-        # Fallback as last resort
-        fallback = { "translated_text": f"[Translation of '{text}' to {target_lang}]" }
-        return jsonify(fallback)
 
-    @app.route('/api/ai/emergency-help', methods=['POST'])
-    def ai_emergency_help():
-        """Feature 7: AI Emergency Rescue Beacon"""
-        data = request.get_json()
+    @app.route('/api/ai/translate', methods=['POST'])
+    def ai_translate():
+        """Feature 6: Live Translation Whisper"""
+        return _ai_feature_response('translate', request.get_json())
+
+    def _translate_batch_result(data, result):
+        if isinstance(result, dict) and result.get('error') and 'translations' not in result:
+            return {"error": result['error']}, 502
+        translations = split_batch_result(result, len(data.get('texts', [])))
+        if app.config['AI_TM_ENABLED']:
+            for text, translated in zip(data.get('texts', []), translations):
+                if translated:
+                    translation_memory.store(text, data.get('target_lang', 'English'), translated)
+        return {"translations": translations}, 200
+
+    @ai_feature('translate-batch', "You are a professional translator. Return raw JSON only.",
+                postprocess=_translate_batch_result)
+    def _translate_batch_prompt(data):
+        return build_batch_prompt(data.get('texts', []), data.get('target_lang', 'English'))
+
+    @app.route('/api/ai/translate/batch', methods=['POST', 'OPTIONS'])
+    def ai_translate_batch():
+        """Translate many strings: memory hits first, the rest in as few model calls as possible"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        data = request.get_json() or {}
+        texts = data.get('texts')
+        target_lang = data.get('target_lang', 'English')
+        if not isinstance(texts, list) or not texts or not all(isinstance(t, str) for t in texts):
+            return jsonify({"error": "texts must be a non-empty list of strings"}), 400
+        if len(texts) > app.config['AI_TRANSLATE_BATCH_MAX']:
+            return jsonify({"error": f"A batch can hold at most {app.config['AI_TRANSLATE_BATCH_MAX']} texts"}), 400
+
+        started = time.monotonic()
+        results = [None] * len(texts)
+        pending = {}  # normalized text -> positions, so repeats cost one slot in the prompt
+        for index, text in enumerate(texts):
+            match = translation_memory.lookup(text, target_lang) if app.config['AI_TM_ENABLED'] else None
+            if match is not None:
+                results[index] = {"text": text, "translated_text": match['translated_text'], "tm": match['match']}
+            elif not text.strip():
+                results[index] = {"text": text, "translated_text": text, "tm": None}
+            else:
+                pending.setdefault(normalize_text(text), []).append(index)
+
+        groups = list(pending.values())
+        chunk = max(1, app.config['AI_TRANSLATE_BATCH_CHUNK'])
+        work = [
+            (str(n), 'translate-batch', {"texts": [texts[g[0]] for g in groups[i:i + chunk]], "target_lang": target_lang})
+            for n, i in enumerate(range(0, len(groups), chunk))
+        ]
+        outcomes = ai_batches.run(work) if work else {}
+        for n, i in enumerate(range(0, len(groups), chunk)):
+            outcome = outcomes[str(n)]
+            translated = outcome['data']['translations'] if outcome['status'] < 400 else [None] * len(groups[i:i + chunk])
+            for positions, translation in zip(groups[i:i + chunk], translated):
+                for index in positions:
+                    results[index] = {"text": texts[index], "translated_text": translation, "tm": None}
+                    if translation is None:
+                        results[index]['error'] = outcome.get('error') or "No translation returned"
+
+        hits = sum(1 for r in results if r['tm'])
+        failed = sum(1 for r in results if r['translated_text'] is None)
+        return jsonify({
+            "success": failed == 0,
+            "target_lang": target_lang,
+            "translations": results,
+            "tm": {
+                "exact": sum(1 for r in results if r['tm'] == 'exact'),
+                "near": sum(1 for r in results if r['tm'] == 'near'),
+                "misses": len(texts) - hits,
+                "hit_rate": round(hits / len(texts), 4),
+                "overall_hit_rate": translation_memory.hit_rate()
+            },
+            "upstream_calls": len(work),
+            "failed": failed,
+            "elapsed": round(time.monotonic() - started, 3)
+        }), 200
+
+    @app.route('/api/admin/ai/translation-memory', methods=['GET', 'DELETE', 'OPTIONS'])
+    def ai_translation_memory_admin():
+        """Inspect or clear the translation memory"""
+        if request.method == 'OPTIONS':
+            return '', 204
+        if request.method == 'DELETE':
+            translation_memory.clear()
+            return jsonify({"success": True, "message": "Translation memory cleared"}), 200
+        return jsonify({"success": True, "data": translation_memory.stats()}), 200
+
+    def _emergency_help_local(data):
+        return emergency_directory.lookup(data.get('location', ''), data.get('situation', ''))
+
+    @ai_feature('emergency-help', "You are an emergency response coordinator. Return raw JSON only.", error_status=None,
+                places=('location',), local=_emergency_help_local)
+    def _emergency_help_prompt(data):
+        # Only reached for locations outside data/emergency_info.json
         location = data.get('location', 'Unknown')
         situation = data.get('situation', 'general emergency')
         
-        prompt = f"""Provide emergency assistance info for a tourist in {location} facing this situation: {situation}.
+        return f"""Provide emergency assistance info for a tourist in {location} facing this situation: {situation}.
         Provide:
         1. Local emergency numbers (Police, Ambulance).
         2. A short "Distress Message" in the LOCAL language of {location} with English translation.
         3. Three immediate "Next Steps" for safety.
         Return ONLY valid JSON.
         Format: {{ "numbers": {{ "police": "...", "ambulance": "..." }}, "distress_message": "...", "next_steps": ["...", "...", "..."] }}"""
-        
-        result = _call_openrouter(prompt, "You are an emergency response coordinator. Return raw JSON only.")
-        return jsonify(result)
 
-    @app.route('/api/ai/collect-stamp', methods=['POST'])
-    def ai_collect_stamp():
-        """Feature 8: Gamified Landmarks (Digital Stamps)"""
-        data = request.get_json()
+    @ai_feature('emergency-next-steps', "You are an emergency response coordinator. Return raw JSON only.")
+    def _emergency_next_steps_prompt(data):
+        numbers = data.get('numbers') or {}
+        return f"""A tourist in {data.get('location', 'Unknown')} is facing this situation: {data.get('situation', 'general emergency')}.
+        Local emergency numbers: police {numbers.get('police', '112')}, ambulance {numbers.get('ambulance', '112')}.
+        Give three short, specific immediate "Next Steps" for their safety at this location.
+        Return ONLY valid JSON.
+        Format: {{ "next_steps": ["...", "...", "..."] }}"""
+
+    @app.route('/api/ai/emergency-help', methods=['POST'])
+    def ai_emergency_help():
+        """Feature 7: AI Emergency Rescue Beacon"""
+        data = request.get_json() or {}
+        if request.args.get('async', 'false').lower() == 'true':
+            return _submit_ai_job('emergency-help', data, room=request.args.get('room'))
+        payload, status = _run_ai_feature('emergency-help', data)
+        if status == 200 and payload.get('source') == 'local' and _wants_enrichment(data, 'AI_EMERGENCY_ENRICH'):
+            payload = _enrich_in_background(payload, 'emergency-next-steps', {
+                'location': payload['location'],
+                'situation': data.get('situation', 'general emergency'),
+                'numbers': payload['numbers']
+            })
+        return jsonify(payload), status
+
+    @ai_feature('collect-stamp', "You are a travel historian and gamification expert. Return raw JSON only.", error_status=None,
+                places=('landmark',))
+    def _collect_stamp_prompt(data):
         landmark = data.get('landmark', 'Unknown Landmark')
         
-        prompt = f"""Generate a "Digital Passport Stamp" for visiting {landmark}.
+        return f"""Generate a "Digital Passport Stamp" for visiting {landmark}.
         Provide:
         1. An evocative Stamp Name.
         2. A "Hidden Story" or fun fact about this landmark (max 50 words).
         3. A "Badge Theme" color (e.g., #FFD700).
         Return ONLY valid JSON.
         Format: {{ "landmark": "{landmark}", "stamp_name": "...", "story": "...", "color": "..." }}"""
-        
-        result = _call_openrouter(prompt, "You are a travel historian and gamification expert. Return raw JSON only.")
-        return jsonify(result)
 
-    @app.route('/api/ai/foodie-finder', methods=['POST'])
-    def ai_foodie_finder():
-        """Feature 9: AI Foodie Finder (Allergy Safe)"""
-        data = request.get_json()
+    @app.route('/api/ai/collect-stamp', methods=['POST'])
+    def ai_collect_stamp():
+        """Feature 8: Gamified Landmarks (Digital Stamps)"""
+        return _ai_feature_response('collect-stamp', request.get_json())
+
+    @ai_feature('foodie-finder', "You are a culinary travel expert. Return raw JSON only.", places=('location',))
+    def _foodie_finder_prompt(data):
         location = data.get('location', 'Unknown')
         restrictions = ", ".join(data.get('restrictions', []))
         
-        prompt = f"""Suggest three local dishes in {location} for someone with these dietary restrictions: {restrictions}.
+        return f"""Suggest three local dishes in {location} for someone with these dietary restrictions: {restrictions}.
         For each dish, provide:
         1. Dish Name.
         2. Brief Description.
@@ -459,22 +1378,18 @@ def create_app():
         4. Top 3 Ingredients.
         Return ONLY valid JSON.
         Format: {{ "recommendations": [ {{ "name": "...", "description": "...", "safety": "...", "ingredients": ["...", "...", "..."] }} ] }}"""
-        
-        result = _call_openrouter(prompt, "You are a culinary travel expert. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
 
-        return jsonify(result)
+    @app.route('/api/ai/foodie-finder', methods=['POST'])
+    def ai_foodie_finder():
+        """Feature 9: AI Foodie Finder (Allergy Safe)"""
+        return _ai_feature_response('foodie-finder', request.get_json())
 
-    @app.route('/api/ai/vr-preview', methods=['POST'])
-    def ai_vr_preview():
-        """Feature 10: Virtual Reality Pre-Trip Preview"""
-        data = request.get_json()
+    @ai_feature('vr-preview', "You are a VR experience designer and travel writer. Return raw JSON only.", places=('destination',))
+    def _vr_preview_prompt(data):
         destination = data.get('destination', 'Unknown')
         experience = data.get('experience', 'Exploring')
         
-        prompt = f"""Generate a "Virtual Reality Descriptive Simulation" for {experience} in {destination}.
+        return f"""Generate a "Virtual Reality Descriptive Simulation" for {experience} in {destination}.
         Provide:
         1. Visuals: Describe the 360-degree view in vivid detail (max 60 words).
         2. Sounds: Describe the ambient audio landscape.
@@ -482,15 +1397,27 @@ def create_app():
         4. Immersive Tip: One thing to specifically "look at" or "interaction" to imagine.
         Return ONLY valid JSON.
         Format: {{ "destination": "{destination}", "experience": "{experience}", "visuals": "...", "sounds": "...", "atmosphere": "...", "tip": "..." }}"""
-        
-        result = _call_openrouter(prompt, "You are a VR experience designer and travel writer. Return raw JSON only.")
-        
-        if isinstance(result, dict) and result.get('error'):
-            return jsonify({"error": result['error']}), 500
 
-        return jsonify(result)
+    @app.route('/api/ai/vr-preview', methods=['POST'])
+    def ai_vr_preview():
+        """Feature 10: Virtual Reality Pre-Trip Preview"""
+        return _ai_feature_response('vr-preview', request.get_json())
     
     # Mock Itinerary Endpoints
+    def _list_response(collection):
+        """List body for a collection: one keyset page with ?limit=&after=, projected by ?fields="""
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or None
+        limit = request.args.get('limit', type=int) or app.config['LIST_DEFAULT_LIMIT']
+        after = request.args.get('after') or None
+        try:
+            if not limit and after is None:
+                return jsonify({"success": True, "data": collection.query(fields=fields)}), 200
+            limit = min(limit or app.config['LIST_MAX_LIMIT'], app.config['LIST_MAX_LIMIT'])
+            data, next_cursor = collection.page(fields=fields, limit=limit, after=after)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"success": True, "data": data, "next_cursor": next_cursor}), 200
+
     @app.route('/api/itinerary/create', methods=['POST', 'OPTIONS'])
     def create_itinerary():
         """Create and store itinerary"""
@@ -516,20 +1443,14 @@ def create_app():
                 "createdAt": datetime.now().isoformat()
             }
             
-            # Store in MongoDB if connected, fallback to in-memory
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.itineraries.insert_one(itinerary)
-                    itinerary.pop('_id', None)  # Remove MongoDB's _id field for JSON serialization
-                    print(f"[SUCCESS] Itinerary saved to MongoDB: {itinerary_id}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB save failed: {e}, using in-memory storage")
-                    in_memory_db['itineraries'][itinerary_id] = itinerary
-            else:
-                in_memory_db['itineraries'][itinerary_id] = itinerary
-                print(f"[SUCCESS] Itinerary saved to in-memory storage: {itinerary_id}")
+            storage.itineraries.put(itinerary)
+            logger.info("Itinerary saved to %s: %s", storage.backend, itinerary_id)
+            budget_model.upsert_itinerary(itinerary_id, itinerary)
+            buddy_index.upsert_itinerary(itinerary_id, itinerary)
             
             return jsonify({"success": True, "data": itinerary}), 201
+        except StorageError:
+            raise  # answered 503 by the StorageError handler
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
@@ -539,18 +1460,7 @@ def create_app():
         if request.method == 'OPTIONS':
             return '', 204
         
-        # Try MongoDB first, fallback to in-memory
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                itinerary = db.itineraries.find_one({"id": itinerary_id})
-                if itinerary:
-                    itinerary.pop('_id', None)  # Remove MongoDB's _id field
-                    return jsonify({"success": True, "data": itinerary}), 200
-            except Exception as e:
-                print(f"[WARN] MongoDB query failed: {e}")
-        
-        # Fallback to in-memory
-        itinerary = in_memory_db['itineraries'].get(itinerary_id)
+        itinerary = storage.itineraries.get(itinerary_id)
         if itinerary:
             return jsonify({"success": True, "data": itinerary}), 200
         
@@ -558,31 +1468,11 @@ def create_app():
     
     @app.route('/api/itinerary/', methods=['GET', 'OPTIONS'])
     def get_all_itineraries():
-        """Get all itineraries"""
+        """Get all itineraries, or a page of them"""
         if request.method == 'OPTIONS':
             return '', 204
         
-        data = []
-        
-        # Try MongoDB first
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                itineraries = db.itineraries.find({})
-                for itinerary in itineraries:
-                    itinerary.pop('_id', None)  # Remove MongoDB's _id field
-                    data.append(itinerary)
-                print(f"[SUCCESS] Retrieved {len(data)} itineraries from MongoDB")
-            except Exception as e:
-                print(f"[WARN] MongoDB query failed: {e}, using in-memory storage")
-                data = list(in_memory_db['itineraries'].values())
-        else:
-            data = list(in_memory_db['itineraries'].values())
-        
-        
-        return jsonify({
-            "success": True,
-            "data": data
-        }), 200
+        return _list_response(storage.itineraries)
     
     # --- AI GENERATION & PACKING LIST (Ported from ItineraryService) ---
     
@@ -600,7 +1490,7 @@ def create_app():
             ]
         }
         
-        dest_key = destination.lower().strip()
+        dest_key = destinations.resolve(destination).id or destination.lower().strip()
         places = mock_places.get(dest_key, [])
         
         # Generic fallback
@@ -620,13 +1510,7 @@ def create_app():
             
         try:
             # 1. Fetch Itinerary
-            itinerary = None
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                itinerary = db.itineraries.find_one({"id": itinerary_id})
-                if itinerary: itinerary.pop('_id', None)
-            else:
-                itinerary = in_memory_db['itineraries'].get(itinerary_id)
-                
+            itinerary = storage.itineraries.get(itinerary_id)
             if not itinerary:
                 return jsonify({"error": "Itinerary not found"}), 404
                 
@@ -678,18 +1562,10 @@ def create_app():
                 'updated_at': datetime.now().isoformat()
             }
             
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                db.itineraries.update_one({"id": itinerary_id}, {"$set": updates})
-                # Re-fetch
-                itinerary = db.itineraries.find_one({"id": itinerary_id})
-                itinerary.pop('_id', None)
-                
-                # Convert dates for JSON
-                if isinstance(itinerary.get('created_at'), datetime):
-                    itinerary['created_at'] = itinerary['created_at'].isoformat()
-            else:
-                in_memory_db['itineraries'][itinerary_id].update(updates)
-                itinerary = in_memory_db['itineraries'][itinerary_id]
+            itinerary = storage.itineraries.update(itinerary_id, updates)
+            # Convert dates for JSON
+            if isinstance(itinerary.get('created_at'), datetime):
+                itinerary = {**itinerary, 'created_at': itinerary['created_at'].isoformat()}
 
             return jsonify({"success": True, "data": itinerary, "message": "Itinerary generated"}), 200
 
@@ -750,13 +1626,7 @@ def create_app():
             
         try:
             # 1. Fetch Itinerary
-            itinerary = None
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                itinerary = db.itineraries.find_one({"id": itinerary_id})
-                if itinerary: itinerary.pop('_id', None)
-            else:
-                itinerary = in_memory_db['itineraries'].get(itinerary_id)
-                
+            itinerary = storage.itineraries.get(itinerary_id)
             if not itinerary:
                 return jsonify({"error": "Itinerary not found"}), 404
             
@@ -800,16 +1670,7 @@ def create_app():
                 'updated_at': datetime.now().isoformat()
             }
             
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                db.itineraries.update_one({"id": itinerary_id}, {"$set": updates})
-                # Re-fetch for response
-                itinerary = db.itineraries.find_one({"id": itinerary_id})
-                itinerary.pop('_id', None)
-                if isinstance(itinerary.get('created_at'), datetime):
-                   itinerary['created_at'] = itinerary['created_at'].isoformat()
-            else:
-                in_memory_db['itineraries'][itinerary_id].update(updates)
-                itinerary = in_memory_db['itineraries'][itinerary_id]
+            storage.itineraries.update(itinerary_id, updates)
 
             return jsonify({"success": True, "data": packing_list, "message": "Packing list generated"}), 200
 
@@ -823,65 +1684,11 @@ def create_app():
             return '', 204
             
         try:
-            # 1. Fetch Itinerary
-            itinerary = None
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                itinerary = db.itineraries.find_one({"id": itinerary_id})
-                if itinerary: itinerary.pop('_id', None)
-            else:
-                itinerary = in_memory_db['itineraries'].get(itinerary_id)
-                
-            if not itinerary:
+            # Itinerary, expense and booking totals in one aggregation (bookings store 'cost' or 'price')
+            stats = expense_aggregator.itinerary_stats(itinerary_id)
+            if stats is None:
                 return jsonify({"error": "Itinerary not found"}), 404
             
-            # 2. Calculate Expenses
-            total_expenses = 0
-            expense_count = 0
-            
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                expenses = db.expenses.find({"itineraryId": itinerary_id})
-                for exp in expenses:
-                    total_expenses += float(exp.get('amount', 0))
-                    expense_count += 1
-            else:
-                for exp in in_memory_db['expenses'].values():
-                    if str(exp.get('itineraryId')) == str(itinerary_id):
-                        total_expenses += float(exp.get('amount', 0))
-                        expense_count += 1
-            
-            # 3. Calculate Bookings
-            total_transport = 0
-            booking_count = 0
-            
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                bookings = db.bookings.find({"itineraryId": itinerary_id})
-                for b in bookings:
-                    # bookings store 'cost' or 'price'
-                    cost = float(b.get('cost', 0)) or float(b.get('price', 0))
-                    total_transport += cost
-                    booking_count += 1
-            else:
-                for b in in_memory_db['bookings'].values():
-                    if str(b.get('itineraryId')) == str(itinerary_id):
-                        cost = float(b.get('cost', 0)) or float(b.get('price', 0))
-                        total_transport += cost
-                        booking_count += 1
-
-            stats = {
-                'itinerary_id': itinerary_id,
-                'destination': itinerary.get('destination'),
-                'budget': itinerary.get('budget', 0),
-                'expenses': {
-                    'total': total_expenses,
-                    'count': expense_count
-                },
-                'transport': {
-                    'total': total_transport,
-                    'count': booking_count
-                },
-                'total_cost': total_expenses + total_transport
-            }
-            
             return jsonify({"success": True, "data": stats}), 200
 
         except Exception as e:
@@ -895,23 +1702,13 @@ def create_app():
         
         try:
             data = request.get_json()
-            
-            # Update in MongoDB if connected
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.itineraries.update_one(
-                        {"id": itinerary_id},
-                        {"$set": data}
-                    )
-                    print(f"[SUCCESS] Itinerary updated in MongoDB: {itinerary_id}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB update failed: {e}")
-            
-            # Update in-memory
-            if itinerary_id in in_memory_db['itineraries']:
-                in_memory_db['itineraries'][itinerary_id].update(data)
+            itinerary = storage.itineraries.update(itinerary_id, data)
+            budget_model.upsert_itinerary(itinerary_id, data)
+            buddy_index.upsert_itinerary(itinerary_id, data)
                 
-            return jsonify({"success": True, "data": data, "message": "Itinerary updated"}), 200
+            return jsonify({"success": True, "data": itinerary or data, "message": "Itinerary updated"}), 200
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 400
 
@@ -922,18 +1719,13 @@ def create_app():
             return '', 204
         
         try:
-            # Delete from MongoDB if connected
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.itineraries.delete_one({"id": itinerary_id})
-                    print(f"[SUCCESS] Itinerary deleted from MongoDB: {itinerary_id}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB delete failed: {e}")
-            
-            # Delete from in-memory
-            in_memory_db['itineraries'].pop(itinerary_id, None)
+            storage.itineraries.delete(itinerary_id)
+            budget_model.delete_itinerary(itinerary_id)
+            buddy_index.delete_itinerary(itinerary_id)
             
             return jsonify({"success": True, "message": "Itinerary deleted"}), 200
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
@@ -949,52 +1741,32 @@ def create_app():
             expense_id = "expense-" + str(hash(str(data)) % 1000000)
             expense = {
                 "id": expense_id,
-                "itineraryId": data.get('itineraryId', ''),
+                "itineraryId": data.get('itineraryId', data.get('itinerary_id', '')),
                 "category": data.get('category', 'other'),
                 "amount": data.get('amount', 0),
                 "description": data.get('description', ''),
                 "paidBy": data.get('paidBy', ''),
                 "splitAmong": data.get('splitAmong', []),
-                "currency": data.get('currency', 'USD'),
+                "currency": str(data.get('currency') or app.config['DEFAULT_CURRENCY']).upper(),
                 "createdAt": datetime.now().isoformat()
             }
             
-            # Store in MongoDB if connected
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.expenses.insert_one(expense)
-                    expense.pop('_id', None)
-                    print(f"[SUCCESS] Expense saved to MongoDB: {expense_id}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB save failed: {e}")
-                    in_memory_db['expenses'][expense_id] = expense
-            else:
-                in_memory_db['expenses'][expense_id] = expense
+            storage.expenses.put(expense)
+            budget_model.upsert_expense(expense_id, expense)
             
             return jsonify({"success": True, "data": expense}), 201
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
     @app.route('/api/expenses', methods=['GET', 'OPTIONS'])
     def get_expenses():
-        """Get all expenses"""
+        """Get all expenses, or a page of them"""
         if request.method == 'OPTIONS':
             return '', 204
         
-        data = []
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                expenses = db.expenses.find({})
-                for expense in expenses:
-                    expense.pop('_id', None)
-                    data.append(expense)
-            except Exception as e:
-                print(f"[WARN] MongoDB query failed: {e}")
-                data = list(in_memory_db['expenses'].values())
-        else:
-            data = list(in_memory_db['expenses'].values())
-        
-        return jsonify({"success": True, "data": data}), 200
+        return _list_response(storage.expenses)
     
     @app.route('/api/expenses/<expense_id>', methods=['GET', 'OPTIONS'])
     def get_expense(expense_id):
@@ -1002,16 +1774,7 @@ def create_app():
         if request.method == 'OPTIONS':
             return '', 204
         
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                expense = db.expenses.find_one({"id": expense_id})
-                if expense:
-                    expense.pop('_id', None)
-                    return jsonify({"success": True, "data": expense}), 200
-            except Exception as e:
-                print(f"[WARN] MongoDB query failed: {e}")
-        
-        expense = in_memory_db['expenses'].get(expense_id)
+        expense = storage.expenses.get(expense_id)
         if expense:
             return jsonify({"success": True, "data": expense}), 200
         
@@ -1025,23 +1788,12 @@ def create_app():
         
         try:
             data = request.get_json()
-            
-            # Update in MongoDB if connected
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.expenses.update_one(
-                        {"id": expense_id},
-                        {"$set": data}
-                    )
-                    print(f"[SUCCESS] Expense updated in MongoDB: {expense_id}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB update failed: {e}")
-            
-            # Update in-memory
-            if expense_id in in_memory_db['expenses']:
-                in_memory_db['expenses'][expense_id].update(data)
+            expense = storage.expenses.update(expense_id, data)
+            budget_model.upsert_expense(expense_id, data)
                 
-            return jsonify({"success": True, "data": data, "message": "Expense updated"}), 200
+            return jsonify({"success": True, "data": expense or data, "message": "Expense updated"}), 200
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 400
 
@@ -1054,55 +1806,9 @@ def create_app():
         try:
             travelers_count = int(request.args.get('travelers_count', 2))
             
-            expenses = []
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                cursor = db.expenses.find({"itineraryId": itinerary_id})
-                for doc in cursor:
-                    doc.pop('_id', None)
-                    expenses.append(doc)
-            else:
-                for exp in in_memory_db['expenses'].values():
-                    if str(exp.get('itineraryId')) == str(itinerary_id):
-                        expenses.append(exp)
-                        
-            total_amount = sum(float(exp.get('amount', 0)) for exp in expenses)
-            per_person = total_amount / travelers_count if travelers_count > 0 else 0
-            
-            splits = {}
-            for exp in expenses:
-                paid_by = exp.get('paid_by', 'Unknown')
-                if paid_by not in splits:
-                    splits[paid_by] = {'paid': 0, 'owes': 0}
-                
-                splits[paid_by]['paid'] += float(exp.get('amount', 0))
-                
-                split_among = exp.get('split_among', [])
-                if split_among:
-                    amount_per_person = float(exp.get('amount', 0)) / len(split_among)
-                    for person in split_among:
-                        if person not in splits:
-                            splits[person] = {'paid': 0, 'owes': 0}
-                        splits[person]['owes'] += amount_per_person
-
-            settlements = []
-            for person, totals in splits.items():
-                balance = totals['paid'] - totals['owes']
-                if balance > 0.01:
-                    settlements.append({'person': person, 'amount': round(balance, 2), 'type': 'receives'})
-                elif balance < -0.01:
-                    settlements.append({'person': person, 'amount': round(abs(balance), 2), 'type': 'pays'})
+            splits = expense_aggregator.splits(itinerary_id, travelers_count)
             
-            return jsonify({
-                "success": True,
-                "data": {
-                    'total_amount': round(total_amount, 2),
-                    'per_person': round(per_person, 2),
-                    'travelers_count': travelers_count,
-                    'splits': splits,
-                    'settlements': settlements,
-                    'expense_count': len(expenses)
-                }
-            }), 200
+            return jsonify({"success": True, "data": splits}), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -1113,31 +1819,7 @@ def create_app():
             return '', 204
             
         try:
-            expenses = []
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                cursor = db.expenses.find({"itineraryId": itinerary_id})
-                for doc in cursor:
-                    doc.pop('_id', None)
-                    expenses.append(doc)
-            else:
-                for exp in in_memory_db['expenses'].values():
-                    if str(exp.get('itineraryId')) == str(itinerary_id):
-                        expenses.append(exp)
-            
-            category_summary = {}
-            for exp in expenses:
-                category = exp.get('category', 'misc')
-                if category not in category_summary:
-                    category_summary[category] = {'total': 0, 'count': 0, 'items': []}
-                
-                category_summary[category]['total'] += float(exp.get('amount', 0))
-                category_summary[category]['count'] += 1
-                category_summary[category]['items'].append({
-                    'id': exp.get('id'),
-                    'description': exp.get('description'),
-                    'amount': exp.get('amount'),
-                    'paid_by': exp.get('paid_by')
-                })
+            category_summary = expense_aggregator.category_summary(itinerary_id)
                 
             return jsonify({"success": True, "data": category_summary}), 200
         except Exception as e:
@@ -1149,14 +1831,8 @@ def create_app():
         if request.method == 'OPTIONS':
             return '', 204
         
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                db.expenses.delete_one({"id": expense_id})
-                print(f"[SUCCESS] Expense deleted from MongoDB: {expense_id}")
-            except Exception as e:
-                print(f"[WARN] MongoDB delete failed: {e}")
-        
-        in_memory_db['expenses'].pop(expense_id, None)
+        storage.expenses.delete(expense_id)
+        budget_model.delete_expense(expense_id)
         return jsonify({"success": True, "message": f"Expense {expense_id} deleted"}), 200
     
     # Transport/Booking Endpoints
@@ -1250,42 +1926,21 @@ def create_app():
                 "createdAt": datetime.now().isoformat()
             }
             
-            # Store in MongoDB if connected
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.bookings.insert_one(booking)
-                    booking.pop('_id', None)
-                    print(f"[SUCCESS] Booking saved to MongoDB: {booking_id}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB save failed: {e}")
-                    in_memory_db['bookings'][booking_id] = booking
-            else:
-                in_memory_db['bookings'][booking_id] = booking
+            storage.bookings.put(booking)
             
             return jsonify({"success": True, "data": booking}), 201
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
     @app.route('/api/transport/bookings', methods=['GET', 'OPTIONS'])
     def get_bookings():
-        """Get all bookings"""
+        """Get all bookings, or a page of them"""
         if request.method == 'OPTIONS':
             return '', 204
         
-        data = []
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                bookings = db.bookings.find({})
-                for booking in bookings:
-                    booking.pop('_id', None)
-                    data.append(booking)
-            except Exception as e:
-                print(f"[WARN] MongoDB query failed: {e}")
-                data = list(in_memory_db['bookings'].values())
-        else:
-            data = list(in_memory_db['bookings'].values())
-        
-        return jsonify({"success": True, "data": data}), 200
+        return _list_response(storage.bookings)
     
     @app.route('/api/transport/bookings/<booking_id>', methods=['GET', 'OPTIONS'])
     def get_booking(booking_id):
@@ -1293,16 +1948,7 @@ def create_app():
         if request.method == 'OPTIONS':
             return '', 204
         
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                booking = db.bookings.find_one({"id": booking_id})
-                if booking:
-                    booking.pop('_id', None)
-                    return jsonify({"success": True, "data": booking}), 200
-            except Exception as e:
-                print(f"[WARN] MongoDB query failed: {e}")
-        
-        booking = in_memory_db['bookings'].get(booking_id)
+        booking = storage.bookings.get(booking_id)
         if booking:
             return jsonify({"success": True, "data": booking}), 200
         
@@ -1316,30 +1962,14 @@ def create_app():
         
         try:
             data = request.get_json()
-            
-            # Update in MongoDB if connected
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.bookings.update_one(
-                        {"id": booking_id},
-                        {"$set": data}
-                    )
-                    print(f"[SUCCESS] Booking updated in MongoDB: {booking_id}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB update failed: {e}")
-            
-            # Update in-memory
-            if booking_id in in_memory_db['bookings']:
-                in_memory_db['bookings'][booking_id].update(data)
+            booking = storage.bookings.update(booking_id, data)
                 
-            return jsonify({"success": True, "data": data, "message": "Booking updated"}), 200
+            return jsonify({"success": True, "data": booking or data, "message": "Booking updated"}), 200
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 400
 
-    # Initialize chat storage
-    if 'chat_messages' not in in_memory_db:
-        in_memory_db['chat_messages'] = []
-
     class NotificationService:
         @staticmethod
         def send_email(to_email, subject, body):
@@ -1362,21 +1992,18 @@ def create_app():
                     server.login(smtp_user, smtp_password)
                     server.send_message(msg)
                     server.quit()
-                    print(f"[EMAIL SENT] To: {to_email}")
+                    logger.info("Email sent to %s", to_email, extra={'subject': subject})
                     return True
                 except Exception as e:
-                    print(f"[EMAIL ERROR] Failed to send: {e}")
+                    logger.warning("Email to %s failed: %s", to_email, e)
                     return False
             else:
-                print(f"[EMAIL SIMULATION] To: {to_email}")
-                print(f"   Subject: {subject}")
-                print(f"   Body: {body}")
+                logger.info("Email simulated to %s", to_email, extra={'subject': subject, 'body': body})
                 return True
 
         @staticmethod
         def send_sms(to_phone, body):
-            print(f"[SMS SIMULATION] To: {to_phone}")
-            print(f"   Message: {body}")
+            logger.info("SMS simulated to %s", to_phone, extra={'body': body})
             # Placeholder for Twilio implementation
             return True
 
@@ -1386,36 +2013,20 @@ def create_app():
         if request.method == 'OPTIONS':
             return '', 204
         
-        messages = []
-        
-        # Fetch from MongoDB if connected
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                cursor = db.chat_messages.find({"itinerary_id": itinerary_id}).sort("timestamp", 1)
-                for msg in cursor:
-                    msg.pop('_id', None)
-                    messages.append(msg)
-            except Exception as e:
-                print(f"[WARN] MongoDB chat fetch failed: {e}")
-                # Fallback to in-memory
-                messages = [m for m in in_memory_db.get('chat_messages', []) if str(m.get('itinerary_id')) == str(itinerary_id)]
-        else:
-            # In-memory storage
-            messages = [m for m in in_memory_db.get('chat_messages', []) if str(m.get('itinerary_id')) == str(itinerary_id)]
-            
+        messages = storage.chat_messages.query({"itinerary_id": itinerary_id}, sort=("timestamp", 1))
         return jsonify({"success": True, "data": messages}), 200
 
     @socketio.on('join')
     def on_join(data):
         room = data['room']
         join_room(room)
-        print(f"[SOCKET] User joined room: {room}")
+        logger.info("Socket joined room %s", room)
 
     @socketio.on('leave')
     def on_leave(data):
         room = data['room']
         leave_room(room)
-        print(f"[SOCKET] User left room: {room}")
+        logger.info("Socket left room %s", room)
 
     @app.route('/api/itinerary/<itinerary_id>/chat', methods=['POST', 'OPTIONS'])
     def post_chat_message(itinerary_id):
@@ -1437,15 +2048,11 @@ def create_app():
                 "timestamp": timestamp
             }
             
-            # Save to DB
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.chat_messages.insert_one(new_message.copy())
-                except Exception as e:
-                    print(f"[WARN] MongoDB chat save failed: {e}")
-            else:
-                # Fallback to in-memory
-                in_memory_db['chat_messages'].append(new_message)
+            # Save to DB; the message is still delivered live if that fails
+            try:
+                storage.chat_messages.put(new_message)
+            except StorageError as e:
+                logger.warning("Chat save failed: %s", e)
             
             # Emit to Socket Room
             socketio.emit('new_message', new_message, room=itinerary_id)
@@ -1479,10 +2086,6 @@ def create_app():
 
     # --- AUTHENTICATION ENDPOINTS ---
     
-    # Initialize users storage
-    if 'users' not in in_memory_db:
-        in_memory_db['users'] = {} # Key: email, Value: user_obj
-
     @app.route('/api/auth/register', methods=['POST', 'OPTIONS'])
     def register_user():
         """Register a new user"""
@@ -1497,40 +2100,30 @@ def create_app():
             
             email = data['email'].lower().strip()
             
-            # Check if user exists (In-Memory)
-            if email in in_memory_db['users']:
-                return jsonify({"error": "User already exists"}), 400
-                
-            # Check if user exists (MongoDB)
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                existing_user = db.users.find_one({"email": email})
-                if existing_user:
-                    return jsonify({"error": "User already exists"}), 400
-            
             new_user = {
                 "id": str(uuid.uuid4()),
                 "email": email,
                 "password": data['password'], # In production, HASH this!
                 "fullName": data['fullName'],
                 "mobile": data.get('mobile', ''),
+                "interests": data.get('interests', []),
+                "travel_style": data.get('travel_style', ''),
                 "createdAt": datetime.now().isoformat()
             }
             
-            # Save to MongoDB
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                try:
-                    db.users.insert_one(new_user.copy())
-                    print(f"[SUCCESS] User registered in MongoDB: {email}")
-                except Exception as e:
-                    print(f"[WARN] MongoDB user save failed: {e}")
-            
-            # Save to In-Memory
-            in_memory_db['users'][email] = new_user
+            # Insert-only: an existing account (or a concurrent sign-up) is never overwritten
+            storage.users.insert_one(new_user)
+            logger.info("User registered in %s: %s", storage.backend, email)
+            buddy_index.upsert_user(email, new_user)
             
             # Return user info (no password)
             user_response = {k: v for k, v in new_user.items() if k != 'password'}
             return jsonify({"success": True, "data": user_response, "message": "Registration successful"}), 201
             
+        except DuplicateKey:
+            return jsonify({"error": "User already exists"}), 409
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -1548,18 +2141,7 @@ def create_app():
             email = data['email'].lower().strip()
             password = data['password']
             
-            user = None
-            
-            # Check MongoDB first
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                user = db.users.find_one({"email": email})
-                if user:
-                    user['id'] = str(user.pop('_id')) # Convert ObjectId to string
-            
-            # Fallback to In-Memory if not found or DB not connected
-            if not user:
-                user = in_memory_db['users'].get(email)
-            
+            user = storage.users.get(email)
             if not user or user['password'] != password:
                 return jsonify({"error": "Invalid email or password"}), 401
             
@@ -1573,6 +2155,8 @@ def create_app():
                 "message": "Login successful"
             }), 200
             
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -1589,21 +2173,12 @@ def create_app():
             if not email:
                 return jsonify({"error": "Email is required to identify user"}), 400
 
-            # Update in MongoDB if connected
-            if app.config['MONGODB_CONNECTED'] and db is not None:
-                db.users.update_one(
-                    {"email": email},
-                    {"$set": {
-                        "fullName": data.get('fullName'),
-                        "mobile": data.get('mobile')
-                    }}
-                )
-            
-            # Update in-memory
-            if email in in_memory_db['users']:
-                user = in_memory_db['users'][email]
-                if 'fullName' in data: user['fullName'] = data['fullName']
-                if 'mobile' in data: user['mobile'] = data['mobile']
+            profile = {k: v for k, v in data.items() if k in ('fullName', 'interests', 'travel_style')}
+            updates = {k: v for k, v in data.items() if k in ('fullName', 'mobile', 'interests', 'travel_style')}
+
+            user = storage.users.update(email, updates)
+            if user:
+                buddy_index.upsert_user(email, profile)
                 
                 # Return updated user
                 user_response = {k: v for k, v in user.items() if k != 'password'}
@@ -1611,6 +2186,8 @@ def create_app():
             
             return jsonify({"error": "User not found"}), 404
             
+        except StorageError:
+            raise
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -1620,14 +2197,7 @@ def create_app():
         if request.method == 'OPTIONS':
             return '', 204
         
-        if app.config['MONGODB_CONNECTED'] and db is not None:
-            try:
-                db.bookings.delete_one({"id": booking_id})
-                print(f"[SUCCESS] Booking deleted from MongoDB: {booking_id}")
-            except Exception as e:
-                print(f"[WARN] MongoDB delete failed: {e}")
-                
-        in_memory_db['bookings'].pop(booking_id, None)
+        storage.bookings.delete(booking_id)
         return jsonify({"success": True, "message": f"Booking {booking_id} deleted"}), 200
     
     # Mock Weather Endpoint
@@ -1672,6 +2242,18 @@ def create_app():
     @app.errorhandler(500)
     def server_error(error):
         return jsonify({"error": "Internal Server Error"}), 500
+
+    @app.errorhandler(StorageError)
+    def storage_error(error):
+        logger.warning("Storage operation failed: %s", error)
+        return jsonify({"error": "Storage unavailable"}), 503
+
+    buddy_index.load_async()
+    budget_model.reload_async()
+
+    if app.config['AI_PREWARM_ENABLED']:
+        ai_warmer.start(_prewarm_matrix, app.config['AI_PREWARM_INTERVAL'])
+        logger.info("AI cache pre-warm every %ss", app.config['AI_PREWARM_INTERVAL'])
     
     return app
 
@@ -1679,7 +2261,6 @@ def create_app():
 app = create_app()
 
 if __name__ == '__main__':
-    print("[INFO] Starting AI Tour Planner Backend")
-    print(f"[INFO] Server running primarily on http://localhost:5000")
-    print("---------------------------------------------------")
+    logger.info("Starting AI Tour Planner Backend")
+    logger.info("Server running primarily on http://localhost:5000")
     socketio.run(app, debug=True, host='0.0.0.0', port=5000)
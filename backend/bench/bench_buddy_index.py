@@ -0,0 +1,102 @@
+"""
+Latency of buddy matching over a synthetic user base.
+
+Generates --users registered users (Zipf-popular interests, a travel style,
+0-3 itineraries each with interests and a gazetteer destination), builds the
+index, then times queries against the freshly built index and again with
+--pending users changed since the build (scored outside the index).
+
+    python bench/bench_buddy_index.py [--users 100000] [--queries 500] [--pending 400] [--seed 7]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.buddy_index import BuddyIndex  # noqa: E402
+from app.destinations import Gazetteer  # noqa: E402
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'gazetteer.json')
+INTERESTS = [
+    'food', 'history', 'beach', 'trekking', 'photography', 'nightlife', 'temple', 'museum', 'shopping',
+    'wildlife', 'adventure', 'yoga', 'art', 'architecture', 'music', 'festivals', 'camping', 'cycling',
+    'diving', 'surfing', 'skiing', 'tea', 'wine', 'street food', 'markets', 'backpacking', 'road trips',
+    'spirituality', 'birdwatching', 'sunsets',
+]
+STYLES = ['balanced', 'adventure', 'relaxation', 'luxury', 'budget', 'cultural']
+
+
+def population(gazetteer, n, rng):
+    places = [place.name for place in gazetteer.places.values()]
+    weights = [1.0 / (rank + 1) for rank in range(len(INTERESTS))]
+    users, itineraries = [], []
+    for i in range(n):
+        email = f"user{i}@example.com"
+        users.append({
+            'id': f"u{i}", 'email': email, 'fullName': f"Traveler {i}",
+            'interests': list({rng.choices(INTERESTS, weights)[0] for _ in range(rng.randint(1, 4))}),
+            'travel_style': rng.choice(STYLES),
+        })
+        for j in range(rng.randint(0, 3)):
+            itineraries.append({
+                'id': f"it-{i}-{j}", 'creator_email': email, 'destination': rng.choice(places),
+                'interests': list({rng.choices(INTERESTS, weights)[0] for _ in range(rng.randint(1, 3))}),
+            })
+    return users, itineraries
+
+
+def timed_queries(index, rng, count):
+    times = []
+    for _ in range(count):
+        data = {
+            'interests': rng.sample(INTERESTS, rng.randint(1, 4)),
+            'travel_style': rng.choice(STYLES),
+            'email': f"user{rng.randrange(len(index._users))}@example.com",
+        }
+        started = time.perf_counter()
+        index.match(data, k=5)
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of buddy matching")
+    parser.add_argument('--gazetteer', default=DEFAULT_GAZETTEER)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--pending', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    gazetteer = Gazetteer.load(args.gazetteer)
+    users, itineraries = population(gazetteer, args.users, rng)
+    index = BuddyIndex(gazetteer, loader=lambda: (users, itineraries), rebuild_threshold=args.pending + 1)
+
+    started = time.perf_counter()
+    index.reload()
+    load = (time.perf_counter() - started) * 1000
+    fresh = timed_queries(index, rng, args.queries)
+
+    for k in range(args.pending):
+        email = f"user{rng.randrange(args.users)}@example.com"
+        index.upsert_itinerary(f"new-{k}", {'creator_email': email, 'destination': 'Goa',
+                                            'interests': rng.sample(INTERESTS, 2)})
+    pending = timed_queries(index, rng, args.queries)
+
+    def pct(values, q):
+        return statistics.quantiles(values, n=100)[q - 1]
+
+    stats = index.stats()
+    print(f"users                 {stats['users']}  ({len(itineraries)} itineraries, {stats['features']} features)")
+    print(f"load + build          {load:.0f} ms  (index build {stats['last_build_ms']:.0f} ms)")
+    print(f"query, fresh index    p50 {pct(fresh, 50):.1f} ms  p99 {pct(fresh, 99):.1f} ms")
+    print(f"query, {stats['pending']:<4} pending   p50 {pct(pending, 50):.1f} ms  p99 {pct(pending, 99):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
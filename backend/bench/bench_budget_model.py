@@ -0,0 +1,98 @@
+"""
+Latency of the local budget model behind /api/ai/optimize-budget.
+
+Generates --itineraries synthetic trips across gazetteer places (Zipf
+popularity, 1-6 travelers, 2-10 days) with --per-trip expenses each, then
+times a cold estimate (full load plus one group build), warm estimates
+(cached percentile tables) and estimates right after a new expense, which
+rebuild only the groups that expense touches.
+
+    python bench/bench_budget_model.py [--itineraries 2000] [--per-trip 12] [--queries 2000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.budget_model import CATEGORIES, BudgetModel  # noqa: E402
+from app.destinations import Gazetteer  # noqa: E402
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'gazetteer.json')
+
+
+def history(gazetteer, n, per_trip, rng):
+    places = [place.name for place in gazetteer.places.values()]
+    weights = [1.0 / (rank + 1) for rank in range(len(places))]
+    itineraries, expenses = [], []
+    for i in range(n):
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        itineraries.append({
+            'id': f"itinerary-{i}",
+            'destination': rng.choices(places, weights)[0],
+            'travelers': rng.randint(1, 6),
+            'startDate': start.isoformat(),
+            'endDate': (start + timedelta(days=rng.randint(1, 9))).isoformat(),
+        })
+        for j in range(per_trip):
+            expenses.append({
+                'id': f"expense-{i}-{j}",
+                'itineraryId': f"itinerary-{i}",
+                'category': rng.choice(CATEGORIES),
+                'amount': round(rng.lognormvariate(7.5, 0.8)),
+                'currency': 'INR',
+            })
+    return places, weights, itineraries, expenses
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the local budget model")
+    parser.add_argument('--gazetteer', default=DEFAULT_GAZETTEER)
+    parser.add_argument('--itineraries', type=int, default=2000)
+    parser.add_argument('--per-trip', type=int, default=12)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    gazetteer = Gazetteer.load(args.gazetteer)
+    places, weights, itineraries, expenses = history(gazetteer, args.itineraries, args.per_trip, rng)
+    model = BudgetModel(gazetteer, loader=lambda: (itineraries, expenses))
+
+    def query():
+        model.estimate(rng.choices(places, weights)[0], rng.randint(1, 6), rng.randint(2, 10))
+
+    cold = timed(query)
+    warm = [timed(query) for _ in range(args.queries)]
+    after_write = []
+    for k in range(min(args.queries, 500)):
+        target = rng.choice(itineraries)
+        model.upsert_expense(f"new-{k}", {'itineraryId': target['id'], 'category': 'food', 'amount': 900, 'currency': 'INR'})
+        started = time.perf_counter()
+        model.estimate(target['destination'], 2, 4)
+        after_write.append((time.perf_counter() - started) * 1000)
+
+    def pct(values, q):
+        return statistics.quantiles(values, n=100)[q - 1]
+
+    stats = model.stats()
+    print(f"history               {len(itineraries)} itineraries, {len(expenses)} expenses")
+    print(f"cold (load + build)   {cold:.1f} ms")
+    print(f"warm                  p50 {pct(warm, 50):.2f} ms  p99 {pct(warm, 99):.2f} ms")
+    print(f"after a new expense   p50 {pct(after_write, 50):.2f} ms  p99 {pct(after_write, 99):.2f} ms")
+    print(f"group builds          {stats['group_builds']}  (cache hits {stats['cache_hits']}, "
+          f"invalidations {stats['invalidations']})")
+
+
+if __name__ == '__main__':
+    main()
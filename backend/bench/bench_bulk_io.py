@@ -0,0 +1,92 @@
+"""
+Throughput and memory of the NDJSON export/import path.
+
+Imports --docs synthetic expenses from an NDJSON file in --batch-size
+batches, exports them back to a file, and reports docs/sec for both along
+with the peak memory traced during the export (it should stay near one
+batch, however large the collection). The in-memory backend is always
+measured; MongoDB is added with --mongo-uri, using a scratch database that is
+dropped afterwards.
+
+    python bench/bench_bulk_io.py [--docs 200000] [--batch-size 1000] [--mongo-uri mongodb://localhost:27017]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.bulk_io import TransferStats, export_ndjson, import_ndjson  # noqa: E402
+from app.indexes import ensure_indexes  # noqa: E402
+from app.storage import open_storage  # noqa: E402
+
+CATEGORIES = ['accommodation', 'food', 'transport', 'activities', 'shopping', 'other']
+
+
+def write_source(path, n, rng):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(json.dumps({
+                'id': f"expense-{i}", 'itineraryId': f"itinerary-{i // 12}", 'category': rng.choice(CATEGORIES),
+                'amount': rng.randint(100, 9000), 'currency': 'INR', 'description': f"item {i}",
+                'paidBy': 'a', 'splitAmong': ['a', 'b'], 'createdAt': '2026-03-01T10:00:00',
+            }) + '\n')
+
+
+def export(storage, target, batch_size, stats):
+    with open(target, 'w', encoding='utf-8') as f:
+        for line in export_ndjson(storage.expenses, 'expenses', batch_size=batch_size, stats=stats):
+            f.write(line)
+
+
+def measure(storage, source, target, batch_size):
+    with open(source, encoding='utf-8') as f:
+        imported = import_ndjson(storage.expenses, 'expenses', f, batch_size).to_dict()
+    stats = TransferStats('expenses')
+    export(storage, target, batch_size, stats)
+    # A second, traced pass: tracemalloc slows allocation too much to time the first
+    tracemalloc.start()
+    export(storage, target, batch_size, TransferStats('expenses'))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return imported, stats.to_dict(), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of NDJSON export/import")
+    parser.add_argument('--docs', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--mongo-uri')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    backends = [('memory', open_storage(), None)]
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+        scratch = client['bench_bulk_io']
+        ensure_indexes(scratch)
+        backends.append(('mongodb', open_storage(scratch), client))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = os.path.join(tmp, 'source.ndjson'), os.path.join(tmp, 'export.ndjson')
+        write_source(source, args.docs, random.Random(args.seed))
+        print(f"source                {args.docs} expenses, {os.path.getsize(source) / 2 ** 20:.1f} MiB, "
+              f"batch {args.batch_size}")
+        for name, storage, client in backends:
+            imported, exported, peak = measure(storage, source, target, args.batch_size)
+            if client is not None:
+                client.drop_database('bench_bulk_io')
+            print(name)
+            print(f"  import              {imported['inserted']} docs in {imported['seconds']:.2f}s "
+                  f"({imported['docs_per_sec']} docs/sec)")
+            print(f"  export              {exported['docs']} docs in {exported['seconds']:.2f}s "
+                  f"({exported['docs_per_sec']} docs/sec), peak traced memory {peak / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Cache-hit gain from destination canonicalization.
+
+Replays a stream of destination lookups (Zipf-distributed popularity, each
+request spelling the place one of several ways users actually type it:
+case, stray whitespace, ", Country" suffixes, old names, typos) and counts
+how often the AI cache would hit when keyed on the raw string versus the
+canonical gazetteer name. It also checks that same-named places elsewhere
+("Paris, Texas") are left unresolved instead of merged with the known one.
+
+    python bench/bench_canonicalization.py [--requests 5000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.destinations import Gazetteer  # noqa: E402
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'gazetteer.json')
+FEATURES = ['cultural-compass', 'emergency-help', 'foodie-finder', 'vr-preview']
+# Namesakes of gazetteer places in regions the gazetteer does not cover
+NAMESAKES = ['Paris, Texas', 'Paris, Ontario', 'Rome, Georgia', 'London, Kentucky', 'Delhi, Ontario',
+             'Cairo, Illinois', 'Sydney, Nova Scotia', 'Kyoto, Texas, USA']
+
+
+def spellings(gazetteer, place, rng):
+    """Ways a user might type this place"""
+    name = place.name
+    country = gazetteer.country_name(place.country) or ''
+    variants = [name, name.lower(), name.upper(), f" {name} ", f"{name}, {country}", f"{name.lower()} {country.lower()}"]
+    if len(name) >= 6:
+        i = rng.randrange(1, len(name) - 1)
+        variants.append(name[:i] + name[i + 1:])  # dropped letter
+    return variants
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache-hit gain from destination canonicalization")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--gazetteer', default=DEFAULT_GAZETTEER)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    gazetteer = Gazetteer.load(args.gazetteer)
+    places = [p for p in gazetteer.places.values() if p.kind != 'landmark']
+    weights = [1.0 / (rank + 1) for rank in range(len(places))]
+    variants = {p.id: spellings(gazetteer, p, rng) for p in places}
+
+    raw_keys, canonical_keys = set(), set()
+    raw_hits = canonical_hits = wrong = 0
+    resolve_time = 0.0
+    for _ in range(args.requests):
+        place = rng.choices(places, weights)[0]
+        text = rng.choice(variants[place.id])
+        feature = rng.choice(FEATURES)
+
+        raw_key = (feature, ' '.join(text.split()))  # make_key already collapses whitespace
+        raw_hits += raw_key in raw_keys
+        raw_keys.add(raw_key)
+
+        started = time.perf_counter()
+        resolution = gazetteer.resolve(text)
+        resolve_time += time.perf_counter() - started
+        wrong += resolution.id not in (None, place.id)
+        canonical_key = (feature, resolution.name)
+        canonical_hits += canonical_key in canonical_keys
+        canonical_keys.add(canonical_key)
+
+    n = args.requests
+    print(f"requests            {n}")
+    print(f"raw-key hit rate    {raw_hits / n:.1%}  ({len(raw_keys)} distinct keys / upstream calls)")
+    print(f"canonical hit rate  {canonical_hits / n:.1%}  ({len(canonical_keys)} distinct keys / upstream calls)")
+    print(f"upstream calls saved {len(raw_keys) - len(canonical_keys)} ({1 - len(canonical_keys) / len(raw_keys):.1%})")
+    print(f"misresolved         {wrong}")
+    merged = [t for t in NAMESAKES if gazetteer.resolve(t).place is not None]
+    print(f"namesakes merged    {len(merged)}/{len(NAMESAKES)} {merged if merged else ''}".rstrip())
+    print(f"resolve             {resolve_time / n * 1e6:.1f} us/call (memoized)")
+    print(f"gazetteer stats     {gazetteer.stats()}")
+
+
+if __name__ == '__main__':
+    main()
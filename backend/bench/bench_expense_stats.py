@@ -0,0 +1,121 @@
+"""
+Cost of the itinerary stats, split and category-summary computations.
+
+For each --per-trip size, loads --trips itineraries with that many expenses
+and a few bookings, then times ExpenseAggregator against the loops the routes
+used before (fetch every matching document, float() and sum in Python). The
+in-memory backend is always measured; MongoDB is added with --mongo-uri,
+using a scratch database with the app's indexes that is dropped afterwards,
+where the comparison is one aggregation round trip against fetching the
+documents.
+
+    python bench/bench_expense_stats.py [--per-trip 12,200,2000] [--trips 50] [--ops 500] [--mongo-uri mongodb://localhost:27017]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.expense_stats import ExpenseAggregator  # noqa: E402
+from app.indexes import ensure_indexes  # noqa: E402
+from app.storage import open_storage  # noqa: E402
+
+CATEGORIES = ['accommodation', 'food', 'transport', 'activities', 'shopping', 'other']
+PEOPLE = ['asha', 'ben', 'chen', 'dev', 'esha', 'farid']
+
+
+def load(storage, trips, per_trip, rng):
+    storage.itineraries.put_many([{'id': f"itinerary-{i}", 'destination': 'Goa', 'budget': 50000} for i in range(trips)])
+    storage.expenses.put_many([{
+        'id': f"expense-{i}-{j}", 'itineraryId': f"itinerary-{i}", 'category': rng.choice(CATEGORIES),
+        'amount': rng.randint(100, 9000), 'description': f"item {j}", 'paid_by': rng.choice(PEOPLE),
+        'split_among': rng.sample(PEOPLE, rng.randint(1, len(PEOPLE))),
+    } for i in range(trips) for j in range(per_trip)])
+    storage.bookings.put_many([{'id': f"booking-{i}-{j}", 'itineraryId': f"itinerary-{i}", 'cost': rng.randint(500, 5000)}
+                               for i in range(trips) for j in range(3)])
+
+
+def loop_stats(storage, itinerary_id):
+    storage.itineraries.get(itinerary_id)
+    total = sum(float(e.get('amount', 0)) for e in storage.expenses.query({'itineraryId': itinerary_id}, fields=['amount']))
+    transport = sum(float(b.get('cost', 0)) or float(b.get('price', 0))
+                    for b in storage.bookings.query({'itineraryId': itinerary_id}, fields=['cost', 'price']))
+    return total + transport
+
+
+def loop_splits(storage, itinerary_id):
+    splits = {}
+    for exp in storage.expenses.query({'itineraryId': itinerary_id}):
+        splits.setdefault(exp.get('paid_by', 'Unknown'), {'paid': 0, 'owes': 0})['paid'] += float(exp.get('amount', 0))
+        split_among = exp.get('split_among', [])
+        for person in split_among:
+            splits.setdefault(person, {'paid': 0, 'owes': 0})['owes'] += float(exp.get('amount', 0)) / len(split_among)
+    return splits
+
+
+def loop_categories(storage, itinerary_id):
+    summary = {}
+    for exp in storage.expenses.query({'itineraryId': itinerary_id}):
+        entry = summary.setdefault(exp.get('category', 'misc'), {'total': 0, 'count': 0, 'items': []})
+        entry['total'] += float(exp.get('amount', 0))
+        entry['count'] += 1
+        entry['items'].append({'id': exp.get('id'), 'description': exp.get('description'),
+                               'amount': exp.get('amount'), 'paid_by': exp.get('paid_by')})
+    return summary
+
+
+def timed(fn, ids, ops, rng):
+    times = []
+    for _ in range(ops):
+        itinerary_id = rng.choice(ids)
+        started = time.perf_counter()
+        fn(itinerary_id)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of the itinerary stats and expense summaries")
+    parser.add_argument('--per-trip', default='12,200,2000')
+    parser.add_argument('--trips', type=int, default=50)
+    parser.add_argument('--ops', type=int, default=500)
+    parser.add_argument('--mongo-uri')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    client = None
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+
+    rng = random.Random(args.seed)
+    ids = [f"itinerary-{i}" for i in range(args.trips)]
+    print(f"{'backend':<9}{'per trip':>9}  {'operation':<18}{'loop p50':>12}{'aggregated p50':>17}")
+    for per_trip in (int(n) for n in args.per_trip.split(',')):
+        backends = [('memory', open_storage())]
+        if client is not None:
+            client.drop_database('bench_expense_stats')
+            scratch = client['bench_expense_stats']
+            ensure_indexes(scratch)
+            backends.append(('mongodb', open_storage(scratch)))
+        for name, storage in backends:
+            load(storage, args.trips, per_trip, rng)
+            aggregator = ExpenseAggregator(storage)
+            cases = [
+                ('itinerary stats', lambda i: loop_stats(storage, i), aggregator.itinerary_stats),
+                ('splits', lambda i: loop_splits(storage, i), lambda i: aggregator.splits(i, 4)),
+                ('category summary', lambda i: loop_categories(storage, i), aggregator.category_summary),
+            ]
+            for label, loop, aggregated in cases:
+                print(f"{name:<9}{per_trip:>9}  {label:<18}{timed(loop, ids, args.ops, rng):>9.3f} ms"
+                      f"{timed(aggregated, ids, args.ops, rng):>14.3f} ms")
+    if client is not None:
+        client.drop_database('bench_expense_stats')
+
+
+if __name__ == '__main__':
+    main()
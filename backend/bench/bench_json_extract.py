@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: legacy regex JSON extraction vs app.json_extract.
+
+Runs both extractors over captured model replies (bench/fixtures) plus
+synthetic large and pathological replies, and prints the median time per
+call and whether each extractor produced a usable object.
+
+    python bench/bench_json_extract.py [--repeat 20] [--fixture path/to/ai_debug.log]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.json_extract import AIParseError, extract_json  # noqa: E402
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'ai_debug_sample.log')
+
+
+def legacy_extract(content):
+    """The extraction _call_openrouter used before app.json_extract"""
+    json_match = re.search(r'(\{.*\})', content, re.DOTALL)
+    if json_match:
+        return json.loads(json_match.group(1))
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0].strip()
+    return json.loads(content)
+
+
+def load_fixture(path):
+    """RESULT blocks from an ai_debug.log capture"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return [block.split('RESULT: ', 1)[1] for block in text.split('\n--- ') if 'RESULT: ' in block]
+
+
+def synthetic_cases():
+    days = [{
+        "day": d,
+        "date": f"2026-03-{d:02d}",
+        "activities": [{"name": f"Activity {d}.{a} {{guided}}", "duration": 2, "cost": 500 + a,
+                        "notes": "Bring water, \"hot\" by noon"} for a in range(12)]
+    } for d in range(1, 31)]
+    itinerary = json.dumps({"destination": "Goa", "summary": "30 days", "itinerary": days}, indent=2)
+    trailing = "\n```\nLet me know if you want changes {for example: fewer museums}!"
+    single_quoted = itinerary.replace('"', "'").replace("\\'", "\\\"")
+    return {
+        'large_fenced_with_trailing_braces': "```json\n" + itinerary + trailing,
+        'large_single_quotes_trailing_commas': single_quoted.replace("\n  ]", ",\n  ]"),
+        'truncated_many_braces': "Here you go: " + "{ \"a\": [" * 2000,
+    }
+
+
+def bench(fn, text, repeat):
+    timings = []
+    ok = True
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result = fn(text)
+            ok = isinstance(result, dict)
+        except (ValueError, AIParseError):
+            ok = False
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+
+    cases = {f"captured_{i}": text for i, text in enumerate(load_fixture(args.fixture))}
+    cases.update(synthetic_cases())
+
+    print(f"{'case':40} {'bytes':>8} {'legacy us':>12} {'ok':>4} {'new us':>12} {'ok':>4}")
+    for name, text in cases.items():
+        legacy_us, legacy_ok = bench(legacy_extract, text, args.repeat)
+        new_us, new_ok = bench(extract_json, text, args.repeat)
+        print(f"{name:40} {len(text):>8} {legacy_us:>12.1f} {str(legacy_ok):>4} {new_us:>12.1f} {str(new_ok):>4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Per-request logging overhead, old print/ai_debug.log style vs the queue pipeline.
+
+A simulated AI request emits --lines status messages and one prompt/response
+payload of --payload-chars characters. The "print" variant writes the lines
+with print() to a file standing in for stdout and appends the payload to
+ai_debug.log with open()/write() on every call, as the app did before. The
+"pipeline" variant sends the same records through configure_logging() (JSON
+file output, sampled payloads); only the time spent in the calling thread is
+counted, then the queue is drained and the drop counter reported.
+
+    python bench/bench_logging.py [--requests 5000] [--lines 4] [--payload-chars 4000] [--sample 0.01]
+"""
+import argparse
+import contextlib
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.logging_setup import PAYLOAD_LOGGER, configure_logging  # noqa: E402
+
+
+def print_request(stdout, debug_path, prompt, result, lines):
+    with contextlib.redirect_stdout(stdout):
+        for i in range(lines):
+            print(f"[AI] Calling model openai/gpt-4o-mini for trip-planner (step {i})")
+    with open(debug_path, 'a', encoding='utf-8') as f:
+        f.write(f"\n--- AI CALL ---\nPROMPT:\n{prompt}\nRESULT:\n{result}\n")
+
+
+def pipeline_request(logger, payload_logger, prompt, result, lines):
+    for i in range(lines):
+        logger.info("Calling model %s for %s (step %s)", 'openai/gpt-4o-mini', 'trip-planner', i,
+                    extra={'endpoint': 'trip-planner'})
+    payload_logger.info("AI reply from %s", 'openai/gpt-4o-mini',
+                        extra={'endpoint': 'trip-planner', 'latency_ms': 812, 'prompt': prompt, 'result': result})
+
+
+def timed(fn, count):
+    times = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request logging overhead")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--lines', type=int, default=4)
+    parser.add_argument('--payload-chars', type=int, default=4000)
+    parser.add_argument('--sample', type=float, default=0.01)
+    args = parser.parse_args()
+
+    prompt = ('Plan a 5 day trip to Goa for 2 travelers. ' * 200)[:args.payload_chars]
+    result = ('{"days": [{"day": 1, "activities": ["Baga beach"]}]} ' * 200)[:args.payload_chars]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'stdout.txt'), 'w', encoding='utf-8') as stdout:
+            debug_path = os.path.join(tmp, 'ai_debug.log')
+            old = timed(lambda: print_request(stdout, debug_path, prompt, result, args.lines), args.requests)
+
+        pipeline = configure_logging(log_dir=tmp, payload_sample_rate=args.sample)
+        # Console output would dominate either variant; keep only the rotating file
+        pipeline.handlers[0].setStream(open(os.devnull, 'w', encoding='utf-8'))
+        logger = logging.getLogger('bench')
+        payload_logger = logging.getLogger(PAYLOAD_LOGGER)
+        new = timed(lambda: pipeline_request(logger, payload_logger, prompt, result, args.lines), args.requests)
+        started = time.perf_counter()
+        stats = pipeline.stats()
+        pipeline.stop()
+        drain = (time.perf_counter() - started) * 1000
+        written = os.path.getsize(os.path.join(tmp, 'app.log'))
+
+    def pct(values, q):
+        return statistics.quantiles(values, n=100)[q - 1]
+
+    print(f"requests              {args.requests} x ({args.lines} lines + 1 payload of {args.payload_chars} chars)")
+    print(f"print + ai_debug.log  p50 {pct(old, 50):.1f} us  p99 {pct(old, 99):.1f} us")
+    print(f"queue pipeline        p50 {pct(new, 50):.1f} us  p99 {pct(new, 99):.1f} us")
+    print(f"pipeline              {stats['enqueued']} enqueued, {stats['dropped']} dropped, "
+          f"{stats['payloads_logged']} payloads kept at {args.sample:g}, drained in {drain:.0f} ms, "
+          f"{written / 1024:.0f} KiB written")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Throughput of the storage backends behind the itinerary and expense routes.
+
+Loads --itineraries synthetic itineraries with --per-trip expenses each through
+put_many, then times the operations the routes use: get by id, an expense
+query for one itinerary (split/summary/stats), a keyset page of 100
+itineraries (list endpoints), a projected full scan (the budget and buddy
+loaders), update-returning, and single puts. The in-memory backend is always
+measured; MongoDB is added with --mongo-uri, using a scratch database with
+the app's indexes that is dropped afterwards.
+
+    python bench/bench_storage.py [--itineraries 2000] [--per-trip 12] [--ops 2000] [--mongo-uri mongodb://localhost:27017]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.indexes import ensure_indexes  # noqa: E402
+from app.storage import open_storage  # noqa: E402
+
+CATEGORIES = ['accommodation', 'food', 'transport', 'activities', 'shopping', 'other']
+
+
+def dataset(n, per_trip, rng):
+    itineraries, expenses = [], []
+    for i in range(n):
+        itineraries.append({
+            'id': f"itinerary-{i}", 'destination': rng.choice(['Goa', 'Jaipur', 'Manali', 'Kochi', 'Leh']),
+            'travelers': rng.randint(1, 6), 'startDate': '2026-03-01', 'endDate': '2026-03-05',
+            'budget': rng.randint(10, 200) * 1000, 'interests': ['food', 'history'],
+            'creator_email': f"user{i % 500}@example.com", 'status': 'created',
+        })
+        for j in range(per_trip):
+            expenses.append({
+                'id': f"expense-{i}-{j}", 'itineraryId': f"itinerary-{i}", 'category': rng.choice(CATEGORIES),
+                'amount': rng.randint(100, 9000), 'currency': 'INR', 'description': f"item {j}",
+                'paidBy': 'a', 'splitAmong': ['a', 'b'],
+            })
+    return itineraries, expenses
+
+
+def timed(fn, count):
+    times = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def run(storage, itineraries, expenses, ops, rng):
+    ids = [it['id'] for it in itineraries]
+    results = {}
+    started = time.perf_counter()
+    storage.itineraries.put_many(itineraries)
+    storage.expenses.put_many(expenses)
+    results['bulk load'] = [(time.perf_counter() - started) * 1000]
+    results['get'] = timed(lambda: storage.itineraries.get(rng.choice(ids)), ops)
+    results['expenses of one trip'] = timed(
+        lambda: storage.expenses.query({'itineraryId': rng.choice(ids)}), ops)
+    results['page of 100'] = timed(
+        lambda: storage.itineraries.page(fields=['-interests'], limit=100, after=rng.choice(ids)), ops)
+    results['projected scan'] = timed(
+        lambda: storage.expenses.query(fields=['id', 'itineraryId', 'category', 'amount']), max(1, ops // 200))
+    results['update'] = timed(lambda: storage.itineraries.update(rng.choice(ids), {'status': 'planned'}), ops)
+    counter = iter(range(10 ** 9))
+    results['put'] = timed(lambda: storage.expenses.put({
+        'id': f"new-{next(counter)}", 'itineraryId': rng.choice(ids), 'category': 'food', 'amount': 500}), ops)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the storage backends")
+    parser.add_argument('--itineraries', type=int, default=2000)
+    parser.add_argument('--per-trip', type=int, default=12)
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--mongo-uri')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    itineraries, expenses = dataset(args.itineraries, args.per_trip, rng)
+    backends = [('memory', open_storage(), None)]
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+        scratch = client['bench_storage']
+        ensure_indexes(scratch)
+        backends.append(('mongodb', open_storage(scratch), client))
+
+    print(f"dataset               {len(itineraries)} itineraries, {len(expenses)} expenses")
+    for name, storage, client in backends:
+        # put_many stores the memory backend's dicts as-is; give each backend its own copies
+        results = run(storage, [dict(d) for d in itineraries], [dict(d) for d in expenses], args.ops, rng)
+        if client is not None:
+            client.drop_database('bench_storage')
+        print(name)
+        for op, times in results.items():
+            if len(times) < 2:
+                print(f"  {op:<22}{times[0]:.1f} ms")
+            else:
+                q = statistics.quantiles(times, n=100)
+                print(f"  {op:<22}p50 {q[49]:.3f} ms  p99 {q[98]:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Upstream calls saved by the translation memory and batch translation.
+
+Replays a stream of traveler phrases (Zipf-distributed popularity, each typed
+one of several ways: case, trailing punctuation, a dropped letter) against a
+fresh TranslationMemory. A miss stands in for one model call whose reply is
+stored. The stream is then replayed in batches of --batch phrases, where all
+misses in a batch share a single call. Finally each MEANING_CHANGES pair is
+checked: the second phrase must never reuse the first one's translation.
+
+    python bench/bench_translation_memory.py [--requests 5000] [--batch 20] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.translation_memory import TranslationMemory, normalize_text  # noqa: E402
+
+PHRASES = [
+    "Where is the station", "No peanuts please", "How much does this cost", "Where is the toilet",
+    "I am allergic to nuts", "I am vegetarian", "Can I have the bill please", "Please call a taxi",
+    "Do you speak English", "I need a doctor", "Where is the nearest pharmacy", "Is this spicy",
+    "Table for two please", "What time does it open", "Where is my hotel", "Can you help me",
+    "I am lost", "Thank you very much", "Please take me to the airport", "Is breakfast included",
+    "Where can I buy a SIM card", "How far is the beach", "One ticket to the city centre",
+    "Please write down the address", "Can I pay by card", "Is there wifi here", "Excuse me",
+    "I would like some water", "Where is the bus stop", "What is your name",
+]
+LANGUAGES = ['French', 'Hindi', 'Japanese', 'Spanish']
+# (stored, looked up): close in spelling, different in meaning
+MEANING_CHANGES = [
+    ("I can eat nuts", "I can't eat nuts"), ("I can eat nuts", "I cant eat nuts"), ("I want beef", "I want beer"),
+    ("I am allergic to nuts", "I am not allergic to nuts"), ("I do eat pork", "I don't eat pork"),
+    ("Is this safe", "Is this unsafe"), ("Where is my hotel", "Where is my motel"),
+    ("I need a bridge", "I need a fridge"), ("It is hot", "It is not"), ("Room for two", "Room for ten"),
+]
+
+
+def spellings(phrase, rng):
+    """Ways a traveler might type this phrase"""
+    variants = [phrase, phrase.lower(), phrase + "?", phrase + ".", f"  {phrase}!"]
+    words = phrase.split()
+    long_words = [i for i, w in enumerate(words) if len(w) >= 6]
+    if long_words:
+        i = rng.choice(long_words)
+        j = rng.randrange(1, len(words[i]) - 1)
+        words[i] = words[i][:j] + words[i][j + 1:]  # dropped letter
+        variants.append(' '.join(words))
+    return variants
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstream calls saved by the translation memory")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(PHRASES))]
+    variants = {p: spellings(p, rng) for p in PHRASES}
+    stream = []
+    for _ in range(args.requests):
+        phrase = rng.choices(PHRASES, weights)[0]
+        stream.append((phrase, rng.choice(variants[phrase]), rng.choice(LANGUAGES)))
+
+    raw_keys = set()
+    for _, text, lang in stream:
+        raw_keys.add((text, lang))
+
+    tm = TranslationMemory()
+    wrong = 0
+    lookup_time = 0.0
+    for phrase, text, lang in stream:
+        started = time.perf_counter()
+        match = tm.lookup(text, lang)
+        lookup_time += time.perf_counter() - started
+        if match is None:
+            tm.store(text, lang, f"<{lang}:{phrase}>")
+        elif match['translated_text'] != f"<{lang}:{phrase}>":
+            wrong += 1
+    single = tm.stats()
+
+    batched = TranslationMemory()
+    batch_calls = 0
+    for i in range(0, len(stream), args.batch):
+        misses = {}
+        for phrase, text, lang in stream[i:i + args.batch]:
+            if batched.lookup(text, lang) is None:
+                misses.setdefault(lang, {})[normalize_text(text)] = (text, phrase)
+        for lang, texts in misses.items():
+            batch_calls += 1  # one call per target language in the batch
+            for text, phrase in texts.values():
+                batched.store(text, lang, f"<{lang}:{phrase}>")
+
+    unsafe = []
+    for stored, looked_up in MEANING_CHANGES:
+        guard = TranslationMemory()
+        guard.store(stored, 'French', f"<{stored}>")
+        if guard.lookup(looked_up, 'French') is not None:
+            unsafe.append(looked_up)
+
+    n = args.requests
+    print(f"requests              {n}")
+    print(f"exact-prompt cache    {len(raw_keys)} upstream calls")
+    print(f"translation memory    {single['misses']} upstream calls  (hit rate {single['hit_rate']:.1%}: "
+          f"{single['exact_hits']} exact, {single['near_hits']} near)")
+    print(f"TM + batches of {args.batch:<4}  {batch_calls} upstream calls")
+    print(f"wrong near matches    {wrong}")
+    print(f"meaning changes reused {len(unsafe)}/{len(MEANING_CHANGES)} {unsafe if unsafe else ''}".rstrip())
+    print(f"lookup                {lookup_time / n * 1e6:.1f} us/call")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+"""
+End-to-end load benchmark for every route in create_app().
+
+Starts bench/mock_openrouter.py in-process (or uses --mock-url), points the
+app at it, discovers the routes from app.url_map, seeds the ids the path
+parameters need, then drives each route with --requests calls at
+--concurrency and reports p50/p95/p99 latency and throughput. Results are
+written as JSON so runs on different commits can be diffed:
+
+    python bench/load_bench.py --concurrency 8 --requests 50 --latency lognormal:-1.5,0.5
+    python bench/load_bench.py --routes '/api/ai/' --error-rate 0.1 --malformed-rate 0.2
+    python bench/load_bench.py --target http://localhost:5000    # a running server
+    python bench/load_bench.py --compare bench/results/old.json bench/results/new.json
+
+By default the app is exercised in-process through Flask's test client, so
+the numbers measure the app and the mock, not a WSGI server.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.model_health import percentile  # noqa: E402
+from mock_openrouter import MockConfig, start_server  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+SKIP_METHODS = {'HEAD', 'OPTIONS', 'DELETE'}
+
+TRIP = {"destination": "Goa", "source": "Mumbai", "start_date": "2026-03-01", "end_date": "2026-03-03",
+        "budget": 50000, "travelers": 2, "interests": ["beach", "food"], "creator_email": "bench@example.com"}
+
+# "METHOD rule" -> JSON body (POST/PUT) or query string (GET); callables get a fresh value per call
+SAMPLE_PAYLOADS = {
+    'POST /api/ai/test': {"prompt": "ping"},
+    'POST /api/ai/generate-itinerary': TRIP,
+    'GET /api/ai/generate-itinerary/stream': {"destination": "Goa", "duration": "3", "budget": "50000"},
+    'POST /api/ai/generate-itinerary/stream': TRIP,
+    'POST /api/ai/recommend-destinations': {"interests": ["beach"], "budget": 50000, "duration": 3},
+    'POST /api/ai/optimize-budget': {"destination": "Goa", "current_budget": 50000},
+    'GET /api/ai/activity-suggestions': {"destination": "Goa", "interests": "beach"},
+    'POST /api/ai/cultural-compass': {"destination": "Kyoto"},
+    'POST /api/ai/receipt-ocr': {},
+    'POST /api/ai/eco-score': {"destination": "Goa", "transport_type": "train"},
+    'POST /api/ai/trip-summary-narrative': {"destination": "Goa", "activities": ["Fort Aguada", "Baga beach"]},
+    'POST /api/ai/buddy-match': {"interests": ["hiking"], "travel_style": "adventure"},
+    'POST /api/ai/translate': {"text": "Where is the station?", "target_lang": "Spanish"},
+    'POST /api/ai/emergency-help': {"location": "Goa", "situation": "medical"},
+    'POST /api/ai/collect-stamp': {"landmark": "Taj Mahal"},
+    'POST /api/ai/foodie-finder': {"location": "Goa", "restrictions": "vegetarian"},
+    'POST /api/ai/vr-preview': {"destination": "Goa", "experience": "Sunset"},
+    'POST /api/ai/jobs': {"feature": "translate", "payload": {"text": "Good morning", "target_lang": "French"}},
+    'POST /api/ai/batch': {"items": [
+        {"id": "culture", "feature": "cultural-compass", "payload": {"destination": "Kyoto"}},
+        {"id": "food", "feature": "foodie-finder", "payload": {"location": "Goa"}},
+    ]},
+    'POST /api/itinerary/create': TRIP,
+    'POST /api/itinerary/<itinerary_id>/generate': {},
+    'POST /api/itinerary/<itinerary_id>/packing-list': {},
+    'PUT /api/itinerary/<itinerary_id>/update': {"budget": 60000},
+    'POST /api/itinerary/<itinerary_id>/chat': {"user": "bench", "text": "Hello"},
+    'POST /api/expenses/add': {"itineraryId": "{itinerary_id}", "category": "food", "amount": 1200,
+                               "description": "Dinner", "paidBy": "A", "splitAmong": ["A", "B"]},
+    'GET /api/expenses': {"itineraryId": "{itinerary_id}"},
+    'PUT /api/expenses/<expense_id>/update': {"amount": 1500},
+    'GET /api/transport/options': {"source": "Mumbai", "destination": "Goa"},
+    'POST /api/transport/book': {"itineraryId": "{itinerary_id}", "type": "train", "cost": 900},
+    'GET /api/transport/bookings': {"itineraryId": "{itinerary_id}"},
+    'PUT /api/transport/bookings/<booking_id>/update': {"status": "confirmed"},
+    'POST /api/auth/register': lambda: {"email": f"bench-{time.time_ns()}@example.com",
+                                        "password": "bench-pass", "fullName": "Bench"},
+    'POST /api/auth/login': {"email": "bench@example.com", "password": "bench-pass"},
+    'PUT /api/auth/profile': {"email": "bench@example.com", "fullName": "Bench"},
+}
+
+
+def git_sha():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def fill(value, ids):
+    """Substitute {name} placeholders in a payload with seeded ids"""
+    if callable(value):
+        value = value()
+    if isinstance(value, str):
+        return value.format(**ids) if '{' in value else value
+    if isinstance(value, dict):
+        return {k: fill(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, ids) for v in value]
+    return value
+
+
+class InProcessClient:
+    """Flask test client per thread (test clients are not thread-safe)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, query=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, query_string=query)
+        data = response.get_data()  # drains streamed responses
+        return response.status_code, data
+
+
+class HTTPClient:
+    """requests.Session per thread against a running server"""
+
+    def __init__(self, base_url):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, query=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        try:
+            response = session.request(method, self.base_url + path, json=body, params=query, timeout=120)
+        except self._requests.RequestException:
+            return 599, b''
+        return response.status_code, response.content
+
+
+def discover_routes(app, pattern=None):
+    """(method, rule) for every benchmarkable route, in url_map order"""
+    targets = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in sorted(rule.methods - SKIP_METHODS):
+            if pattern and not re.search(pattern, f"{method} {rule.rule}"):
+                continue
+            targets.append((method, rule.rule))
+    return targets
+
+
+def seed_ids(client):
+    """Create the records whose ids fill <itinerary_id>, <expense_id>, ..."""
+    ids = {'location': 'Goa', 'job_id': 'missing'}
+    _, body = client.request('POST', '/api/itinerary/create', {**TRIP, "destination": "Bench Seed"})
+    ids['itinerary_id'] = json.loads(body)['data']['id']
+    _, body = client.request('POST', '/api/expenses/add', fill(SAMPLE_PAYLOADS['POST /api/expenses/add'], ids))
+    ids['expense_id'] = json.loads(body)['data']['id']
+    _, body = client.request('POST', '/api/transport/book', fill(SAMPLE_PAYLOADS['POST /api/transport/book'], ids))
+    ids['booking_id'] = json.loads(body)['data']['id']
+    client.request('POST', '/api/auth/register', {"email": "bench@example.com", "password": "bench-pass",
+                                                  "fullName": "Bench"})
+    status, body = client.request('POST', '/api/ai/jobs', SAMPLE_PAYLOADS['POST /api/ai/jobs'])
+    if status < 400:
+        ids['job_id'] = json.loads(body)['data']['job_id']
+    return ids
+
+
+def summarize(latencies, statuses, wall):
+    ordered = sorted(latencies)
+    errors = sum(1 for s in statuses if s >= 400)
+    counts = {}
+    for s in statuses:
+        counts[str(s)] = counts.get(str(s), 0) + 1
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'error_rate': round(errors / len(ordered), 4) if ordered else 0,
+        'status_counts': counts,
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'max_ms': ms(ordered[-1]) if ordered else None,
+        'throughput_rps': round(len(ordered) / wall, 2) if wall > 0 else None,
+    }
+
+
+def run_route(client, executor, method, rule, ids, requests_per_route):
+    path = re.sub(r'<(?:[^:<>]+:)?([^<>]+)>', lambda m: str(ids.get(m.group(1), 'missing')), rule)
+    sample = SAMPLE_PAYLOADS.get(f"{method} {rule}", {})
+
+    def one(_):
+        payload = fill(sample, ids)
+        started = time.perf_counter()
+        if method == 'GET':
+            status, _ = client.request(method, path, query=payload or None)
+        else:
+            status, _ = client.request(method, path, body=payload)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    outcomes = list(executor.map(one, range(requests_per_route)))
+    wall = time.perf_counter() - started
+    return outcomes, wall
+
+
+def run(args):
+    mock_server = None
+    mock_config = None
+    if not args.target:
+        mock_url = args.mock_url
+        if not mock_url:
+            mock_config = MockConfig(
+                latency=args.latency,
+                error_rate=args.error_rate,
+                malformed_rate=args.malformed_rate,
+                token_interval=args.token_interval,
+                model_latency=dict(spec.split('=', 1) for spec in args.model_latency),
+                seed=args.seed
+            )
+            mock_server, mock_url = start_server(mock_config)
+        # Must be set before app_dev runs load_dotenv() and create_app()
+        os.environ['OPENROUTER_BASE_URL'] = mock_url
+        os.environ['OPENROUTER_API_KEY'] = 'mock'
+        os.environ['AI_CACHE_DIR'] = tempfile.mkdtemp(prefix='ai-cache-bench-')
+        if args.no_cache:
+            os.environ['AI_CACHE_ENABLED'] = 'false'
+        print(f"[INFO] OpenRouter mock at {mock_url}")
+
+    import app_dev
+    app = app_dev.app
+    client = HTTPClient(args.target) if args.target else InProcessClient(app)
+    targets = discover_routes(app, args.routes)
+    ids = seed_ids(client)
+    print(f"[INFO] Benchmarking {len(targets)} routes x {args.requests} requests at concurrency {args.concurrency}")
+
+    routes = {}
+    all_latencies, all_statuses, total_wall = [], [], 0.0
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='bench') as executor:
+        for method, rule in targets:
+            outcomes, wall = run_route(client, executor, method, rule, ids, args.requests)
+            latencies = [o[0] for o in outcomes]
+            statuses = [o[1] for o in outcomes]
+            routes[f"{method} {rule}"] = summarize(latencies, statuses, wall)
+            all_latencies += latencies
+            all_statuses += statuses
+            total_wall += wall
+            r = routes[f"{method} {rule}"]
+            print(f"  {method:6} {rule:55} p50 {r['p50_ms']:>9}ms  p95 {r['p95_ms']:>9}ms  "
+                  f"p99 {r['p99_ms']:>9}ms  {r['throughput_rps']:>8} rps  errors {r['errors']}")
+
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_sha': git_sha(),
+            'python': platform.python_version(),
+            'mode': 'http' if args.target else 'in-process',
+            'target': args.target,
+            'concurrency': args.concurrency,
+            'requests_per_route': args.requests,
+            'mock': None if args.target or args.mock_url else {
+                'latency': args.latency,
+                'model_latency': args.model_latency,
+                'error_rate': args.error_rate,
+                'malformed_rate': args.malformed_rate,
+                'token_interval': args.token_interval,
+                'seed': args.seed,
+                'counters': dict(mock_config.counters),
+            },
+            'ai_cache_enabled': not args.no_cache,
+        },
+        'overall': summarize(all_latencies, all_statuses, total_wall),
+        'routes': routes,
+    }
+    if mock_server:
+        mock_server.shutdown()
+    return result
+
+
+def compare(old_path, new_path, threshold):
+    """Print per-route deltas; returns the number of regressions beyond threshold %"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"old: {old['meta']['git_sha']} {old['meta']['timestamp']}   new: {new['meta']['git_sha']} {new['meta']['timestamp']}")
+
+    def delta(a, b):
+        if not a or b is None:
+            return None
+        return round((b - a) / a * 100, 1)
+
+    regressions = 0
+    rows = [('overall', old['overall'], new['overall'])]
+    rows += [(name, old['routes'][name], new['routes'][name]) for name in new['routes'] if name in old['routes']]
+    for name, a, b in rows:
+        cells = []
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            d = delta(a.get(metric), b.get(metric))
+            worse = d is not None and (d < -threshold if metric == 'throughput_rps' else d > threshold)
+            regressions += worse
+            cells.append(f"{metric[:-3] if metric.endswith('_ms') else 'rps'} "
+                         f"{'n/a' if d is None else f'{d:+.1f}%'}{' !' if worse else ''}")
+        print(f"  {name:62} " + "  ".join(f"{c:16}" for c in cells))
+    for name in sorted(set(new['routes']) - set(old['routes'])):
+        print(f"  {name:62} (new route)")
+    for name in sorted(set(old['routes']) - set(new['routes'])):
+        print(f"  {name:62} (removed)")
+    print(f"[INFO] {regressions} metric(s) regressed by more than {threshold}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end route load benchmark")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=40, help="requests per route")
+    parser.add_argument('--routes', help="regex over 'METHOD /rule' to select routes")
+    parser.add_argument('--target', help="base URL of a running server instead of the in-process app")
+    parser.add_argument('--mock-url', help="use an already running mock instead of starting one")
+    parser.add_argument('--latency', default='lognormal:-1.5,0.5')
+    parser.add_argument('--model-latency', action='append', default=[], metavar='MODEL=SPEC')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--token-interval', type=float, default=0.005)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-cache', action='store_true', help="disable the AI response cache")
+    parser.add_argument('--output', help="result file (default bench/results/<timestamp>-<sha>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="diff two result files")
+    parser.add_argument('--threshold', type=float, default=10.0, help="regression threshold in %% for --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    result = run(args)
+    overall = result['overall']
+    print(f"[SUCCESS] overall p50 {overall['p50_ms']}ms  p95 {overall['p95_ms']}ms  p99 {overall['p99_ms']}ms  "
+          f"{overall['throughput_rps']} rps  errors {overall['errors']}/{overall['count']}")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{result['meta']['git_sha']}.json")
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"[INFO] Results written to {output}")
+    # Background threads (job workers, hedge pool) must not keep the process alive
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Local stand-in for OpenRouter's /chat/completions API.
+
+Answers with plausible JSON for each AI feature (recognised from the system
+prompt), with configurable latency, error injection, malformed-JSON
+injection and SSE streaming, so the AI routes can be load-tested without
+spending money or hitting rate limits.
+
+    python bench/mock_openrouter.py --port 8765 --latency lognormal:-0.5,0.6 --error-rate 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/api/v1 OPENROUTER_API_KEY=mock python app_dev.py
+
+Latency specs: fixed:S, uniform:LO,HI, lognormal:MU,SIGMA (seconds). Use
+--model-latency MODEL=SPEC (repeatable) to make individual models slow.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_NUMBERED_TEXTS = re.compile(r'Texts: (\{.*?\})\n')
+
+# System prompt fragment -> reply for that feature
+CANNED_REPLIES = {
+    'expert travel planner': lambda: {
+        "destination": "Goa", "duration_days": 3, "total_budget": 50000, "ai_score": 92,
+        "summary": "Beaches, forts and food.", "statistics": {"budget_utilization": 84},
+        "itinerary": [
+            {"day": d, "date": f"2026-03-0{d}", "activities": [
+                {"name": f"Activity {d}.{a}", "duration": 2, "cost": 500 * a} for a in range(1, 4)]}
+            for d in range(1, 4)
+        ]
+    },
+    'travel recommendation expert': lambda: {"recommendations": [
+        {"destination": name, "score": 90 - i, "difficulty": "Easy", "estimated_cost": 20000 + 5000 * i,
+         "best_season": ["Winter"]} for i, name in enumerate(["Goa", "Jaipur", "Munnar"])]},
+    'travel budget consultant': lambda: {
+        "current_budget": 50000, "minimum_recommended_budget": 40000,
+        "cost_breakdown": {"stay": 15000, "food": 10000, "transport": 10000, "activities": 5000},
+        "recommendations": ["Book trains early", "Eat local", "Travel off-season"]},
+    'local travel guide': lambda: {"activities": [
+        {"name": "Old town walk", "description": "Guided heritage walk", "cost": 500}]},
+    'cultural sensitivity expert': lambda: {
+        "destination": "Goa", "etiquette": ["Greet with Namaste"], "dress_code": ["Cover shoulders in temples"],
+        "tipping": ["10% in restaurants"], "taboos": ["Public displays of affection"]},
+    'environmental sustainability expert': lambda: {
+        "co2_kg": 250, "rating": 7, "alternatives": ["Take the train", "Stay local", "Offset"]},
+    'travel writer and storyteller': lambda: {
+        "destination": "Goa", "narrative": "Sun, sand and spice.", "highlights": ["Fort", "Beach", "Market"]},
+    'social travel coordinator': lambda: {"matches": [
+        {"name": "Asha", "match_score": 92, "reason": "Both love hiking", "interests": ["hiking", "food"]}]},
+    'professional translator': lambda: {"translated_text": "Dónde está la estación"},
+    'emergency response coordinator': lambda: {
+        "numbers": {"police": "112", "ambulance": "108"}, "distress_message": "Help me!",
+        "next_steps": ["Move to safety", "Call 112", "Contact your embassy"]},
+    'gamification expert': lambda: {
+        "landmark": "Taj Mahal", "stamp_name": "Marble Dream", "story": "Built over 22 years.", "color": "#FFD700"},
+    'culinary travel expert': lambda: {"recommendations": [
+        {"name": "Xacuti", "description": "Spiced curry", "safety": "Safe", "ingredients": ["coconut", "chilli", "poppy"]}]},
+    'VR experience designer': lambda: {
+        "destination": "Goa", "experience": "Exploring", "visuals": "Palm-lined shore", "sounds": "Waves",
+        "atmosphere": "Warm and salty", "tip": "Look at the sunset"},
+}
+
+
+def parse_latency(spec):
+    """Turn 'fixed:0.5' / 'uniform:0.2,1.5' / 'lognormal:-0.5,0.6' into a sampler"""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v]
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def malform(text, rng):
+    """Break a JSON reply the way models do"""
+    choice = rng.randrange(4)
+    if choice == 0:
+        return "Here is your plan:\n```json\n" + text.replace('"', "'") + "\n```"
+    if choice == 1:
+        return text[:-1] + ",}" + "\nHope this helps {enjoy}!"
+    if choice == 2:
+        return text[: max(1, len(text) // 2)]
+    return "I'm sorry, I can't produce JSON for that request."
+
+
+class MockConfig:
+    def __init__(self, latency='fixed:0.2', error_rate=0.0, malformed_rate=0.0, token_interval=0.02,
+                 model_latency=None, seed=None):
+        self.latency = parse_latency(latency)
+        self.model_latency = {m: parse_latency(s) for m, s in (model_latency or {}).items()}
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.token_interval = token_interval
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'errors': 0, 'malformed': 0, 'streams': 0}
+
+    def roll(self, model):
+        with self.lock:
+            self.counters['requests'] += 1
+            delay = self.model_latency.get(model, self.latency)(self.rng)
+            error = self.rng.random() < self.error_rate
+            malformed = not error and self.rng.random() < self.malformed_rate
+            if error:
+                self.counters['errors'] += 1
+            if malformed:
+                self.counters['malformed'] += 1
+            return max(0.0, delay), error, malformed, self.rng.random()
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/stats'):
+                with config.lock:
+                    return self._json(200, dict(config.counters))
+            return self._json(404, {"error": "Not Found"})
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                return self._json(404, {"error": "Not Found"})
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            model = request.get('model', 'mock')
+            messages = request.get('messages', [])
+            system_prompt = messages[0]['content'] if messages else ''
+
+            delay, error, malformed, pick = config.roll(model)
+            if error:
+                time.sleep(delay)
+                status = 429 if pick < 0.5 else 500
+                return self._json(status, {"error": {"code": status, "message": "Injected failure"}})
+
+            numbered = _NUMBERED_TEXTS.search(messages[-1]['content'] if messages else '')
+            if numbered:
+                # Batch translation: echo one "translation" per numbered text
+                reply = {"translations": {k: f"~{v}" for k, v in json.loads(numbered.group(1)).items()}}
+            else:
+                reply = next((build() for key, build in CANNED_REPLIES.items() if key in system_prompt),
+                             {"message": "Mock reply"})
+            content = json.dumps(reply, ensure_ascii=False, indent=2)
+            if malformed:
+                content = malform(content, random.Random(pick))
+
+            if request.get('stream'):
+                return self._stream(model, content, delay)
+            time.sleep(delay)
+            self._json(200, {
+                "id": f"gen-{uuid.uuid4().hex[:12]}",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": len(content) // 4},
+            })
+
+        def _stream(self, model, content, delay):
+            with config.lock:
+                config.counters['streams'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            # Latency is time-to-first-token; the rest trickles out
+            time.sleep(delay)
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            for i in range(0, len(content), 16):
+                chunk = {"id": "gen-stream", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + 16]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(config.token_interval)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """Start the mock in a daemon thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenRouter stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0.2')
+    parser.add_argument('--model-latency', action='append', default=[], metavar='MODEL=SPEC')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--token-interval', type=float, default=0.02)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        token_interval=args.token_interval,
+        model_latency=dict(spec.split('=', 1) for spec in args.model_latency),
+        seed=args.seed
+    )
+    server, base_url = start_server(config, args.host, args.port)
+    print(f"[INFO] Mock OpenRouter listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
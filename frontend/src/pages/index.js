@@ -1354,7 +1354,7 @@ const ProfilePage = () => {
         try {
             // Mock interests for demo
             const interests = ['adventure', 'photography', 'foodie'];
-            const result = await aiService.getBuddyMatches(interests, 'adventurous');
+            const result = await aiService.getBuddyMatches(interests, 'adventurous', currentUser?.email);
             setBuddyMatches(result.matches);
             showSnackbar('Found potential travel buddies!', 'success');
         } catch (error) {
@@ -168,11 +168,12 @@ const aiService = {
     /**
      * Get travel buddy matches based on interests
      */
-    getBuddyMatches: async (interests = [], travelStyle = 'balanced') => {
+    getBuddyMatches: async (interests = [], travelStyle = 'balanced', email = '') => {
         try {
             const response = await api.post('/ai/buddy-match', {
                 interests,
                 travel_style: travelStyle,
+                email,
             });
             return response.data;
         } catch (error) {